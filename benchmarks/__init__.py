@@ -0,0 +1,6 @@
+"""
+Benchmarks of crawler, run as scripts from repository root
+modules:
+    scheduler - overhead of scheduling crawl jobs by number of urls
+    crawler - crawler throughput against local fake sites
+"""
@@ -0,0 +1,281 @@
+"""
+Benchmark of crawler throughput against local fake sites:
+server in child process answers for thousands of hosts (all of them
+are resolved to 127.0.0.1) with configurable latency, redirect chains,
+error statuses, slow responses and large bodies, and CrawlEngine
+checks pages of all hosts as CheckUrls does (CheckUrls itself needs
+Qt and database, so engine it runs is driven directly).
+Reports pages per second, p50/p99 of page check time, peak RSS of
+crawling process and peak of its open sockets.
+Usage:
+    python -m benchmarks.crawler [--hosts 2000] [--pages 10] ...
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import resource
+import socket
+import time
+from random import Random
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+from aiohttp.abc import AbstractResolver
+
+from settings.config import CRAWLER_CONCURRENCY
+from tasks.crawling.crawler import PageCheck
+from tasks.crawling.engine import CrawlEngine
+
+
+# size of chunks large bodies are sent with
+CHUNK = 64 * 1024
+
+
+class LocalResolver(AbstractResolver):
+    """
+    Resolver answering 127.0.0.1 for any host, so fake hosts are
+    served by local server
+    """
+    async def resolve(self, host: str, port: int=0,
+                      family: int=socket.AF_INET)->List[Dict[str, Any]]:
+        return [{
+            "hostname": host, "host": "127.0.0.1", "port": port,
+            "family": socket.AF_INET, "proto": 0,
+            "flags": socket.AI_NUMERICHOST
+        }]
+
+    async def close(self):
+        pass
+
+
+def fake_site(latency: float, seed: int)->web.Application:
+    """
+    Creates application of fake sites, response is defined by path
+    of page /kind/argument/number:
+        ok - page responds 200 with small body
+        redirect - page redirects argument times more, then responds 200
+        error - page responds with argument status
+        slow - page responds after argument milliseconds
+        large - page responds with body of argument bytes
+    Every response is delayed by half to one and a half of latency
+    :param latency: mean seconds of response delay
+    :param seed: seed of delays
+    :return: aiohttp application
+    """
+    delays = Random(seed)
+
+    async def page(request: web.Request)->web.StreamResponse:
+        kind = request.match_info["kind"]
+        argument = int(request.match_info["argument"])
+        number = request.match_info["number"]
+        await asyncio.sleep(latency * delays.uniform(0.5, 1.5))
+        if kind == "redirect" and argument > 0:
+            raise web.HTTPFound(f"/redirect/{argument - 1}/{number}")
+        if kind == "error":
+            return web.Response(status=argument)
+        if kind == "slow":
+            await asyncio.sleep(argument / 1000)
+        if kind != "large" or request.method == "HEAD":
+            return web.Response(
+                text=f"<html><body>Page {number}</body></html>",
+                content_type="text/html"
+            )
+        response = web.StreamResponse(headers={"Content-Type": "text/html"})
+        response.content_length = argument
+        await response.prepare(request)
+        sent = 0
+        while sent < argument:
+            size = min(CHUNK, argument - sent)
+            await response.write(b"x" * size)
+            sent += size
+        return response
+
+    app = web.Application()
+    app.router.add_get("/{kind}/{argument:\\d+}/{number}", page)
+    return app
+
+
+def serve(latency: float, seed: int, ports):
+    """
+    Runs fake sites server (runs in child process)
+    :param latency: mean seconds of response delay
+    :param seed: seed of delays
+    :param ports: multiprocessing queue port of server is put to
+    :return: None
+    """
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    runner = web.AppRunner(fake_site(latency, seed), access_log=None)
+    loop.run_until_complete(runner.setup())
+    site = web.TCPSite(runner, "127.0.0.1", 0, backlog=4096)
+    loop.run_until_complete(site.start())
+    ports.put(runner.addresses[0][1])
+    loop.run_forever()
+
+
+def fake_pages(args, port: int)->Dict[str, List[str]]:
+    """
+    Gets pages of fake sites grouped by fake login, kind of each
+    page is chosen randomly by rates of arguments
+    :param args: parsed arguments
+    :param port: port of fake sites server
+    :return: pages by login, as CheckUrls gets them
+    """
+    rates = Random(args.seed)
+    pages_by_login: Dict[str, List[str]] = {}
+    for number in range(args.hosts * args.pages):
+        host = f"site{number % args.hosts}.test"
+        chance = rates.random()
+        if chance < args.errors:
+            path = f"error/{rates.choice((404, 500))}"
+        elif chance < args.errors + args.redirects:
+            path = f"redirect/{args.chain}"
+        elif chance < args.errors + args.redirects + args.slow:
+            path = f"slow/{int(args.slow_delay * 1000)}"
+        elif chance < args.errors + args.redirects + args.slow + args.large:
+            path = f"large/{args.large_size}"
+        else:
+            path = "ok/0"
+        pages_by_login.setdefault(f"client{number % 50}", []).append(
+            f"http://{host}:{port}/{path}/{number}"
+        )
+    return pages_by_login
+
+
+def open_sockets()->Optional[int]:
+    """
+    Counts sockets opened by process
+    :return: number of sockets, None if it can not be counted
+    (no /proc file system)
+    """
+    try:
+        descriptors = os.listdir("/proc/self/fd")
+    except OSError:
+        return None
+    count = 0
+    for descriptor in descriptors:
+        try:
+            target = os.readlink(f"/proc/self/fd/{descriptor}")
+        except OSError:
+            continue  # descriptor was closed while counting
+        if target.startswith("socket:"):
+            count += 1
+    return count
+
+
+def percentile(values: List[float], share: float)->float:
+    """
+    Gets percentile of values
+    :param values: sorted values
+    :param share: share of values below percentile, from 0 to 1
+    :return: percentile
+    """
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def crawl(args, pages_by_login: Dict[str, List[str]])->Dict[str, Any]:
+    """
+    Checks all pages with CrawlEngine measuring time of each check
+    and sampling open sockets
+    :param args: parsed arguments
+    :param pages_by_login: pages of fake sites by login
+    :return: measurements
+    """
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    timings: List[float] = []
+    results: List[PageCheck] = []
+    peak_sockets = [open_sockets()]
+
+    async def sample():
+        while True:
+            await asyncio.sleep(0.1)
+            count = open_sockets()
+            if count is not None:
+                peak_sockets[0] = max(peak_sockets[0] or 0, count)
+
+    async def run():
+        sampling = asyncio.ensure_future(sample())
+        try:
+            await CrawlEngine(
+                concurrency=args.concurrency,
+                content_check=args.content_check,
+                resolver=LocalResolver()
+            ).run(
+                pages_by_login, results.append,
+                on_timing=lambda url, seconds: timings.append(seconds)
+            )
+        finally:
+            sampling.cancel()
+
+    try:
+        started = time.perf_counter()
+        loop.run_until_complete(run())
+        spent = time.perf_counter() - started
+    finally:
+        loop.close()
+    timings.sort()
+    return {
+        "pages": len(results),
+        "failed": sum(1 for page in results if page.error is not None),
+        "seconds": spent,
+        "pages per second": len(results) / spent,
+        "p50, ms": percentile(timings, 0.5) * 1000,
+        "p99, ms": percentile(timings, 0.99) * 1000,
+        # kilobytes on Linux
+        "peak RSS, MB": resource.getrusage(
+            resource.RUSAGE_SELF
+        ).ru_maxrss / 1024,
+        "peak open sockets": peak_sockets[0]
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--hosts", type=int, default=2000,
+                        help="number of fake hosts")
+    parser.add_argument("--pages", type=int, default=10,
+                        help="pages of each host")
+    parser.add_argument("--latency", type=float, default=0.05,
+                        help="mean seconds of response delay")
+    parser.add_argument("--redirects", type=float, default=0.1,
+                        help="share of redirecting pages")
+    parser.add_argument("--chain", type=int, default=3,
+                        help="redirects of redirecting page")
+    parser.add_argument("--errors", type=float, default=0.05,
+                        help="share of pages with error status")
+    parser.add_argument("--slow", type=float, default=0.01,
+                        help="share of slow pages")
+    parser.add_argument("--slow-delay", type=float, default=5,
+                        help="seconds of slow page delay")
+    parser.add_argument("--large", type=float, default=0.01,
+                        help="share of pages with large body")
+    parser.add_argument("--large-size", type=int, default=5 * 1024 * 1024,
+                        help="bytes of large body")
+    parser.add_argument("--concurrency", type=int,
+                        default=CRAWLER_CONCURRENCY,
+                        help="requests in flight")
+    parser.add_argument("--content-check", action="store_true",
+                        help="compare content of pages with error pages "
+                             "(pages are requested with GET, so large "
+                             "bodies are read)")
+    parser.add_argument("--seed", type=int, default=1,
+                        help="seed of pages kinds and delays")
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    ports = context.Queue()
+    server = context.Process(
+        target=serve, args=(args.latency, args.seed, ports), daemon=True
+    )
+    server.start()
+    try:
+        report = crawl(args, fake_pages(args, ports.get(timeout=30)))
+    finally:
+        server.terminate()
+    for name, value in report.items():
+        if isinstance(value, float):
+            value = f"{value:.2f}"
+        print(f"{name:<20}{value:>12}")
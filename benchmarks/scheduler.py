@@ -0,0 +1,114 @@
+"""
+Micro-benchmark of crawl jobs scheduling overhead:
+jobs are put to HostScheduler and taken by workers finishing them
+at once, so only scheduling itself is measured. Time per job should
+stay flat as number of urls grows.
+Naive list with head pops (as crawlers were iterated before) is
+measured for comparison.
+Usage:
+    python -m benchmarks.scheduler [--sizes 1000 10000 100000]
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Callable, List
+
+from tasks.crawling.scheduler import HostScheduler
+
+
+async def drain(scheduler: HostScheduler, workers: int):
+    """
+    Takes all jobs from scheduler finishing them at once
+    :param scheduler: scheduler with jobs
+    :param workers: number of concurrent workers
+    :return: None
+    """
+    async def worker():
+        while True:
+            scheduled = await scheduler.get()
+            if scheduled is None:
+                return
+            scheduler.done(scheduled[0])
+
+    await asyncio.gather(*(worker() for _ in range(workers)))
+
+
+def scheduled(size: int, hosts: int, workers: int)->float:
+    """
+    Measures scheduling of jobs with HostScheduler
+    :param size: number of jobs
+    :param hosts: number of hosts jobs are split between
+    :param workers: number of concurrent workers
+    :return: seconds spent
+    """
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        started = time.perf_counter()
+        scheduler = HostScheduler(min_gap=0.0, max_active=4)
+        for i in range(size):
+            scheduler.put(f"host{i % hosts}.ru", i, priority=i % 7)
+        loop.run_until_complete(drain(scheduler, workers))
+        return time.perf_counter() - started
+    finally:
+        loop.close()
+
+
+def head_pops(size: int, hosts: int, workers: int)->float:
+    """
+    Measures taking jobs from lists by head pops and rotating
+    list of hosts, as it was done before scheduler
+    :param size: number of jobs
+    :param hosts: number of hosts jobs are split between
+    :param workers: not used, kept for the same signature
+    :return: seconds spent
+    """
+    started = time.perf_counter()
+    queues: List[List[int]] = [[] for _ in range(hosts)]
+    for i in range(size):
+        queues[i % hosts].append(i)
+    while queues:
+        queue = queues.pop(0)
+        queue.pop(0)
+        if queue:
+            queues.append(queue)
+    return time.perf_counter() - started
+
+
+def report(name: str, measure: Callable[[int, int, int], float],
+           sizes: List[int], hosts: Callable[[int], int], workers: int):
+    """
+    Prints microseconds per job for each number of jobs
+    :param name: name of case
+    :param measure: function measuring case
+    :param sizes: numbers of jobs
+    :param hosts: function getting number of hosts by number of jobs
+    :param workers: number of concurrent workers
+    :return: None
+    """
+    for size in sizes:
+        spent = measure(size, hosts(size), workers)
+        print(f"{name:<28}{size:>10}{spent / size * 1e6:>14.2f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+        help="numbers of urls"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=200, help="concurrent workers"
+    )
+    args = parser.parse_args()
+
+    print(f"{'case':<28}{'urls':>10}{'us per url':>14}")
+    report("scheduler, single host", scheduled, args.sizes,
+           lambda size: 1, args.workers)
+    report("scheduler, 10 urls per host", scheduled, args.sizes,
+           lambda size: max(1, size // 10), args.workers)
+    report("head pops, single host", head_pops, args.sizes,
+           lambda size: 1, args.workers)
+    report("head pops, 10 urls per host", head_pops, args.sizes,
+           lambda size: max(1, size // 10), args.workers)
@@ -2,7 +2,7 @@
 Module contains class common to all task steps:
     TaskChainStep -
 """
-from typing import Dict, List, Callable
+from typing import Dict, Set, Callable
 
 from PyQt5.QtCore import QObject, QThread, pyqtSlot, pyqtSignal
 
@@ -26,7 +26,7 @@ class TaskChainStep(QObject):
     def __init__(self):
         super().__init__()
         self.error: bool = False
-        self.__active_threads: List[QThread] = []
+        self.__active_threads: Set[QThread] = set()
 
     def start_task(self, task: QThread, handlers: Dict[str, Callable]):
         """
@@ -37,7 +37,7 @@ class TaskChainStep(QObject):
         :param handlers: dictionary of signal: handler pairs
         :return: None
         """
-        self.__active_threads.append(task)
+        self.__active_threads.add(task)
         for handler_name, handler in handlers.items():
             task.__getattr__(handler_name).connect(handler)
         task.error_occurred.connect(self.raise_error)
@@ -47,7 +47,7 @@ class TaskChainStep(QObject):
             Handler for removing thread
             :return: None
             """
-            self.__active_threads.remove(task)
+            self.__active_threads.discard(task)
 
         task.finished.connect(remove)
         task.start()
@@ -57,7 +57,7 @@ class TaskChainStep(QObject):
         Await until all threads from thread pool are finished
         :return:
         """
-        for thread in self.__active_threads:
+        for thread in list(self.__active_threads):
             thread.wait()
 
     def raise_error(self, err: Exception):
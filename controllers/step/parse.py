@@ -1,13 +1,26 @@
+from typing import List, Tuple
+
 from PyQt5.QtCore import pyqtSlot, pyqtSignal
 
 from controllers.step.common import TaskChainStep
 from tasks.crawling.tasks import CheckUrls
-from tasks.db.link import SaveParsedLink, AggregateParsedLinks
+from tasks.db.link import SaveParsedLinks, AggregateParsedLinks
 
 
 class ParseStep(TaskChainStep):
+    """
+    Step checking pages and saving results to DB
+    Results come in batches and are saved by single task at a time,
+    batches that come while it runs are saved together by the next one,
+    so DB is not locked by many concurrent writers
+    """
     finished = pyqtSignal(list)
 
+    def __init__(self):
+        super().__init__()
+        self.unsaved: List[Tuple[str, str, str]] = []
+        self.saving: bool = False
+
     @pyqtSlot(dict)
     def start(self, links_by_login):
         """
@@ -15,6 +28,24 @@ class ParseStep(TaskChainStep):
         :param links_by_login:
         :return:
         """
+        self.check(links_by_login, False)
+
+    @pyqtSlot(dict)
+    def resume(self, links_by_login):
+        """
+        Continues unfinished check of provided links
+        :param links_by_login: links of unfinished run grouped by login
+        :return: None
+        """
+        self.check(links_by_login, True)
+
+    def check(self, links_by_login, resume: bool):
+        """
+        Starts checking links
+        :param links_by_login: links grouped by login
+        :param resume: continue unfinished run
+        :return: None
+        """
         self.reset_bar.emit(
             "Проверяем страницы",
             sum(
@@ -22,9 +53,9 @@ class ParseStep(TaskChainStep):
             )
         )
         self.start_task(
-            CheckUrls(links_by_login),
+            CheckUrls(links_by_login, resume=resume),
             {
-                "got_url": self.save_parsed_link,
+                "got_urls": self.save_parsed_links,
                 "finished": self.got_all_links
             }
         )
@@ -38,19 +69,57 @@ class ParseStep(TaskChainStep):
         :return: None
         """
         self.await()
+        if self.unsaved:
+            self.save_unsaved()
+            self.await()
         self.start_task(
             AggregateParsedLinks(),
             {"got_links": self.finished}
         )
 
-    @pyqtSlot(str, str, str)
-    def save_parsed_link(self, url, status, warning):
+    @pyqtSlot(list)
+    def save_parsed_links(self, pages: List[Tuple[str, str, str]]):
         """
-        Handler that fires after single page was parsed
-        It saves page and increments progressbar
+        Handler that fires after batch of pages was parsed
+        It saves pages unless other batch is being saved,
+        then pages are saved after it
+        :param pages: tuples of url, status code and warning text
         :return: None
         """
+        self.unsaved.extend(pages)
+        if not self.saving:
+            self.save_unsaved()
+
+    def save_unsaved(self):
+        """
+        Starts task saving all pages waiting to be saved
+        :return: None
+        """
+        pages, self.unsaved = self.unsaved, []
+        self.saving = True
         self.start_task(
-            SaveParsedLink(url, status, warning),
-            {"finished": self.increment_bar}
-        )
\ No newline at end of file
+            SaveParsedLinks(pages),
+            {"saved": self.links_saved, "finished": self.saving_finished}
+        )
+
+    @pyqtSlot(int)
+    def links_saved(self, count: int):
+        """
+        Handler that fires after batch of pages was saved
+        It increments progressbar by number of pages
+        :param count: number of saved pages
+        :return: None
+        """
+        for _ in range(count):
+            self.increment_bar.emit()
+
+    @pyqtSlot()
+    def saving_finished(self):
+        """
+        Handler that fires after saving task was finished
+        It saves pages that came while task was running
+        :return: None
+        """
+        self.saving = False
+        if self.unsaved:
+            self.save_unsaved()
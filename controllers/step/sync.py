@@ -0,0 +1,115 @@
+from typing import List, Tuple
+
+from PyQt5.QtCore import pyqtSlot, pyqtSignal
+
+from controllers.step.common import TaskChainStep
+from tasks.api.yandex_tasks import SyncDirectAccounts
+from tasks.db.sync import GetSyncState, SaveSyncedChanges, RestoreSnapshot
+
+
+class SyncStep(TaskChainStep):
+    """
+    Step replacing campaigns, ad groups, ads and links steps
+    in incremental mode:
+        - getting time of last sync of each client
+        - getting changes of accounts from api
+        - applying changes to synced copy of accounts
+        - saving synced accounts to DB and emitting their links
+        for the next step
+    Changes are applied by single task at a time, changes that come
+    while it runs are applied by the next one, so cache db is not
+    locked by many concurrent writers
+    """
+    finished = pyqtSignal(dict)
+
+    def __init__(self):
+        super().__init__()
+        self.login_token_pairs: List[Tuple[str, str]] = []
+        self.unsaved: List = []
+        self.saving: bool = False
+
+    @pyqtSlot(list)
+    def start(self, login_token_pairs: List[Tuple[str, str]]):
+        """
+        Start step
+        :param login_token_pairs: list of tuples (login, token)
+        :return: None
+        """
+        self.login_token_pairs = login_token_pairs
+        self.reset_bar.emit(
+            "Загружаем изменения из Директа",
+            len(login_token_pairs)
+        )
+        self.start_task(
+            GetSyncState([login for login, _ in login_token_pairs]),
+            {"got_state": self.sync}
+        )
+
+    @pyqtSlot(dict)
+    def sync(self, synced: dict):
+        """
+        Handler that fires after time of last sync was got from DB
+        and gets changes of accounts from API
+        :param synced: time of sync and synced campaigns by login
+        :return: None
+        """
+        self.start_task(
+            SyncDirectAccounts(self.login_token_pairs, synced),
+            {
+                "got_changes": self.save_changes,
+                "got_client": self.increment_bar,
+                "finished": self.got_all_changes
+            }
+        )
+
+    @pyqtSlot(object)
+    def save_changes(self, changes):
+        """
+        Handler that fires after changes of client account was
+        acquired from API, applies them to synced copy unless other
+        changes are being applied, then they are applied after them
+        :param changes: YaAPIDirectChanges of client
+        :return: None
+        """
+        self.unsaved.append(changes)
+        if not self.saving:
+            self.save_unsaved()
+
+    def save_unsaved(self):
+        """
+        Starts task applying all changes waiting to be applied
+        :return: None
+        """
+        changes, self.unsaved = self.unsaved, []
+        self.saving = True
+        self.start_task(
+            SaveSyncedChanges(changes),
+            {"finished": self.saving_finished}
+        )
+
+    @pyqtSlot()
+    def saving_finished(self):
+        """
+        Handler that fires after task applying changes was finished
+        It applies changes that came while task was running
+        :return: None
+        """
+        self.saving = False
+        if self.unsaved:
+            self.save_unsaved()
+
+    @pyqtSlot()
+    def got_all_changes(self):
+        """
+        Handler that fires after changes of all accounts was acquired
+        Await all saving tasks and then gets links for next stage
+        :return: None
+        """
+        self.await()
+        if self.unsaved:
+            self.save_unsaved()
+            self.await()
+        self.start_task(
+            RestoreSnapshot([login for login, _ in self.login_token_pairs]),
+            {"got_links": self.finished}
+        )
@@ -9,6 +9,7 @@ from typing import Tuple, List, Dict, Callable, Optional
 
 from PyQt5.QtCore import QObject, QThread, pyqtSlot, pyqtSignal
 
+from settings.config import YA_API_INCREMENTAL
 from controllers.common import WithViewMixin
 from controllers.step.common import TaskChainStep
 from controllers.step.client import ClientStep
@@ -17,11 +18,15 @@ from controllers.step.ad_group import AdGroupStep
 from controllers.step.ad import AdStep
 from controllers.step.link import LinkStep
 from controllers.step.parse import ParseStep
+from controllers.step.sync import SyncStep
+from tasks.crawling.tasks import LoadCheckpoint
 
 
 class PQTaskChainController(QObject, WithViewMixin):
     """
     Controller for task steps. Each step output is connected to next step input
+    In incremental mode accounts are synced by single step instead of
+    campaigns, ad groups, ads and links steps
     sots:
         reset_bar - resets progress bar to zero state
         increment bar - increments progress bar counter
@@ -46,22 +51,46 @@ class PQTaskChainController(QObject, WithViewMixin):
         self.ad_groups_step = AdGroupStep()
         self.ad_step = AdStep()
         self.link_step = LinkStep()
+        self.sync_step = SyncStep()
         self.parse_step = ParseStep()
 
-        self.connect_signals(self.clients_step, self.campaigns_step)
-        self.connect_signals(self.campaigns_step, self.ad_groups_step)
-        self.connect_signals(self.ad_groups_step, self.ad_step)
-        self.connect_signals(self.ad_step, self.link_step)
-        self.connect_signals(self.link_step, self.parse_step)
+        if YA_API_INCREMENTAL:
+            self.connect_signals(self.clients_step, self.sync_step)
+            self.connect_signals(self.sync_step, self.parse_step)
+        else:
+            self.connect_signals(self.clients_step, self.campaigns_step)
+            self.connect_signals(self.campaigns_step, self.ad_groups_step)
+            self.connect_signals(self.ad_groups_step, self.ad_step)
+            self.connect_signals(self.ad_step, self.link_step)
+            self.connect_signals(self.link_step, self.parse_step)
         self.connect_signals(self.parse_step)
 
     @pyqtSlot()
     def start(self):
         """
-        Slot that starts whole chain of tasks
+        Slot that starts whole chain of tasks,
+        if pages check was interrupted it is resumed instead
+        (checkpoint is loaded by task of parse step, chain continues
+        from its signal)
+        :return: None
+        """
+        self.parse_step.start_task(
+            LoadCheckpoint(),
+            {"got_pages": self.resume_or_start}
+        )
+
+    @pyqtSlot(dict)
+    def resume_or_start(self, links_by_login: Dict[str, List[str]]):
+        """
+        Resumes pages check if there are pages of unfinished run,
+        starts from clients step otherwise
+        :param links_by_login: links of unfinished run grouped by login
         :return: None
         """
-        self.clients_step.start()
+        if links_by_login:
+            self.parse_step.resume(links_by_login)
+        else:
+            self.clients_step.start()
 
     def connect_signals(self, step: TaskChainStep,
                         next_step: Optional[TaskChainStep] = None):
@@ -4,11 +4,13 @@ import os
 from PyQt5.Qt import QApplication
 
 from controllers.app import AppWidget
+from tasks.db.main import has_unfinished_crawl
 
 if __name__ == '__main__':
-    # remove old database if exists
+    # remove old database if exists,
+    # it is kept if pages check was interrupted to resume it
     db_path = os.path.join(os.path.curdir, "db.db")
-    if os.path.isfile(db_path):
+    if os.path.isfile(db_path) and not has_unfinished_crawl():
         os.remove(db_path)
 
     app = QApplication(sys.argv)
@@ -6,5 +6,9 @@ modules:
     campaign: db objects for yandex and google api campaigns
     ad_group: db objects for yandex and google api ad groups
     ad: db objects for yandex and google api ads
+    links: db objects for links sets, links and checked links
+    crawl_cache: db objects for page checks persisted between runs
+    crawl_jobs: db objects for pages checked by crawling workers
+    snapshot: db objects for synced copy of clients accounts
 """
 
@@ -33,6 +33,7 @@ class YandexCampaign(Base):
     __tablename__ = "ya_campaigns"
     id = Column(Integer, primary_key=True)
     name = Column(String)
+    state = Column(String, nullable=True)
     client_login = Column(String, ForeignKey("ya_clients.login"))
     ad_groups = relationship("YandexAdGroup", backref="campaign")
 
@@ -73,7 +74,8 @@ class YandexCampaign(Base):
             YandexCampaign(
                 id=campaign.id,
                 name=campaign.name,
-                client_login=campaign.client_login
+                client_login=campaign.client_login,
+                state=campaign.state
             )
             for campaign in campaigns
         ]
@@ -7,6 +7,12 @@ LoginTokenPair - type for pair of login and token (common key
 for Yandex API aggregated items
 
 engine - database engine object
+
+CacheBase - core orm class for items persisted between app runs
+
+cache_engine - engine of database persisted between app runs
+
+JobsBase - core orm class for items shared with crawling workers
 """
 
 from typing import Tuple
@@ -20,3 +26,12 @@ Base = declarative_base()
 LoginTokenPair = Tuple[str, str]
 
 engine = create_engine('sqlite:///db.db', echo=False)
+
+# database with items that should survive app restart
+# (db.db is removed on every start)
+CacheBase = declarative_base()
+cache_engine = create_engine('sqlite:///cache.db', echo=False)
+
+# tables shared with crawling workers, engine is created by url from
+# settings as database may be on other machine
+JobsBase = declarative_base()
@@ -0,0 +1,220 @@
+"""
+SQLAlchemy model for results of landing pages checks
+persisted between app runs
+Classes:
+    CrawlCacheEntry - model for result of single page check
+    CrawlCheckpoint - model for page of crawl run that can be resumed
+"""
+import json
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import Column, String, DateTime, Boolean
+
+from model.alchemy.common import CacheBase
+
+
+class CrawlCacheEntry(CacheBase):
+    """
+    DB model for cached result of page check
+    Class methods:
+        by_urls - gets entries of provided urls
+        store - saves result of page check
+        evict - removes oldest entries above size limit
+    properties:
+        url - normalized url of page
+        status - status code or error text
+        warning_text - warnings as single string
+        redirects - json list of [status code, url] pairs of redirects
+        checked_at - datetime of check
+        etag - ETag header of page
+        last_modified - Last-Modified header of page
+    """
+    __tablename__ = "crawl_cache"
+    url = Column(String, primary_key=True)
+    status = Column(String)
+    warning_text = Column(String)
+    redirects = Column(String)
+    checked_at = Column(DateTime, index=True)
+    etag = Column(String, nullable=True)
+    last_modified = Column(String, nullable=True)
+
+    @property
+    def redirect_chain(self)->List[Tuple[int, str]]:
+        return [tuple(path) for path in json.loads(self.redirects or "[]")]
+
+    def is_fresh(self, ttl: int)->bool:
+        """
+        Is entry checked not earlier than ttl seconds ago
+        :param ttl: seconds while entry is fresh
+        :return: True if entry is fresh
+        """
+        return self.checked_at >= datetime.now() - timedelta(seconds=ttl)
+
+    @classmethod
+    def by_urls(cls, session,
+                urls: Iterable[str])->Dict[str, "CrawlCacheEntry"]:
+        """
+        Gets entries for provided urls
+        :param session: SQLAlchemy session
+        :param urls: normalized urls
+        :return: dictionary with
+            keys - normalized urls
+            values - cached entries
+        """
+        urls = list(urls)
+        entries = {}
+        # sqlite can not bind too many variables in one query
+        for i in range(0, len(urls), 500):
+            query = session.query(CrawlCacheEntry).filter(
+                CrawlCacheEntry.url.in_(urls[i:i + 500])
+            )
+            entries.update((entry.url, entry) for entry in query)
+        return entries
+
+    @classmethod
+    def store(cls, session, url: str, status: str, warning: str,
+              redirects: List[Tuple[int, str]],
+              etag: Optional[str]=None, last_modified: Optional[str]=None):
+        """
+        Saves result of page check replacing previous one,
+        session is not committed, so many results can be saved at once
+        :param session: SQLAlchemy session
+        :param url: normalized url
+        :param status: status code or error text
+        :param warning: warnings as single string
+        :param redirects: (status code, url) pairs of redirects
+        :param etag: ETag header of page
+        :param last_modified: Last-Modified header of page
+        :return: None
+        """
+        session.merge(
+            CrawlCacheEntry(
+                url=url,
+                status=status,
+                warning_text=warning,
+                redirects=json.dumps(redirects),
+                checked_at=datetime.now(),
+                etag=etag,
+                last_modified=last_modified
+            )
+        )
+
+    @classmethod
+    def evict(cls, session, max_size: int):
+        """
+        Removes least recently checked entries so no more than
+        max_size entries are left
+        :param session: SQLAlchemy session
+        :param max_size: maximum of entries in cache
+        :return: None
+        """
+        oldest = session.query(CrawlCacheEntry.url) \
+            .order_by(CrawlCacheEntry.checked_at.desc()) \
+            .offset(max_size)
+        session.query(CrawlCacheEntry) \
+            .filter(CrawlCacheEntry.url.in_(oldest)) \
+            .delete(synchronize_session=False)
+        session.commit()
+
+
+class CrawlCheckpoint(CacheBase):
+    """
+    DB model for page of crawl run: pages of run are saved when
+    it starts and marked when checked, so run interrupted by app exit
+    or deadline is resumed from unchecked pages
+    Class methods:
+        save - replaces saved run with pages of new one
+        pages - gets all pages of saved run grouped by login
+        finished - gets checked pages of saved run
+        mark_done - marks page checked
+        is_unfinished - checks if saved run has unchecked pages
+        clear - removes saved run
+    properties:
+        url - url of page as provided
+        login - login of client page belongs to
+        key - normalized url of page
+        done - is page checked
+    """
+    __tablename__ = "crawl_checkpoint"
+    url = Column(String, primary_key=True)
+    login = Column(String)
+    key = Column(String, index=True)
+    done = Column(Boolean, default=False)
+
+    @classmethod
+    def save(cls, session, pages: Iterable[Tuple[str, str, str]]):
+        """
+        Replaces saved run with new one
+        :param session: SQLAlchemy session
+        :param pages: url, login and normalized url of each page
+        :return: None
+        """
+        session.query(CrawlCheckpoint).delete(synchronize_session=False)
+        session.bulk_save_objects([
+            CrawlCheckpoint(url=url, login=login, key=key, done=False)
+            for url, login, key in pages
+        ])
+        session.commit()
+
+    @classmethod
+    def pages(cls, session)->Dict[str, List[str]]:
+        """
+        Gets all pages of saved run
+        :param session: SQLAlchemy session
+        :return: dictionary where
+            keys - clients logins
+            values - lists of urls belonging to one client
+        """
+        pages_by_login = {}
+        for url, login in session.query(
+                CrawlCheckpoint.url, CrawlCheckpoint.login
+        ):
+            pages_by_login.setdefault(login, []).append(url)
+        return pages_by_login
+
+    @classmethod
+    def finished(cls, session)->Set[str]:
+        """
+        Gets checked pages of saved run
+        :param session: SQLAlchemy session
+        :return: normalized urls of checked pages
+        """
+        return {
+            key for key, in session.query(CrawlCheckpoint.key)
+            .filter(CrawlCheckpoint.done.is_(True))
+        }
+
+    @classmethod
+    def mark_done(cls, session, key: str):
+        """
+        Marks page checked, session is not committed, so it is
+        committed together with result of page
+        :param session: SQLAlchemy session
+        :param key: normalized url of page
+        :return: None
+        """
+        session.query(CrawlCheckpoint) \
+            .filter(CrawlCheckpoint.key == key) \
+            .update({CrawlCheckpoint.done: True}, synchronize_session=False)
+
+    @classmethod
+    def is_unfinished(cls, session)->bool:
+        """
+        Checks if saved run has unchecked pages
+        :param session: SQLAlchemy session
+        :return: True if run should be resumed
+        """
+        return session.query(CrawlCheckpoint) \
+            .filter(CrawlCheckpoint.done.is_(False)) \
+            .first() is not None
+
+    @classmethod
+    def clear(cls, session):
+        """
+        Removes saved run
+        :param session: SQLAlchemy session
+        :return: None
+        """
+        session.query(CrawlCheckpoint).delete(synchronize_session=False)
+        session.commit()
@@ -0,0 +1,258 @@
+"""
+SQLAlchemy model for pages checked by crawling workers
+(possibly on other machines)
+Classes:
+    CrawlJob - model for check of single page
+"""
+import json
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, \
+    or_, and_
+
+from model.alchemy.common import JobsBase
+
+
+class CrawlJob(JobsBase):
+    """
+    DB model for check of single page
+    Job lifecycle:
+        queued - job is enqueued by app and waits for worker
+        leased - worker took job, worker prolongs lease while checks
+        page, if lease expires job is queued again (and failed after
+        max_attempts leases)
+        done - result of check is saved, app collects it
+    Class methods:
+        enqueue - adds jobs for pages of single run
+        lease - takes queued and expired jobs for worker
+        heartbeat - prolongs lease of worker jobs
+        complete - saves results of checks
+        collect - gets results not collected yet
+        pending - counts jobs of run that are not done
+        clear - removes all jobs of run
+    properties:
+        id - id of job
+        run_id - id of app run that enqueued job
+        login - login of client page belongs to
+        url - url of page
+        priority - importance of page, higher is leased earlier
+        state - queued, leased or done
+        worker - id of worker that leased job
+        lease_expires - datetime when lease expires (UTC)
+        attempts - number of leases
+        etag - ETag of page checked earlier, then ETag of checked page
+        last_modified - Last-Modified of page checked earlier,
+        then Last-Modified of checked page
+        status - status code or error text
+        warning_text - warnings as single string
+        redirects - json list of [status code, url] pairs of redirects
+        collected - is result taken by app
+    """
+    __tablename__ = "crawl_jobs"
+    id = Column(Integer, primary_key=True)
+    run_id = Column(String, index=True)
+    login = Column(String)
+    url = Column(String)
+    priority = Column(Float, default=0.0)
+    state = Column(String, index=True, default="queued")
+    worker = Column(String, nullable=True)
+    lease_expires = Column(DateTime, nullable=True)
+    attempts = Column(Integer, default=0)
+    etag = Column(String, nullable=True)
+    last_modified = Column(String, nullable=True)
+    status = Column(String, nullable=True)
+    warning_text = Column(String, nullable=True)
+    redirects = Column(String, nullable=True)
+    collected = Column(Boolean, default=False)
+
+    @property
+    def redirect_chain(self)->List[Tuple[int, str]]:
+        return [tuple(path) for path in json.loads(self.redirects or "[]")]
+
+    @classmethod
+    def enqueue(cls, session, run_id: str,
+                pages_by_login: Dict[str, List[str]],
+                validators: Dict[str, Tuple[Optional[str], Optional[str]]],
+                priorities: Dict[str, float]):
+        """
+        Adds jobs for all pages of run
+        :param session: SQLAlchemy session
+        :param run_id: id of app run
+        :param pages_by_login: dictionary where
+            keys - clients logins
+            values - lists of urls belonging to one client
+        :param validators: ETag and Last-Modified of pages checked
+        earlier by url
+        :param priorities: priorities of pages by url
+        :return: None
+        """
+        session.bulk_save_objects([
+            CrawlJob(
+                run_id=run_id, login=login, url=url, state="queued",
+                priority=priorities.get(url, 0.0),
+                attempts=0, collected=False,
+                etag=validators.get(url, (None, None))[0],
+                last_modified=validators.get(url, (None, None))[1]
+            )
+            for login, pages in pages_by_login.items()
+            for url in pages
+        ])
+        session.commit()
+
+    @classmethod
+    def lease(cls, session, worker: str, limit: int, lease: float,
+              max_attempts: int)->List["CrawlJob"]:
+        """
+        Takes most important queued jobs and jobs with expired lease
+        for worker, jobs leased max_attempts times are failed instead.
+        Jobs are taken by conditional update, so two workers
+        never get the same job
+        :param session: SQLAlchemy session
+        :param worker: id of worker
+        :param limit: maximum of jobs taken
+        :param lease: seconds while jobs are kept by worker
+        :param max_attempts: leases of job before it is failed
+        :return: leased jobs
+        """
+        now = datetime.utcnow()
+        available = or_(
+            CrawlJob.state == "queued",
+            and_(CrawlJob.state == "leased", CrawlJob.lease_expires < now)
+        )
+        session.query(CrawlJob) \
+            .filter(available, CrawlJob.attempts >= max_attempts) \
+            .update(
+                {
+                    CrawlJob.state: "done",
+                    CrawlJob.status: "Crawling worker failed",
+                    CrawlJob.warning_text: "",
+                    CrawlJob.redirects: "[]"
+                },
+                synchronize_session=False
+            )
+        ids = [
+            job_id for job_id, in session.query(CrawlJob.id)
+            .filter(available)
+            .order_by(CrawlJob.priority.desc(), CrawlJob.id)
+            .limit(limit)
+        ]
+        if ids:
+            session.query(CrawlJob) \
+                .filter(CrawlJob.id.in_(ids), available) \
+                .update(
+                    {
+                        CrawlJob.state: "leased",
+                        CrawlJob.worker: worker,
+                        CrawlJob.lease_expires: now + timedelta(
+                            seconds=lease
+                        ),
+                        CrawlJob.attempts: CrawlJob.attempts + 1
+                    },
+                    synchronize_session=False
+                )
+        session.commit()
+        if not ids:
+            return []
+        return session.query(CrawlJob).filter(
+            CrawlJob.id.in_(ids),
+            CrawlJob.state == "leased",
+            CrawlJob.worker == worker
+        ).all()
+
+    @classmethod
+    def heartbeat(cls, session, worker: str, ids: Iterable[int],
+                  lease: float):
+        """
+        Prolongs lease of jobs still leased by worker
+        :param session: SQLAlchemy session
+        :param worker: id of worker
+        :param ids: ids of jobs
+        :param lease: seconds while jobs are kept by worker
+        :return: None
+        """
+        ids = list(ids)
+        for i in range(0, len(ids), 500):
+            session.query(CrawlJob).filter(
+                CrawlJob.id.in_(ids[i:i + 500]),
+                CrawlJob.state == "leased",
+                CrawlJob.worker == worker
+            ).update(
+                {
+                    CrawlJob.lease_expires:
+                        datetime.utcnow() + timedelta(seconds=lease)
+                },
+                synchronize_session=False
+            )
+        session.commit()
+
+    @classmethod
+    def complete(cls, session, results: List[Tuple[int, object]]):
+        """
+        Saves results of checks, result of job done by other worker
+        (after lease expired) is skipped
+        :param session: SQLAlchemy session
+        :param results: pairs of job id and PageCheck
+        :return: None
+        """
+        for job_id, page in results:
+            session.query(CrawlJob).filter(
+                CrawlJob.id == job_id,
+                CrawlJob.state != "done"
+            ).update(
+                {
+                    CrawlJob.state: "done",
+                    CrawlJob.status: page.status,
+                    CrawlJob.warning_text: page.warnings,
+                    CrawlJob.redirects: json.dumps(page.redirects),
+                    CrawlJob.etag: page.etag,
+                    CrawlJob.last_modified: page.last_modified
+                },
+                synchronize_session=False
+            )
+        session.commit()
+
+    @classmethod
+    def collect(cls, session, run_id: str)->List["CrawlJob"]:
+        """
+        Gets done jobs of run that are not collected yet
+        and marks them collected
+        :param session: SQLAlchemy session
+        :param run_id: id of app run
+        :return: done jobs
+        """
+        jobs = session.query(CrawlJob).filter(
+            CrawlJob.run_id == run_id,
+            CrawlJob.state == "done",
+            CrawlJob.collected.is_(False)
+        ).all()
+        for job in jobs:
+            job.collected = True
+        session.commit()
+        return jobs
+
+    @classmethod
+    def pending(cls, session, run_id: str)->int:
+        """
+        Counts jobs of run that are not done
+        :param session: SQLAlchemy session
+        :param run_id: id of app run
+        :return: number of jobs
+        """
+        return session.query(CrawlJob).filter(
+            CrawlJob.run_id == run_id,
+            CrawlJob.state != "done"
+        ).count()
+
+    @classmethod
+    def clear(cls, session, run_id: str):
+        """
+        Removes all jobs of run
+        :param session: SQLAlchemy session
+        :param run_id: id of app run
+        :return: None
+        """
+        session.query(CrawlJob) \
+            .filter(CrawlJob.run_id == run_id) \
+            .delete(synchronize_session=False)
+        session.commit()
@@ -6,7 +6,7 @@ Classes:
     YandexLink -  model for link from link set from Yandex API
     LinkUrl - model for link checked by crawler
 """
-from typing import Tuple, List, Dict
+from typing import Tuple, List, Dict, Set
 
 from sqlalchemy import Column, Integer, String, ForeignKey, Sequence
 from sqlalchemy.orm import relationship
@@ -121,6 +121,7 @@ class LinkUrl(Base):
     Class methods:
         aggregate_links - maps all links by some criteria
         by_logins - gets all links grouped by login
+        ads_stats - gets number of ads and campaigns state for links
     """
     __tablename__ = "link_urls"
     url = Column(String, primary_key=True)
@@ -128,18 +129,20 @@ class LinkUrl(Base):
     warning_text = Column(String)
 
     @classmethod
-    def from_response(cls, session, url: str, status: str, warning: str):
+    def from_responses(cls, session, pages: List[Tuple[str, str, str]]):
         """
-        Creates single entity from provided data
+        Creates entities from provided data with single commit, entity
+        of the same url is replaced (page may be emitted again
+        by resumed run)
         :param session: SQLAlchemy session
-        :param url: url of parsed page
-        :param status: status code of page
-        :param warning: warning text to be displayed
+        :param pages: tuples of url, status code and warning text
+        of parsed pages
         :return: None
         """
-        session.add(
-            LinkUrl(url=url, status=status, warning_text=warning)
-        )
+        for url, status, warning in pages:
+            session.merge(
+                LinkUrl(url=url, status=status, warning_text=warning)
+            )
         session.commit()
 
     @classmethod
@@ -172,17 +175,47 @@ class LinkUrl(Base):
             .join(YandexCampaign)
         links_query = main_links_query.union(additional_links_query)
         links_by_logins = {}
-        all_links = []
+        all_links = set()
 
         for link, login, token in links_query.all():
             if link is not None and link not in all_links:
-                all_links.append(link)
+                all_links.add(link)
                 if login in links_by_logins:
                     links_by_logins[login].append(link)
                 else:
                     links_by_logins[login] = [link]
         return links_by_logins
 
+    @classmethod
+    def ads_stats(cls, session)->Dict[str, Tuple[int, bool]]:
+        """
+        Gets how many ads reference each link (as main or additional
+        link) and whether any of them is in campaign that is on
+        :param session: SQLAlchemy session
+        :return: dictionary with
+            keys - links
+            values - number of ads and is any campaign on
+        """
+        main_links_query = session \
+            .query(YandexAd.url, YandexAd.id, YandexCampaign.state) \
+            .join(YandexAdGroup) \
+            .join(YandexCampaign)
+        additional_links_query = session \
+            .query(YandexLink.url, YandexAd.id, YandexCampaign.state) \
+            .join(YandexLinksSet) \
+            .join(YandexAd) \
+            .join(YandexAdGroup) \
+            .join(YandexCampaign)
+        ads: Dict[str, Set[int]] = {}
+        active: Set[str] = set()
+        for link, ad, state in main_links_query.union(additional_links_query):
+            if link is None:
+                continue
+            ads.setdefault(link, set()).add(ad)
+            if state == "ON":
+                active.add(link)
+        return {link: (len(ids), link in active) for link, ids in ads.items()}
+
     @classmethod
     def aggregate_links(cls, session, criteria, kind: str)-> List[ParsedLink]:
         """
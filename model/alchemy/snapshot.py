@@ -0,0 +1,230 @@
+"""
+SQLAlchemy model for copy of clients accounts persisted between app runs,
+so only changes of accounts are fetched from API (see SyncDirectAccounts)
+Classes:
+    SyncState - model for time of last sync of client account
+    SnapshotCampaign - model for synced campaign
+    SnapshotAdGroup - model for synced ad group
+    SnapshotAd - model for synced ad
+    SnapshotLinksSet - model for synced links set
+"""
+import json
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import Column, Integer, String
+
+from model.alchemy.common import CacheBase
+from model.api_items.yandex import YaAPIDirectCampaign, YaAPIDirectAdGroup, \
+    YaAPIDirectAd, YaAPIDirectLinksSet
+
+
+def chunks(ids: Iterable[int], size: int=500)->Iterable[List[int]]:
+    """
+    Internal function that splits ids to chunks, so query parameters
+    stay in SQLite limits
+    :param ids: ids
+    :param size: maximum of ids in chunk
+    :return: chunks of ids
+    """
+    ids = list(ids)
+    return (ids[i:i + size] for i in range(0, len(ids), size))
+
+
+class SnapshotCampaign(CacheBase):
+    """
+    DB model for synced campaign
+    properties are the same as of YandexCampaign
+    """
+    __tablename__ = "snapshot_campaigns"
+    id = Column(Integer, primary_key=True)
+    name = Column(String)
+    state = Column(String, nullable=True)
+    client_login = Column(String, index=True)
+
+
+class SnapshotAdGroup(CacheBase):
+    """
+    DB model for synced ad group
+    properties are the same as of YandexAdGroup
+    """
+    __tablename__ = "snapshot_ad_groups"
+    id = Column(Integer, primary_key=True)
+    name = Column(String)
+    campaign_id = Column(Integer, index=True)
+
+
+class SnapshotAd(CacheBase):
+    """
+    DB model for synced ad
+    properties are the same as of YandexAd
+    """
+    __tablename__ = "snapshot_ads"
+    id = Column(Integer, primary_key=True)
+    url = Column(String, nullable=True)
+    group_id = Column(Integer, index=True)
+    links_set_id = Column(Integer, nullable=True)
+
+
+class SnapshotLinksSet(CacheBase):
+    """
+    DB model for synced links set
+    properties:
+        id - links set id
+        links - json list of urls of links
+    """
+    __tablename__ = "snapshot_links_sets"
+    id = Column(Integer, primary_key=True)
+    links = Column(String)
+
+
+class SyncState(CacheBase):
+    """
+    DB model for time of last sync of client account
+    Class methods:
+        by_logins - gets times of sync and synced campaigns of clients
+        merge - applies changes of client account to synced copy
+        restore - gets synced accounts of clients as API items
+    properties:
+        login - client login
+        timestamp - time of 'changes' service to sync from next time
+    """
+    __tablename__ = "sync_state"
+    login = Column(String, primary_key=True)
+    timestamp = Column(String)
+
+    @classmethod
+    def by_logins(cls, session, logins: Iterable[str])\
+            ->Dict[str, Tuple[str, List[int]]]:
+        """
+        Gets times of last sync and ids of synced campaigns of clients
+        :param session: SQLAlchemy session of cache db
+        :param logins: clients logins
+        :return: dictionary with
+            keys - logins of synced clients
+            values - timestamp of sync and ids of campaigns
+        """
+        logins = list(logins)
+        synced = {
+            state.login: (state.timestamp, [])
+            for state in session.query(SyncState)
+            .filter(SyncState.login.in_(logins))
+        }
+        campaigns = session \
+            .query(SnapshotCampaign.id, SnapshotCampaign.client_login) \
+            .filter(SnapshotCampaign.client_login.in_(list(synced)))
+        for campaign_id, login in campaigns:
+            synced[login][1].append(campaign_id)
+        return synced
+
+    @classmethod
+    def merge(cls, session, changes):
+        """
+        Applies changes of client account to synced copy:
+        campaigns that are not in account are removed with their children,
+        children of reloaded campaigns are replaced, changed items
+        are updated and removed items are deleted
+        :param session: SQLAlchemy session of cache db
+        :param changes: YaAPIDirectChanges of client
+        :return: None
+        """
+        ids = {campaign.id for campaign in changes.campaigns}
+        gone = [
+            campaign_id for campaign_id, in session
+            .query(SnapshotCampaign.id)
+            .filter(SnapshotCampaign.client_login == changes.login)
+            if campaign_id not in ids
+        ]
+        for chunk in chunks(gone):
+            session.query(SnapshotCampaign) \
+                .filter(SnapshotCampaign.id.in_(chunk)) \
+                .delete(synchronize_session=False)
+        for chunk in chunks(gone + changes.reloaded):
+            groups = session.query(SnapshotAdGroup.id) \
+                .filter(SnapshotAdGroup.campaign_id.in_(chunk))
+            session.query(SnapshotAd) \
+                .filter(SnapshotAd.group_id.in_(groups.subquery())) \
+                .delete(synchronize_session=False)
+            session.query(SnapshotAdGroup) \
+                .filter(SnapshotAdGroup.campaign_id.in_(chunk)) \
+                .delete(synchronize_session=False)
+        for chunk in chunks(changes.removed_ad_groups):
+            session.query(SnapshotAd) \
+                .filter(SnapshotAd.group_id.in_(chunk)) \
+                .delete(synchronize_session=False)
+            session.query(SnapshotAdGroup) \
+                .filter(SnapshotAdGroup.id.in_(chunk)) \
+                .delete(synchronize_session=False)
+        for chunk in chunks(changes.removed_ads):
+            session.query(SnapshotAd) \
+                .filter(SnapshotAd.id.in_(chunk)) \
+                .delete(synchronize_session=False)
+
+        for campaign in changes.campaigns:
+            session.merge(SnapshotCampaign(
+                id=campaign.id,
+                name=campaign.name,
+                state=campaign.state,
+                client_login=campaign.client_login
+            ))
+        for group in changes.ad_groups:
+            session.merge(SnapshotAdGroup(
+                id=group.id,
+                name=group.name,
+                campaign_id=group.campaign_id
+            ))
+        for ad in changes.ads:
+            session.merge(SnapshotAd(
+                id=ad.id,
+                url=ad.url,
+                group_id=ad.group_id,
+                links_set_id=ad.links_set
+            ))
+        for links_set in changes.links_sets:
+            session.merge(SnapshotLinksSet(
+                id=links_set.id,
+                links=json.dumps(links_set.links)
+            ))
+        session.merge(SyncState(login=changes.login,
+                                timestamp=changes.timestamp))
+        session.commit()
+
+    @classmethod
+    def restore(cls, session, logins: Iterable[str])\
+            ->Tuple[List[YaAPIDirectCampaign], List[YaAPIDirectAdGroup],
+                    List[YaAPIDirectAd], List[YaAPIDirectLinksSet]]:
+        """
+        Gets synced accounts of clients
+        :param session: SQLAlchemy session of cache db
+        :param logins: clients logins
+        :return: campaigns, ad groups, ads and links sets of clients
+        """
+        logins = list(logins)
+        campaigns = session.query(SnapshotCampaign) \
+            .filter(SnapshotCampaign.client_login.in_(logins))
+        groups = session.query(SnapshotAdGroup) \
+            .join(SnapshotCampaign,
+                  SnapshotCampaign.id == SnapshotAdGroup.campaign_id) \
+            .filter(SnapshotCampaign.client_login.in_(logins))
+        ads = session.query(SnapshotAd) \
+            .join(SnapshotAdGroup, SnapshotAdGroup.id == SnapshotAd.group_id) \
+            .join(SnapshotCampaign,
+                  SnapshotCampaign.id == SnapshotAdGroup.campaign_id) \
+            .filter(SnapshotCampaign.client_login.in_(logins))
+        sets = session.query(SnapshotLinksSet) \
+            .join(SnapshotAd, SnapshotAd.links_set_id == SnapshotLinksSet.id) \
+            .join(SnapshotAdGroup, SnapshotAdGroup.id == SnapshotAd.group_id) \
+            .join(SnapshotCampaign,
+                  SnapshotCampaign.id == SnapshotAdGroup.campaign_id) \
+            .filter(SnapshotCampaign.client_login.in_(logins)) \
+            .distinct()
+        return (
+            YaAPIDirectCampaign.from_db_items(campaigns),
+            YaAPIDirectAdGroup.from_db_items(groups),
+            YaAPIDirectAd.from_db_items(ads),
+            [
+                YaAPIDirectLinksSet(
+                    id=links_set.id, links=json.loads(links_set.links)
+                )
+                for links_set in sets
+            ]
+        )
@@ -8,13 +8,32 @@ Classes:
     YaAPIDirectAdGroup - wrapper for group of ads
     YaAPIDirectAd - wrapper for ad
     YaAPIDirectLinksSet - wrapper for set of links
+Data-wrappers:
+    YaAPIDirectChanges - changes of client account since last sync
 """
 
 
+from collections import namedtuple
 from typing import Optional, List
 from datetime import datetime
 
 
+# login - client login
+# timestamp - time of 'changes' service to sync from next time
+# campaigns - all YaAPIDirectCampaigns of client
+# reloaded - ids of campaigns all ad groups and ads of which are provided
+# ad_groups - YaAPIDirectAdGroups of reloaded campaigns and changed ones
+# ads - YaAPIDirectAds of reloaded campaigns and changed ones
+# links_sets - YaAPIDirectLinksSets of provided ads
+# removed_ad_groups - ids of deleted ad groups
+# removed_ads - ids of deleted ads
+YaAPIDirectChanges = namedtuple(
+    "YaAPIDirectChanges",
+    "login timestamp campaigns reloaded ad_groups ads links_sets "
+    "removed_ad_groups removed_ads"
+)
+
+
 class YaAPIDirectClient:
     """
     Simple wrapper for client item from Yandex Direct API
@@ -80,18 +99,22 @@ class YaAPIDirectCampaign:
         id - campaign id
         name - campaign name
         client_login - login of client to which campaign belongs
+        state - state of campaign (ON, OFF, SUSPENDED, ENDED...)
     classmethods:
         from_api_answer - create bunch of items from API answer
     """
-    def __init__(self, id: int, name: str, client_login: str):
+    def __init__(self, id: int, name: str, client_login: str,
+                 state: Optional[str]=None):
         """
         :param id: campaign id
         :param name: campaign name
         :param client_login: login of client to which campaign belongs
+        :param state: state of campaign
         """
         self.id = id
         self.name = name
         self.client_login = client_login
+        self.state = state
 
     @classmethod
     def from_api_answer(cls, login, campaigns: Optional[List])-> List:
@@ -106,7 +129,8 @@ class YaAPIDirectCampaign:
                 YaAPIDirectCampaign(
                     id=campaign["Id"],
                     name=campaign["Name"],
-                    client_login=login
+                    client_login=login,
+                    state=campaign.get("State")
                 )
                 for campaign in campaigns
             ]
@@ -123,7 +147,8 @@ class YaAPIDirectCampaign:
             YaAPIDirectCampaign(
                 id=db_campaign.id,
                 name=db_campaign.name,
-                client_login=db_campaign.client_login
+                client_login=db_campaign.client_login,
+                state=db_campaign.state
             )
             for db_campaign in db_campaigns
         ]
@@ -1,3 +1,55 @@
 ﻿YA_DIRECT_TOKEN = "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA"
 YA_DIRECT_URL = "https://api.direct.yandex.com/json/v5/"
-# YA_DIRECT_URL = "https://api-sandbox.direct.yandex.com/json/v5/"
\ No newline at end of file
+# YA_DIRECT_URL = "https://api-sandbox.direct.yandex.com/json/v5/"
+
+# crawler settings
+CRAWLER_CONCURRENCY = 200  # requests in flight across all hosts
+CRAWLER_HOST_CONCURRENCY = 4  # requests in flight to a single registered domain
+CRAWLER_HOST_MIN_GAP = 0.5  # seconds between requests to a single registered domain
+CRAWLER_HEAD_FIRST = True  # probe pages with HEAD before falling back to GET
+CRAWLER_GET_LIMIT = 64 * 1024  # bytes of page body read by GET
+CRAWLER_CACHE_TTL = 12 * 60 * 60  # seconds while page check result is reused
+CRAWLER_CACHE_SIZE = 200_000  # maximum of page check results kept
+# query parameters ignored when equivalent urls are found,
+# names ending with * are prefixes; only names used solely for tracking
+# belong here ("from", "ref" and alike may select content of page)
+CRAWLER_TRACKING_PARAMS = [
+    "utm_*", "yclid", "gclid", "fbclid", "_openstat", "roistat*"
+]
+CRAWLER_REDIRECT_TTL = 10 * 60  # seconds while redirect hop is reused
+CRAWLER_MAX_REDIRECTS = 10  # redirects followed for a single page
+CRAWLER_KEEPALIVE = 30  # seconds while idle connection to host is kept
+CRAWLER_DNS_TTL = 5 * 60  # seconds while resolved host address is reused
+CRAWLER_DNS_NEGATIVE_TTL = 60  # seconds while not existing host is reused
+CRAWLER_BREAKER_THRESHOLD = 5  # connection failures stopping requests to host
+CRAWLER_BREAKER_COOLDOWN = 60  # seconds till stopped host is probed again
+CRAWLER_CONNECT_TIMEOUT = 10  # seconds to connect to host
+CRAWLER_READ_TIMEOUT = 20  # seconds to wait for data from host
+CRAWLER_PAGE_BUDGET = 60  # seconds to check page including all redirects
+CRAWLER_RETRIES = 3  # retries of page after transient failure
+CRAWLER_RETRY_BASE_DELAY = 1  # seconds before first retry, doubled each time
+CRAWLER_RETRY_MAX_DELAY = 60  # maximal seconds before retry
+CRAWLER_PROCESSES = 1  # processes checking pages, pages and CRAWLER_CONCURRENCY are split between them by host
+# SQLAlchemy url of job table shared with crawling workers (see worker.py),
+# as "sqlite:////mnt/share/jobs.db", if set pages are checked by workers
+CRAWLER_JOBS_DB = None
+CRAWLER_JOB_BATCH = 500  # pages leased by worker at once
+CRAWLER_JOB_LEASE = 2 * 60  # seconds while leased page is not given to others
+CRAWLER_JOB_ATTEMPTS = 3  # leases of page before it is reported as failed
+CRAWLER_JOB_POLL = 2  # seconds between polls of job table
+CRAWLER_CONTENT_CHECK = False  # compare page content with error pages of its host
+CRAWLER_FINGERPRINT_LIMIT = 16 * 1024  # characters of page text hashed
+CRAWLER_RUN_DEADLINE = None  # seconds of checking pages per run, the rest is checked after restart
+CRAWLER_TRANSPORT = "aiohttp"  # "aiohttp" (HTTP/1.1) or "http2" (needs httpx[http2])
+CRAWLER_H2_HOST_CONCURRENCY = 16  # requests in flight to a single registered domain with "http2" transport
+CRAWLER_H2_HOST_MIN_GAP = 0.1  # seconds between requests to a single registered domain with "http2" transport
+
+# Yandex Direct API settings
+YA_API_WORKERS = 16  # API requests in flight across all clients
+YA_API_TOKEN_WORKERS = 4  # API requests in flight with a single token
+YA_API_UNITS_RESERVE = 100  # API units of client left unspent
+YA_API_UNITS_RECHECK = 60  # seconds of pause on short units till they are rechecked
+YA_API_UNITS_MAX_WAIT = 60 * 60  # seconds request waits for units before failing
+YA_API_INCREMENTAL = False  # fetch only objects changed since last run ("changes" service)
+YA_API_POOL_SIZE = 16  # connections to API kept alive
+YA_API_GZIP_REQUESTS = False  # gzip bodies of API requests (responses are always gzipped)
@@ -3,4 +3,5 @@ Tasks that run in separate thread
 modules:
     api - module for interactions with Yandex and Google API 
     db - module for interactions with database
+    crawling - module for checking landing pages
 """
\ No newline at end of file
@@ -1,7 +1,10 @@
 """
 Tasks related to API of Yandex and Google
 modules:
+    budget: API units shared by all requests
     errors: exceptions, defined for tasks
+    pool: thread pool fetching many clients concurrently
+    session: HTTP session keeping connections to API alive
     yandex_tasks: tasks related to Yandex API
     yandex_utils: low level functions for Yandex API
 """
\ No newline at end of file
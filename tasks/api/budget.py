@@ -0,0 +1,204 @@
+"""
+Budget of Yandex Direct API units (points) shared by all tasks
+Every API request reserves estimated cost of its service before it is
+sent, and remained units reported by response are recorded, so
+requests wait instead of failing when units are about to run out.
+Units belong to advertiser, so they are tracked by client login
+(by token for requests of agency itself).
+Classes:
+    UnitsBudget - remained units and costs of requests
+Variables:
+    units_budget - budget shared by all API requests
+"""
+
+import threading
+import time
+from heapq import heappush, heapify
+from itertools import count
+from typing import Dict, List, Optional, Tuple
+
+from settings.config import YA_API_UNITS_RESERVE, YA_API_UNITS_RECHECK, \
+    YA_API_UNITS_MAX_WAIT
+from tasks.api.errors import YaApiNoUnits
+
+
+# initial estimates of units spent by 'get' request of service
+# (base cost of call and cost of returned items), refined by responses
+DEFAULT_COSTS = {
+    "agencyclients": 10,
+    "campaigns": 11,
+    "adgroups": 16,
+    "ads": 16,
+    "sitelinks": 16,
+    "changes": 10,
+}
+
+# cost estimate of services missing in DEFAULT_COSTS
+UNKNOWN_COST = 20
+
+# priorities of services: when units are short waiting requests of
+# more important services are sent first
+SERVICE_PRIORITIES = {
+    "agencyclients": 5,
+    "changes": 4,
+    "campaigns": 3,
+    "ads": 2,
+    "adgroups": 1,
+    "sitelinks": 0,
+}
+
+# weight of last request in average cost of service
+COST_WEIGHT = 0.2
+
+
+class UnitsBudget:
+    """
+    Remained units of each advertiser and average costs of services.
+    Request is sent when remained units minus units reserved by
+    requests in flight leave reserve after its estimated cost,
+    otherwise it waits, requests with higher priority go first.
+    Units are restored by API over time, but only responses report them,
+    so if advertiser is paused for recheck seconds with no requests in
+    flight single request is sent to refresh remained units.
+    Request waiting longer than max_wait raises YaApiNoUnits.
+    Usage:
+        cost = budget.acquire(key, service)
+        units = None
+        try:
+            ... send request, units = units of response ...
+        finally:
+            budget.release(key, service, cost, units)
+    """
+    def __init__(self, reserve: int=YA_API_UNITS_RESERVE,
+                 recheck: float=YA_API_UNITS_RECHECK,
+                 max_wait: float=YA_API_UNITS_MAX_WAIT):
+        """
+        :param reserve: units left unspent
+        :param recheck: seconds of pause till units are refreshed
+        :param max_wait: seconds request may wait for units
+        """
+        self.reserve = reserve
+        self.recheck = recheck
+        self.max_wait = max_wait
+
+        self.__condition = threading.Condition()
+        # guards state below, notified when units change
+
+        self.__remains: Dict[str, int] = {}
+        # remained units reported by last response by advertiser
+
+        self.__updated: Dict[str, float] = {}
+        # time when remained units of advertiser were reported
+
+        self.__reserved: Dict[str, float] = {}
+        # estimated cost of requests in flight by advertiser
+
+        self.__in_flight: Dict[str, int] = {}
+        # number of requests in flight by advertiser
+
+        self.__costs: Dict[str, float] = dict(DEFAULT_COSTS)
+        # average cost of request by service
+
+        self.__waiting: Dict[str, List[Tuple[float, int]]] = {}
+        # heaps of (-priority, order) of waiting requests by advertiser
+
+        self.__order = count()
+        # order of requests, equal priorities are sent first come
+
+    def estimate(self, service: str)->float:
+        """
+        Gets estimated cost of request
+        :param service: url part of API service
+        :return: units
+        """
+        with self.__condition:
+            return self.__costs.get(service, UNKNOWN_COST)
+
+    def available(self, key: str)->Optional[float]:
+        """
+        Gets units of advertiser not reserved by requests in flight
+        :param key: client login or token
+        :return: units, None if units were not reported yet
+        """
+        with self.__condition:
+            if key not in self.__remains:
+                return None
+            return self.__remains[key] - self.__reserved.get(key, 0)
+
+    def affordable(self, key: str, cost: float)->bool:
+        """
+        Inner method checking if request may be sent (called with lock)
+        :param key: client login or token
+        :param cost: estimated cost of request
+        :return: True if request may be sent
+        """
+        if key not in self.__remains:
+            return True
+        left = self.__remains[key] - self.__reserved.get(key, 0) - cost
+        if left >= self.reserve:
+            return True
+        # remained units are stale, one request refreshes them
+        return not self.__in_flight.get(key) \
+            and time.monotonic() - self.__updated[key] >= self.recheck
+
+    def acquire(self, key: str, service: str,
+                priority: Optional[float]=None)->float:
+        """
+        Waits till request may be sent and reserves its cost
+        :param key: client login or token
+        :param service: url part of API service
+        :param priority: priority of request, priority of service
+        if not provided
+        :return: reserved units
+        """
+        if priority is None:
+            priority = SERVICE_PRIORITIES.get(service, 0)
+        deadline = time.monotonic() + self.max_wait
+        with self.__condition:
+            cost = self.__costs.get(service, UNKNOWN_COST)
+            waiting = self.__waiting.setdefault(key, [])
+            entry = (-priority, next(self.__order))
+            heappush(waiting, entry)
+            try:
+                while waiting[0] != entry or not self.affordable(key, cost):
+                    left = deadline - time.monotonic()
+                    if left <= 0:
+                        raise YaApiNoUnits(
+                            f"No API units left for {key}, "
+                            f"remains: {self.__remains.get(key)}, "
+                            f"request needs about {cost:.0f}"
+                        )
+                    self.__condition.wait(min(left, self.recheck))
+            finally:
+                waiting.remove(entry)
+                heapify(waiting)
+                if not waiting:
+                    del self.__waiting[key]
+                self.__condition.notify_all()
+            self.__reserved[key] = self.__reserved.get(key, 0) + cost
+            self.__in_flight[key] = self.__in_flight.get(key, 0) + 1
+            return cost
+
+    def release(self, key: str, service: str, cost: float, units):
+        """
+        Frees units reserved by finished request and records units
+        reported by its response
+        :param key: client login or token
+        :param service: url part of API service
+        :param cost: units reserved by request
+        :param units: YaApiUnits of response, None if not reported
+        :return: None
+        """
+        with self.__condition:
+            self.__reserved[key] -= cost
+            self.__in_flight[key] -= 1
+            if units is not None:
+                self.__remains[key] = units.remains
+                self.__updated[key] = time.monotonic()
+                self.__costs[service] = \
+                    (1 - COST_WEIGHT) * self.__costs.get(service, cost) \
+                    + COST_WEIGHT * units.spent
+            self.__condition.notify_all()
+
+
+units_budget = UnitsBudget()
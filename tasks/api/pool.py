@@ -0,0 +1,114 @@
+"""
+Pool of threads sending Yandex Direct API requests of many clients
+concurrently
+Classes:
+    TokenPool - bounded thread pool limiting concurrent calls of
+    each token
+Variables:
+    FINISHED - item passed by TokenPool.stream when job is finished
+"""
+
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, Tuple
+
+from settings.config import YA_API_WORKERS, YA_API_TOKEN_WORKERS
+
+
+FINISHED = object()
+
+
+class TokenPool:
+    """
+    Bounded thread pool: runs no more than workers calls at once and
+    no more than token_workers calls with the same token, so clients
+    of one agency (sharing agency token) do not exceed API limits of
+    concurrent requests while clients of other tokens are fetched.
+    Call waiting for its token does not take thread of pool.
+    Usage:
+        for job, result in TokenPool().map(fetch, jobs):
+            ... emit result ...
+        for job, page in TokenPool().stream(fetch_pages, jobs):
+            if page is FINISHED:
+                ... job is done ...
+            else:
+                ... emit page ...
+    """
+    def __init__(self, workers: int=YA_API_WORKERS,
+                 token_workers: int=YA_API_TOKEN_WORKERS):
+        """
+        :param workers: maximum of calls at once
+        :param token_workers: maximum of calls with one token at once
+        """
+        self.workers = workers
+        self.token_workers = token_workers
+
+    def stream(self, call: Callable[[Any], Iterable],
+               jobs: Iterable[Tuple[str, Any]])->Iterator[Tuple[Any, Any]]:
+        """
+        Iterates results of function for every job in threads of pool,
+        each item is passed as soon as it is produced
+        :param call: function called with job, returning iterable of items
+        :param jobs: pairs of token and job
+        :return: iterator of (job, item) pairs, after last item of job
+        (job, FINISHED) is passed; exception of call is raised from
+        iterator and jobs that were not started are dropped
+        """
+        waiting: Dict[str, Deque[Any]] = {}
+        for token, job in jobs:
+            waiting.setdefault(token, deque()).append(job)
+        active: Dict[str, int] = {token: 0 for token in waiting}
+        running = 0
+        results = Queue()
+        stopped = threading.Event()
+
+        def produce(token: str, job):
+            error = None
+            try:
+                for item in call(job):
+                    if stopped.is_set():
+                        return
+                    results.put((token, job, item, None))
+            except Exception as e:
+                error = e
+            results.put((token, job, FINISHED, error))
+
+        with ThreadPoolExecutor(self.workers) as executor:
+            try:
+                while waiting or running:
+                    for token in list(waiting):
+                        while waiting[token] \
+                                and active[token] < self.token_workers \
+                                and running < self.workers:
+                            executor.submit(
+                                produce, token, waiting[token].popleft()
+                            )
+                            active[token] += 1
+                            running += 1
+                        if not waiting[token]:
+                            del waiting[token]
+                    token, job, item, error = results.get()
+                    if item is FINISHED:
+                        active[token] -= 1
+                        running -= 1
+                        if error is not None:
+                            raise error
+                    yield job, item
+            finally:
+                stopped.set()
+
+    def map(self, call: Callable[[Any], Any],
+            jobs: Iterable[Tuple[str, Any]])->Iterator[Tuple[Any, Any]]:
+        """
+        Calls function for every job in threads of pool
+        :param call: function called with job
+        :param jobs: pairs of token and job
+        :return: iterator of (job, result of call) pairs in order calls
+        are finished; exception of call is raised from iterator and
+        jobs that were not started are dropped
+        """
+        for job, result in self.stream(lambda job: (call(job),), jobs):
+            if result is not FINISHED:
+                yield job, result
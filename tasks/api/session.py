@@ -0,0 +1,81 @@
+"""
+HTTP session of Yandex Direct API requests shared by all tasks
+Classes:
+    YaApiSession - thread-safe session keeping connections to API alive
+Variables:
+    api_session - session shared by all API requests
+"""
+
+import gzip
+import json
+import threading
+from typing import Dict
+
+from requests import Session, Response
+from requests.adapters import HTTPAdapter
+
+from settings.config import YA_API_POOL_SIZE, YA_API_GZIP_REQUESTS
+
+
+# request bodies shorter than this are not compressed, as gain
+# is less than compression cost
+GZIP_MIN_SIZE = 1024
+
+
+class YaApiSession:
+    """
+    Session keeping up to pool_size connections to API alive, so
+    following requests skip TCP and TLS handshakes.
+    requests.Session is not thread-safe, so each thread gets its own
+    session, all of them share one connections pool (adapter).
+    Responses are requested gzipped, bodies of requests are gzipped
+    if gzip_requests is set
+    """
+    def __init__(self, pool_size: int=YA_API_POOL_SIZE,
+                 gzip_requests: bool=YA_API_GZIP_REQUESTS):
+        """
+        :param pool_size: maximum of connections kept alive
+        :param gzip_requests: compress bodies of requests
+        """
+        self.pool_size = pool_size
+        self.gzip_requests = gzip_requests
+
+        self.__adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size, pool_block=True
+        )
+        # connections pool shared by sessions of all threads
+
+        self.__local = threading.local()
+        # session of current thread
+
+    @property
+    def session(self)->Session:
+        """
+        Session of current thread
+        """
+        if not hasattr(self.__local, "session"):
+            session = Session()
+            session.mount("https://", self.__adapter)
+            session.mount("http://", self.__adapter)
+            session.headers["Accept-Encoding"] = "gzip"
+            self.__local.session = session
+        return self.__local.session
+
+    def post(self, url: str, headers: Dict[str, str], payload: Dict)\
+            ->Response:
+        """
+        Sends payload as json
+        :param url: url of API service
+        :param headers: request headers
+        :param payload: request payload
+        :return: response (decompressed)
+        """
+        headers = dict(headers, **{"Content-Type": "application/json"})
+        body = json.dumps(payload).encode("utf-8")
+        if self.gzip_requests and len(body) >= GZIP_MIN_SIZE:
+            body = gzip.compress(body)
+            headers["Content-Encoding"] = "gzip"
+        return self.session.post(url=url, headers=headers, data=body)
+
+
+api_session = YaApiSession()
@@ -8,17 +8,26 @@ Classes:
     (login, token) pairs
     GetDirectAds - Yandex API request that gets all by provided
     (login, token) pairs
+    GetDirectLinks - Yandex API request that gets all links sets by
+    provided (login, token) pairs
+    SyncDirectAccounts - Yandex API requests that get changes of clients
+    accounts since last sync
+Clients are fetched concurrently by TokenPool, packs of single
+client are requested one after another, items are emitted page by page
+as pages arrive
 """
 
-from typing import List, Dict, Tuple
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple
 
 from PyQt5.QtCore import QThread, pyqtSignal
 
 from model.api_items.yandex import YaAPIDirectClient, YaAPIDirectCampaign, \
-    YaAPIDirectAdGroup, YaAPIDirectAd, YaAPIDirectLinksSet
+    YaAPIDirectAdGroup, YaAPIDirectAd, YaAPIDirectLinksSet, \
+    YaAPIDirectChanges
 from tasks.api.errors import YaApiException
-from tasks.api.yandex_utils import YaApiUnits, \
-    ya_api_get_request, ya_api_get_all
+from tasks.api.pool import TokenPool, FINISHED
+from tasks.api.yandex_utils import YaApiUnits, YaApiGetAllResponse, \
+    ya_api_get_request, ya_api_get_pages, ya_api_changes_request
 
 
 def split_by_n(items: List, n: int)->List[List]:
@@ -29,12 +38,47 @@ def split_by_n(items: List, n: int)->List[List]:
     :param n: maximum length of sublist
     :return: sublists of n or less length
     """
-    item_packs = []
-    while len(items) > n:
-        item_packs.append(items[:n])
-        items = items[n:]
-    item_packs.append(items)
-    return item_packs
+    return [items[i:i + n] for i in range(0, len(items), n)] or [items]
+
+
+def get_all_packs(service_url: str, result_name: str,
+                  params_packs: Iterable[Dict], token: str, login: str)\
+        ->Iterator[YaApiGetAllResponse]:
+    """
+    function for internal use that
+    gets all pages for each pack of params one after another,
+    pages after one that failed are not requested
+    :param service_url: url part of API service
+    :param result_name: key in response dictionary that contains
+    resulting items
+    :param params_packs: API request params payloads
+    :param token: token to Yandex Direct API
+    :param login: client login
+    :return: iterator of responses of pages
+    """
+    for params in params_packs:
+        for response in ya_api_get_pages(
+                service_url, result_name, params, token, login
+        ):
+            yield response
+            if response[2]:
+                return
+
+
+def join_responses(responses: Iterable[YaApiGetAllResponse])\
+        ->YaApiGetAllResponse:
+    """
+    function for internal use that
+    joins responses of pages to single response
+    :param responses: responses of pages
+    :return: units of last response, items of all responses, first error
+    """
+    units, items, error = None, [], None
+    for pack_units, pack_items, pack_error in responses:
+        units = pack_units or units
+        items += pack_items
+        error = error or pack_error
+    return units, items, error
 
 
 class GetDirectClients(QThread):
@@ -89,7 +133,7 @@ class GetDirectCampaigns(QThread):
     """
     got_campaigns = pyqtSignal(list)
     got_units = pyqtSignal(YaApiUnits)
-    error_occurred = pyqtSignal(YaApiException)
+    error_occurred = pyqtSignal(Exception)
 
     def __init__(self, data: List[Tuple[str, str]]):
         """
@@ -98,32 +142,49 @@ class GetDirectCampaigns(QThread):
         super().__init__()
         self.data = data
 
-    def run(self):
-        for login, token in self.data:
-            params = {
-                "SelectionCriteria":
-                    {
-                        "Types": ["TEXT_CAMPAIGN"],
-                        "States":
-                            ["CONVERTED", "ENDED", "OFF", "ON", "SUSPENDED"],
-                        "Statuses":
-                            ["ACCEPTED", "DRAFT", "MODERATION", "REJECTED"],
-                    },
-                "FieldNames": ["Id", "Name"]
-            }
-            units, campaigns, err = ya_api_get_all(
-                "campaigns", "Campaigns", params, token, login
-            )
-            if units:
-                self.got_units.emit(units)
-
-            campaigns = YaAPIDirectCampaign.from_api_answer(login, campaigns)
-            if campaigns:
-                self.got_campaigns.emit(campaigns)
+    @staticmethod
+    def fetch(client: Tuple[str, str])->Iterator[YaApiGetAllResponse]:
+        """
+        Gets all campaigns of client (runs in thread of pool)
+        :param client: tuple (login, token)
+        :return: iterator of responses of pages
+        """
+        login, token = client
+        params = {
+            "SelectionCriteria":
+                {
+                    "Types": ["TEXT_CAMPAIGN"],
+                    "States":
+                        ["CONVERTED", "ENDED", "OFF", "ON", "SUSPENDED"],
+                    "Statuses":
+                        ["ACCEPTED", "DRAFT", "MODERATION", "REJECTED"],
+                },
+            "FieldNames": ["Id", "Name", "State"]
+        }
+        return ya_api_get_pages(
+            "campaigns", "Campaigns", params, token, login
+        )
 
-            if err:
-                self.error_occurred.emit(err)
-            self.sleep(1)
+    def run(self):
+        try:
+            clients = ((token, (login, token)) for login, token in self.data)
+            for (login, _), page in TokenPool().stream(self.fetch, clients):
+                if page is FINISHED:
+                    continue
+                units, campaigns, err = page
+                if units:
+                    self.got_units.emit(units)
+
+                campaigns = YaAPIDirectCampaign.from_api_answer(
+                    login, campaigns
+                )
+                if campaigns:
+                    self.got_campaigns.emit(campaigns)
+
+                if err:
+                    self.error_occurred.emit(err)
+        except Exception as err:
+            self.error_occurred.emit(err)
 
 
 class GetDirectAdGroups(QThread):
@@ -150,36 +211,51 @@ class GetDirectAdGroups(QThread):
         super().__init__()
         self.data: Dict[Tuple[str, str], List[int]] = data
 
+    @staticmethod
+    def fetch(client: Tuple[Tuple[str, str], List[int]])\
+            ->Iterator[YaApiGetAllResponse]:
+        """
+        Gets all ad groups of client campaigns (runs in thread of pool)
+        :param client: tuple ((login, token), campaigns ids)
+        :return: iterator of responses of pages
+        """
+        (login, token), campaigns = client
+        # api can not return more than 10 campaigns per call
+        params_packs = (
+            {
+                "SelectionCriteria":
+                    {
+                        "CampaignIds": campaigns_pack,
+                        "Types": ["TEXT_AD_GROUP"]
+                    },
+                "FieldNames": ["Id", "Name", "CampaignId", "Type"]
+            }
+            for campaigns_pack in split_by_n(campaigns, 10)
+        )
+        return get_all_packs(
+            "adgroups", "AdGroups", params_packs, token, login
+        )
+
     def run(self):
         try:
-            for (login, token), campaigns in self.data.items():
-                # api can not return more than 10 campaigns per call
-                campaigns_packs = split_by_n(campaigns, 10)
-
-                for campaigns_pack in campaigns_packs:
-                    params = {
-                        "SelectionCriteria":
-                            {
-                                "CampaignIds": campaigns_pack,
-                                "Types": ["TEXT_AD_GROUP"]
-                            },
-                        "FieldNames": ["Id", "Name", "CampaignId", "Type"]
-                    }
-                    units, ad_groups, err = ya_api_get_all(
-                        "adgroups", "AdGroups", params, token, login
-                    )
-                    if units:
-                        self.got_units.emit(units)
-
-                    ad_groups = YaAPIDirectAdGroup.from_api_answer(ad_groups)
-                    if ad_groups:
-                        self.got_ad_groups.emit(ad_groups)
-
-                    if err:
-                        self.error_occurred.emit(err)
-                        break
-                    self.sleep(1)
-                self.got_client.emit()
+            clients = (
+                (login_token[1], (login_token, campaigns))
+                for login_token, campaigns in self.data.items()
+            )
+            for _, page in TokenPool().stream(self.fetch, clients):
+                if page is FINISHED:
+                    self.got_client.emit()
+                    continue
+                units, ad_groups, err = page
+                if units:
+                    self.got_units.emit(units)
+
+                ad_groups = YaAPIDirectAdGroup.from_api_answer(ad_groups)
+                if ad_groups:
+                    self.got_ad_groups.emit(ad_groups)
+
+                if err:
+                    self.error_occurred.emit(err)
         except Exception as err:
             self.error_occurred.emit(err)
 
@@ -208,34 +284,48 @@ class GetDirectAds(QThread):
         super().__init__()
         self.data: Dict[Tuple[str, str], List[int]] = data
 
+    @staticmethod
+    def fetch(client: Tuple[Tuple[str, str], List[int]])\
+            ->Iterator[YaApiGetAllResponse]:
+        """
+        Gets all ads of client campaigns (runs in thread of pool)
+        :param client: tuple ((login, token), campaigns ids)
+        :return: iterator of responses of pages
+        """
+        (login, token), campaigns = client
+        # api can not return more than 10 campaigns per call
+        params_packs = (
+            {
+                "SelectionCriteria": {"CampaignIds": campaigns_pack},
+                "FieldNames": ["Id", "CampaignId", "AdGroupId"],
+                "TextAdFieldNames": ["Href", "SitelinkSetId"]
+            }
+            for campaigns_pack in split_by_n(campaigns, 10)
+        )
+        return get_all_packs("ads", "Ads", params_packs, token, login)
+
     def run(self):
         try:
-            for (login, token), campaigns in self.data.items():
-                campaigns_packs = split_by_n(campaigns, 10)
-                # api can not return more than 10 campaigns per call
-
-                for campaigns_pack in campaigns_packs:
-                    params = {
-                        "SelectionCriteria": {"CampaignIds": campaigns_pack},
-                        "FieldNames": ["Id", "CampaignId", "AdGroupId"],
-                        "TextAdFieldNames": ["Href", "SitelinkSetId"]
-                    }
-                    units, ads, err = ya_api_get_all(
-                        "ads", "Ads", params, token, login
-                    )
-
-                    if units:
-                        self.got_units.emit(units)
-
-                    ads = YaAPIDirectAd.from_api_answer(ads)
-                    if ads:
-                        self.got_ads.emit(login, ads)
-
-                    if err:
-                        self.error_occurred.emit(err)
-                        break
-                    self.sleep(1)
-                self.got_client.emit()
+            clients = (
+                (login_token[1], (login_token, campaigns))
+                for login_token, campaigns in self.data.items()
+            )
+            for ((login, _), _), page in TokenPool().stream(
+                    self.fetch, clients
+            ):
+                if page is FINISHED:
+                    self.got_client.emit()
+                    continue
+                units, ads, err = page
+                if units:
+                    self.got_units.emit(units)
+
+                ads = YaAPIDirectAd.from_api_answer(ads)
+                if ads:
+                    self.got_ads.emit(login, ads)
+
+                if err:
+                    self.error_occurred.emit(err)
         except Exception as err:
             self.error_occurred.emit(err)
 
@@ -264,31 +354,273 @@ class GetDirectLinks(QThread):
         super().__init__()
         self.data: Dict[Tuple[str, str], List[int]] = data
 
+    @staticmethod
+    def fetch(client: Tuple[Tuple[str, str], List[int]])\
+            ->Iterator[YaApiGetAllResponse]:
+        """
+        Gets all links sets of client (runs in thread of pool)
+        :param client: tuple ((login, token), links sets ids)
+        :return: iterator of responses of pages
+        """
+        (login, token), links_sets = client
+        # no more than 10 000 linksets can be returned per call
+        params_packs = (
+            {
+                "SelectionCriteria": {"Ids": links_sets_pack},
+                "FieldNames": ["Id", "Sitelinks"]
+            }
+            for links_sets_pack in split_by_n(links_sets, 10_000)
+        )
+        return get_all_packs(
+            "sitelinks", "SitelinksSets", params_packs, token, login
+        )
+
     def run(self):
         try:
-            for (login, token), links_sets in self.data.items():
-                # no more than 10 000 linksets can be returned per call
-                links_sets_packs = split_by_n(links_sets, 10_000)
-
-                for links_sets_pack in links_sets_packs:
-                    params = {
-                        "SelectionCriteria": {"Ids": links_sets_pack},
-                        "FieldNames": ["Id", "Sitelinks"]
+            clients = (
+                (login_token[1], (login_token, links_sets))
+                for login_token, links_sets in self.data.items()
+            )
+            for _, page in TokenPool().stream(self.fetch, clients):
+                if page is FINISHED:
+                    self.got_client.emit()
+                    continue
+                units, sets, err = page
+                if units:
+                    self.got_units.emit(units)
+
+                sets = YaAPIDirectLinksSet.from_api_answer(sets)
+                if sets:
+                    self.got_links.emit(sets)
+
+                if err:
+                    self.error_occurred.emit(err)
+        except Exception as err:
+            self.error_occurred.emit(err)
+
+
+# units of last response, changes of account, error
+SyncResponse = Tuple[
+    Optional[YaApiUnits],
+    Optional[YaAPIDirectChanges],
+    Optional[YaApiException]
+]
+
+
+class SyncDirectAccounts(QThread):
+    """
+    Yandex API requests that get changes of clients accounts since
+    their last sync with Direct 'changes' service:
+        client that was not synced is fetched completely
+        campaigns are always fetched completely (one call per client),
+        so deleted ones are detected
+        ad groups and ads of new campaigns and campaigns the service
+        could not check are fetched completely
+        for other campaigns with changed children only changed ad
+        groups and ads are fetched, changed ones that are not
+        returned are deleted
+    And emits:
+    Remained Yandex API units
+    Changes of each client (nothing if client failed, so it is
+    synced from the same time next run)
+    Empty signal when one of the clients got
+    Error otherwise
+    """
+    got_changes = pyqtSignal(object)
+    got_units = pyqtSignal(YaApiUnits)
+    got_client = pyqtSignal()
+    error_occurred = pyqtSignal(Exception)
+
+    def __init__(self, data: List[Tuple[str, str]],
+                 synced: Dict[str, Tuple[str, List[int]]]):
+        """
+        :param data: list of tuples (login, token)
+        :param synced: dictionary with
+            keys: logins of clients synced earlier
+            values: timestamp of last sync and ids of synced campaigns
+        """
+        super().__init__()
+        self.data = data
+        self.synced = synced
+
+    @staticmethod
+    def check_children(login: str, token: str, timestamp: str,
+                       campaigns: List[int])\
+            ->Tuple[Optional[YaApiUnits], List[int], List[int], List[int],
+                    Optional[YaApiException]]:
+        """
+        Gets ids of ad groups and ads changed since timestamp
+        :param login: client login
+        :param token: token to Yandex Direct API
+        :param timestamp: time of last sync
+        :param campaigns: ids of campaigns with changed children
+        :return: units, ids of changed ad groups, ids of changed ads,
+        ids of campaigns that were not checked, error
+        """
+        units, ad_groups, ads, unchecked = None, [], [], []
+        # api can not check more than 3000 campaigns per call
+        for campaigns_pack in split_by_n(campaigns, 3000):
+            if not campaigns_pack:
+                break
+            units, result, err = ya_api_changes_request(
+                "check",
+                {
+                    "CampaignIds": campaigns_pack,
+                    "FieldNames": ["AdGroupIds", "AdIds"],
+                    "Timestamp": timestamp
+                },
+                token, login
+            )
+            if err:
+                return units, [], [], [], err
+            modified = result.get("Modified", {})
+            ad_groups += modified.get("AdGroupIds", [])
+            ads += modified.get("AdIds", [])
+            unchecked += result.get("Unprocessed", {}).get("CampaignIds", [])
+        return units, ad_groups, ads, unchecked, None
+
+    @staticmethod
+    def fetch(client: Tuple[str, str, Optional[Tuple[str, List[int]]]])\
+            ->SyncResponse:
+        """
+        Gets changes of client account (runs in thread of pool)
+        :param client: tuple (login, token, timestamp of last sync and
+        ids of synced campaigns or None if client was not synced)
+        :return: units, changes of account, error
+        """
+        login, token, synced = client
+        # timestamp is taken first, so changes made while account is
+        # fetched are got next time
+        if synced is None:
+            units, result, err = ya_api_changes_request(
+                "checkDictionaries", {}, token, login
+            )
+        else:
+            units, result, err = ya_api_changes_request(
+                "checkCampaigns", {"Timestamp": synced[0]}, token, login
+            )
+        if err:
+            return units, None, err
+        timestamp = result["Timestamp"]
+
+        campaigns_units, campaigns, err = join_responses(
+            GetDirectCampaigns.fetch((login, token))
+        )
+        units = campaigns_units or units
+        if err:
+            return units, None, err
+        campaigns = YaAPIDirectCampaign.from_api_answer(login, campaigns)
+        ids = [campaign.id for campaign in campaigns]
+
+        changed_groups, changed_ads = [], []
+        if synced is None:
+            reloaded = ids
+        else:
+            known = set(synced[1])
+            reloaded = [
+                campaign_id for campaign_id in ids
+                if campaign_id not in known
+            ]
+            changed = [
+                campaign["CampaignId"]
+                for campaign in result.get("Campaigns", [])
+                if "CHILDREN" in campaign.get("ChangesIn", [])
+                and campaign["CampaignId"] in known
+            ]
+            check_units, changed_groups, changed_ads, unchecked, err = \
+                SyncDirectAccounts.check_children(
+                    login, token, synced[0], changed
+                )
+            units = check_units or units
+            if err:
+                return units, None, err
+            reloaded += unchecked
+
+        responses = []
+        if reloaded:
+            responses += GetDirectAdGroups.fetch(((login, token), reloaded))
+        if changed_groups:
+            responses += get_all_packs(
+                "adgroups", "AdGroups",
+                (
+                    {
+                        "SelectionCriteria":
+                            {"Ids": pack, "Types": ["TEXT_AD_GROUP"]},
+                        "FieldNames": ["Id", "Name", "CampaignId", "Type"]
+                    }
+                    for pack in split_by_n(changed_groups, 10_000)
+                ),
+                token, login
+            )
+        groups_units, ad_groups, err = join_responses(responses)
+        units = groups_units or units
+        if err:
+            return units, None, err
+        ad_groups = YaAPIDirectAdGroup.from_api_answer(ad_groups)
+
+        responses = []
+        if reloaded:
+            responses += GetDirectAds.fetch(((login, token), reloaded))
+        if changed_ads:
+            responses += get_all_packs(
+                "ads", "Ads",
+                (
+                    {
+                        "SelectionCriteria": {"Ids": pack},
+                        "FieldNames": ["Id", "CampaignId", "AdGroupId"],
+                        "TextAdFieldNames": ["Href", "SitelinkSetId"]
                     }
-                    units, sets, err = ya_api_get_all(
-                        "sitelinks", "SitelinksSets", params, token, login
-                    )
-                    if units:
-                        self.got_units.emit(units)
-
-                    sets = YaAPIDirectLinksSet.from_api_answer(sets)
-                    if sets:
-                        self.got_links.emit(sets)
-
-                    if err:
-                        self.error_occurred.emit(err)
-                        break
-                    self.sleep(1)
+                    for pack in split_by_n(changed_ads, 10_000)
+                ),
+                token, login
+            )
+        ads_units, ads, err = join_responses(responses)
+        units = ads_units or units
+        if err:
+            return units, None, err
+        ads = YaAPIDirectAd.from_api_answer(ads)
+
+        links_sets = list({ad.links_set for ad in ads if ad.links_set})
+        sets = []
+        if links_sets:
+            sets_units, sets, err = join_responses(
+                GetDirectLinks.fetch(((login, token), links_sets))
+            )
+            units = sets_units or units
+            if err:
+                return units, None, err
+
+        return units, YaAPIDirectChanges(
+            login=login,
+            timestamp=timestamp,
+            campaigns=campaigns,
+            reloaded=reloaded,
+            ad_groups=ad_groups,
+            ads=ads,
+            links_sets=YaAPIDirectLinksSet.from_api_answer(sets),
+            removed_ad_groups=list(
+                set(changed_groups) - {group.id for group in ad_groups}
+            ),
+            removed_ads=list(set(changed_ads) - {ad.id for ad in ads})
+        ), None
+
+    def run(self):
+        try:
+            clients = (
+                (token, (login, token, self.synced.get(login)))
+                for login, token in self.data
+            )
+            for _, (units, changes, err) in TokenPool().map(
+                    self.fetch, clients
+            ):
+                if units:
+                    self.got_units.emit(units)
+
+                if changes:
+                    self.got_changes.emit(changes)
+
+                if err:
+                    self.error_occurred.emit(err)
                 self.got_client.emit()
         except Exception as err:
             self.error_occurred.emit(err)
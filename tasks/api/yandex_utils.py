@@ -7,24 +7,27 @@ Data-wrappers (just data definition):
 functions:
     ya_parse_units - Parses Api units from their string representation
     to YaApiUnits
-    ya_api_request - sends request and returns
-    raw content
+    ya_api_request - sends request (when API units allow, see
+    units_budget) with shared api_session and returns raw content
+    ya_api_error - gets error from response payload
     ya_api_get_request - request with 'get' method
+    ya_api_changes_request - request to 'changes' service
     ya_api_action_request - request for action methods: 
     add, update, delete and other
+    ya_api_get_pages - calls ya_api_request page by page yielding items
     ya_api_get_all - calls ya_api_request until gets all items
 """
 
 import json
 import re
-from typing import Pattern, List, Dict, Tuple, Optional, ClassVar
+from typing import Pattern, Iterator, List, Dict, Tuple, Optional
 from collections import namedtuple
 
-from requests import post
-
 from settings.config import YA_DIRECT_URL
+from tasks.api.budget import units_budget
 from tasks.api.errors import YaApiException, YaApiExceptions,\
     YaApiWarnings
+from tasks.api.session import api_session
 
 
 YaApiUnits = namedtuple("YaApiUnits", "spent remains total")
@@ -52,6 +55,10 @@ YaApiActionResponse = Tuple[
 ]
 
 
+# maximum of items API returns per page
+PAGE_LIMIT = 10_000
+
+
 units_regexp: Pattern = re.compile(
     "([0-9]+)/([0-9]+)/([0-9]+)"
 )  # regexp for extracting units
@@ -77,7 +84,8 @@ def ya_api_request(service_url: str, method_name: str, params: Dict,
         ->Tuple[YaApiUnits, Dict]:
     """
     Lowest level Yandex Direct API request, just sends request and returns
-    raw content
+    raw content. Request waits while units of client are short
+    (raises YaApiNoUnits if they are not restored in time)
     :param service_url: url part of API service
     :param method_name: API method name 
     :param login: client login for all requests except 'agencyclients'
@@ -96,14 +104,34 @@ def ya_api_request(service_url: str, method_name: str, params: Dict,
         "params": params
     }
 
-    response = post(url=url, headers=headers, json=data)
-    if "Units" in response.headers:
-        units = ya_parse_units(response.headers["Units"])
-    else:
-        units = None
+    budget_key = login or token
+    cost = units_budget.acquire(budget_key, service_url)
+    units = None
+    try:
+        response = api_session.post(url, headers, data)
+        if "Units" in response.headers:
+            units = ya_parse_units(response.headers["Units"])
+    finally:
+        units_budget.release(budget_key, service_url, cost, units)
     return units, json.loads(response.text)
 
 
+def ya_api_error(response: Dict)->Optional[YaApiException]:
+    """
+    Gets error from Yandex Direct API response payload
+    :param response: response payload (parsed json)
+    :return: error if API responded with error
+    """
+    if "error" not in response:
+        return None
+    return YaApiException(
+        "Yandex direct API error, code: {}, text: {}".format(
+            response["error"]["error_code"],
+            response["error"]["error_detail"]
+        )
+    )
+
+
 def ya_api_get_request(service_url: str, result_name: str,
                        params: Dict, token: str, login: Optional[str]=None)\
         ->YaApiGetResponse:
@@ -119,19 +147,27 @@ def ya_api_get_request(service_url: str, result_name: str,
     """
     units, response = ya_api_request(service_url, 'get', params, token, login)
 
-    result = response["result"].get(result_name, [])\
-        if "result" in response else []
+    result = response.get("result", {})
+    return units, result.get(result_name, []), result.get("LimitedBy"), \
+        ya_api_error(response)
 
-    if "error" in response:
-        error = YaApiException(
-            "Yandex direct API error, code: {}, text: {}".format(
-                response["error"]["error_code"],
-                response["error"]["error_detail"]
-            )
-        )
-    else:
-        error = None
-    return units, result, response.get("LimitedBy", None), error
+
+def ya_api_changes_request(method_name: str, params: Dict, token: str,
+                           login: str)\
+        ->Tuple[YaApiUnits, Dict, Optional[YaApiException]]:
+    """
+    Low level Yandex Direct API request to 'changes' service:
+    checkDictionaries, checkCampaigns or check
+    :param method_name: API method name
+    :param params: API request params payload
+    :param login: client login
+    :return: Units (spend for request/available/total),
+    result of method, error
+    """
+    units, response = ya_api_request(
+        "changes", method_name, params, token, login
+    )
+    return units, response.get("result", {}), ya_api_error(response)
 
 
 def ya_api_action_request(service_url: str, method_name: str,
@@ -158,6 +194,33 @@ def ya_api_action_request(service_url: str, method_name: str,
     return units, errors, warnings, result
 
 
+def ya_api_get_pages(service_url: str, result_name: str,
+                     params: Dict, token: str, login: Optional[str]=None)\
+        ->Iterator[YaApiGetAllResponse]:
+    """
+    Low level bunch of Yandex Direct API requests with 'get' method
+    yielding items page by page as they arrive. Next page is requested
+    from the object API limited previous page by (LimitedBy)
+    :param service_url: url part of API service
+    :param result_name: key in response dictionary that contains resulting
+    items
+    :param params: API request params payload
+    :param login: client login for all requests except 'agencyclients'
+    :return: iterator of Units (spend for request/available/total),
+    items of page, error; iteration stops after error
+    """
+    params = params.copy()
+    limit = params.get("Page", {}).get("Limit", PAGE_LIMIT)
+    while True:
+        units, items, limited, error = ya_api_get_request(
+            service_url, result_name, params, token, login
+        )
+        yield units, items, error
+        if error or not limited:
+            return
+        params["Page"] = {"Limit": limit, "Offset": limited}
+
+
 def ya_api_get_all(service_url: str, result_name: str,
                    params: Dict, token: str, login: Optional[str]=None)\
         ->YaApiGetAllResponse:
@@ -170,28 +233,11 @@ def ya_api_get_all(service_url: str, result_name: str,
     :param params: API request params payload
     :param login: client login for all requests except 'agencyclients'
     :return: Units (spend for request/available/total), 
-    resulting items, error 
+    resulting items (got before error if any), error
     """
-    units, items, limited, error = ya_api_get_request(
-        service_url, result_name, params, token, login
-    )
-    result = items
-    if error:
-        return units, items, error
-
-    if limited:
-        params = params.copy()
-
-    while limited:
-        params["Page"] = {
-            "Limit": 10_000,
-            "Offset": limited
-        }
-        units, items, limited, error = ya_api_get_request(
-            service_url, result_name, params
-        )
-        if error:
-            return units, items, error
+    units, result, error = None, [], None
+    for units, items, error in ya_api_get_pages(
+            service_url, result_name, params, token, login
+    ):
         result += items
-
-    return units, items, error
+    return units, result, error
@@ -0,0 +1,133 @@
+"""
+Module with circuit breaker stopping requests to hosts that are down
+classes:
+    CircuitBreaker - per host circuit breaker
+functions:
+    is_connection_failure - checks if error means host is unreachable
+"""
+
+import asyncio
+from typing import Dict, Optional
+
+from tasks.crawling.errors import PageTimeout, ConnectionFailed
+
+
+def is_connection_failure(error: Optional[Exception])->bool:
+    """
+    Checks if error means that host is unreachable
+    (HTTP error statuses are not connection failures)
+    :param error: exception raised while checking page
+    :return: True if connection to host failed
+    """
+    return isinstance(error, (ConnectionFailed, PageTimeout))
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for each host:
+        closed - requests are sent, after threshold consecutive
+        connection failures breaker opens
+        open - requests are rejected with error that opened breaker;
+        after cooldown seconds breaker half-opens
+        half-open - single probe request is sent, others are rejected,
+        breaker closes if probe succeeds and opens again otherwise
+    Usage:
+        error = breaker.rejection(host, url)
+        if error is None:
+            ... request host ...
+            breaker.record(host, url, error of request or None)
+        else:
+            ... hold page till breaker.retry_in(host) seconds pass ...
+    """
+    def __init__(self, threshold: int, cooldown: float):
+        """
+        :param threshold: consecutive connection failures opening breaker
+        :param cooldown: seconds till open breaker lets probe request
+        """
+        self.threshold = threshold
+        self.cooldown = cooldown
+
+        self.__failures: Dict[str, int] = {}
+        # consecutive connection failures of each host
+
+        self.__opened: Dict[str, Exception] = {}
+        # error that opened breaker of each host
+
+        self.__retry_at: Dict[str, float] = {}
+        # time when probe request may be sent to host with open breaker
+
+        self.__probing: Dict[str, str] = {}
+        # id of probe request being sent to host
+
+    def is_open(self, host: str)->bool:
+        """
+        :param host: host name
+        :return: True if requests to host are not sent
+        """
+        return host in self.__opened
+
+    def retry_in(self, host: str)->float:
+        """
+        :param host: host name
+        :return: seconds till probe request may be sent to host,
+        0 if breaker of host is not open
+        """
+        if host not in self.__opened:
+            return 0.0
+        return max(
+            0.0, self.__retry_at[host] - asyncio.get_event_loop().time()
+        )
+
+    def rejection(self, host: str, request: str)->Optional[Exception]:
+        """
+        Checks if request to host may be sent, request admitted while
+        breaker is open is probe of host
+        :param host: host name
+        :param request: id of request (as url), the same id is passed
+        to record
+        :return: error that opened breaker if request is rejected,
+        None if request may be sent
+        """
+        if host not in self.__opened:
+            return None
+        if host in self.__probing \
+                or asyncio.get_event_loop().time() < self.__retry_at[host]:
+            return self.__opened[host]
+        self.__probing[host] = request
+        return None
+
+    def record(self, host: str, request: str, error: Optional[Exception]):
+        """
+        Records result of request to host, while breaker is open only
+        result of probe changes its state (results of requests sent
+        before breaker opened are ignored)
+        :param host: host name
+        :param request: id of request passed to rejection
+        :param error: exception raised while checking page if any
+        :return: None
+        """
+        if host in self.__opened:
+            if self.__probing.get(host) != request:
+                return
+            del self.__probing[host]
+            if is_connection_failure(error):
+                self.__open(host, error)
+                return
+        if not is_connection_failure(error):
+            self.__failures.pop(host, None)
+            self.__opened.pop(host, None)
+            self.__retry_at.pop(host, None)
+            return
+        self.__failures[host] = self.__failures.get(host, 0) + 1
+        if self.__failures[host] >= self.threshold:
+            self.__open(host, error)
+
+    def __open(self, host: str, error: Exception):
+        """
+        Opens breaker of host till cooldown passes
+        :param host: host name
+        :param error: error that opened breaker
+        :return: None
+        """
+        self.__opened[host] = error
+        self.__retry_at[host] = asyncio.get_event_loop().time() + self.cooldown
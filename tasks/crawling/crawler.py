@@ -1,96 +1,304 @@
 """
 Module with crawler, checking landing pages
 classes:
-    SiteCrawler - crawler checking all provided urls
+    SiteCrawler - crawler checking urls of single client
+Data-wrappers:
+    PageCheck - result of checking single page
+functions:
+    failed_check - result of page that could not be checked
 """
 
-from typing import List
+import asyncio
+from collections import namedtuple
+from typing import Dict, List, Optional, Tuple
 from random import randint
-from requests import Session
+
+from settings.config import CRAWLER_HEAD_FIRST, CRAWLER_GET_LIMIT, \
+    CRAWLER_MAX_REDIRECTS, CRAWLER_PAGE_BUDGET
 from tasks.crawling.agents import get_user_agent
+from tasks.crawling.errors import TooManyRedirects, PageTimeout, \
+    ConnectionReset, BrokenResponse
+from tasks.crawling.fingerprint import ErrorPages, fingerprint_body
+from tasks.crawling.redirects import RedirectCache, redirect_location
+from tasks.crawling.transport import Transport, Response
+
+
+# url - checked url
+# status - status code or error text
+# warnings - all warnings as single string
+# redirects - list of (status code, url) pairs of redirects passed
+# etag - ETag header of page if any
+# last_modified - Last-Modified header of page if any
+# error - exception if page could not be checked
+# retry_after - Retry-After header of page if any
+PageCheck = namedtuple(
+    "PageCheck",
+    "url status warnings redirects etag last_modified error retry_after"
+)
 
+# ETag and Last-Modified headers of page checked earlier (each can be None)
+Validators = Tuple[Optional[str], Optional[str]]
 
-def get_warnings(response)->str:
+
+def get_warnings(redirects: List[Tuple[int, str]],
+                 error_page: bool=False)->str:
     """
     Inner function that gets all warnings for url
-    :param response: requests.response of corresponding page
+    :param redirects: (status code, url) pairs of redirects passed
+    :param error_page: is content of page the same as error page of host
     :return: string of all warnings
     """
     warnings = ""
-    warnings += get_redir_warning(response)
+    warnings += get_redir_warning(redirects)
+    warnings += get_error_page_warning(error_page)
     return warnings
 
 
-def get_redir_warning(response):
+def get_redir_warning(redirects: List[Tuple[int, str]]):
     """
     Inner function that if redirects was returns warning about
     redirect with redirects history
     in -status -> target url format
     empty string otherwise
-    :param response: requests.response of corresponding page
+    :param redirects: (status code, url) pairs of redirects passed
     :return: warning string about how redirects was handled if was
     else - empty string
     """
-    if response.history:
+    if redirects:
         warning = "\n Было перенаправлено:"
-        for path in response.history:
-            warning += f"-{path.status_code} -> {path.url};"
+        for status, url in redirects:
+            warning += f"-{status} -> {url};"
         return warning
     return ""
 
 
+def get_error_page_warning(error_page: bool)->str:
+    """
+    Inner function that returns warning about page responding
+    with content of error page of site
+    :param error_page: is content of page the same as error page of host
+    :return: warning string if page is error page else - empty string
+    """
+    if error_page:
+        return "\n Содержимое совпадает со страницей ошибки сайта;"
+    return ""
+
+
+def page_check(url: str, response: Response,
+               redirects: List[Tuple[int, str]])->PageCheck:
+    """
+    Inner function that gets result of page check from response
+    :param url: checked url
+    :param response: response of corresponding page
+    :param redirects: (status code, url) pairs of redirects passed
+    :return: result of page check
+    """
+    return PageCheck(
+        url, str(response.status), get_warnings(redirects), redirects,
+        response.headers.get("ETag"), response.headers.get("Last-Modified"),
+        None, response.headers.get("Retry-After")
+    )
+
+
+def failed_check(url: str, error: Exception,
+                 status: Optional[str]=None)->PageCheck:
+    """
+    Inner function that gets result of page that could not be checked
+    :param url: checked url
+    :param error: exception raised while checking
+    :param status: status to report, error text if not provided
+    :return: result of page check
+    """
+    return PageCheck(
+        url, status or str(error), "", [], None, None, error, None
+    )
+
+
+def conditional_headers(validators: Optional[Validators])->Dict[str, str]:
+    """
+    Inner function that gets headers for conditional request,
+    so server responds with 304 if page was not modified
+    :param validators: ETag and Last-Modified of page checked earlier
+    :return: request headers
+    """
+    headers = {}
+    if validators:
+        etag, last_modified = validators
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+    return headers
+
+
+async def read_limited(response: Response, limit: int)->bytes:
+    """
+    Inner function that reads no more than limit bytes of response body
+    without downloading the rest of it
+    :param response: response of corresponding page
+    :param limit: maximum of bytes to read
+    :return: beginning of response body
+    """
+    body = b""
+    while len(body) < limit:
+        chunk = await response.read(limit - len(body))
+        if not chunk:
+            break
+        body += chunk
+    return body
+
+
 class SiteCrawler:
     """
-    Crawler for crawling single clients urls
-    generally should be used as iterator
+    Crawler for checking single clients urls
+    urls are checked with check coroutine, which can be awaited
+    concurrently for many urls.
+    Page is probed with HEAD first, GET is sent only if server rejects
+    HEAD or responds with error status, and body of GET response
+    is read no further than get_limit bytes.
+    Redirects are followed hop by hop, hops known to redirect cache
+    (shared by crawlers) are not requested again.
+    User agent is changed every few requests.
+    If error pages are provided, pages are requested with GET and
+    content of pages responding 200 is compared with error page of
+    their host (see ErrorPages), matches are reported as warnings.
+    Each page has time budget covering all its requests and redirects,
+    timeouts are reported with PageTimeout status.
+    Requests are sent with transport shared by crawlers (see Transport)
     """
-    def __init__(self, thread, urls: List[str]):
-        self.__thread = thread
-        # thread in which crawler runs
+    def __init__(self, transport: Transport, redirects: RedirectCache,
+                 head_first: bool=CRAWLER_HEAD_FIRST,
+                 get_limit: int=CRAWLER_GET_LIMIT,
+                 max_redirects: int=CRAWLER_MAX_REDIRECTS,
+                 budget: float=CRAWLER_PAGE_BUDGET,
+                 error_pages: Optional[ErrorPages]=None):
+        """
+        :param transport: transport to send requests with
+        :param redirects: cache of redirect hops
+        :param head_first: probe pages with HEAD before GET
+        :param get_limit: maximum of body bytes read by GET
+        :param max_redirects: maximum of redirects followed for page
+        :param budget: seconds to check page
+        :param error_pages: fingerprints of error pages shared by
+        crawlers, content of pages is not checked if not provided
+        """
+        self.redirects = redirects
+        self.head_first = head_first
+        self.get_limit = get_limit
+        self.max_redirects = max_redirects
+        self.budget = budget
+        self.error_pages = error_pages
 
-        self.__session: Session
-        # request session (stores cookies)
+        self.__transport = transport
+        # transport shared by all crawlers (keeps connections pool)
 
-        self.__session_expires_after: int
-        # requests left till starting new session
+        self.__user_agent: str = ""
+        # user agent sent by crawler
 
-        self.new_session()
-        self.__urls = urls
+        self.__user_agent_expires_after: int = 0
+        # requests left till changing user agent
 
-    def new_session(self):
+    def new_user_agent(self):
         """
-        Creating new session with random user agent
-        and defining how much requests it will last
+        Choosing random user agent and defining how much requests
+        it will last
         :return: None
         """
-        self.__session = Session()
-        self.__session.headers.update(
-            {
-                'user-agent': get_user_agent(),
-                'accept-language': "ru-RU,ru;q=0.8,en-US;q=0.6,en;q=0.4"
-            }
-        )
-        self.__session_expires_after = randint(1, 10)
-
-    def __iter__(self):
-        while self.__urls:
-            self.__thread.msleep(randint(300, 1000))
-            if not self.__session_expires_after:
-                self.__session.close()
-                self.new_session()
-            url = self.__urls.pop(0)
-            try:
-                response = self.__session.get(url, allow_redirects=True)
-                yield url, str(response.status_code), get_warnings(response)
-            except Exception as e:
-                yield url, str(e), ""
-            self.__session_expires_after -= 1
+        self.__user_agent = get_user_agent()
+        self.__user_agent_expires_after = randint(1, 10)
 
-        self.__session.close()
+    async def check(self, url: str,
+                    validators: Optional[Validators]=None)->PageCheck:
+        """
+        Checks single page, if validators of earlier check are provided
+        request is conditional and status 304 means page is not modified
+        :param url: url of page
+        :param validators: ETag and Last-Modified of page checked earlier
+        :return: result of page check
+        """
+        if not self.__user_agent_expires_after:
+            self.new_user_agent()
+        self.__user_agent_expires_after -= 1
 
-    @property
-    def empty(self):
-        return not self.__urls
+        headers = conditional_headers(validators)
+        headers['user-agent'] = self.__user_agent
+        try:
+            return await asyncio.wait_for(
+                self.probe(url, headers), self.budget
+            )
+        except asyncio.TimeoutError:
+            return failed_check(url, PageTimeout())
+        except Exception as e:
+            return failed_check(url, e)
 
-    def close(self):
-        self.__session.close()
+    async def probe(self, url: str, headers: Dict[str, str])->PageCheck:
+        """
+        Requests page with HEAD and then with GET if needed
+        (HEAD is skipped if content of page is checked)
+        :param url: url of page
+        :param headers: additional request headers
+        :return: result of page check
+        """
+        if self.head_first and self.error_pages is None:
+            try:
+                page = await self.fetch("HEAD", url, headers)
+                if int(page.status) < 400:
+                    return page
+            except (ConnectionReset, BrokenResponse):
+                pass  # server may drop HEAD requests, so trying GET
+        return await self.fetch("GET", url, headers)
+
+    async def fetch(self, method: str, url: str,
+                    headers: Dict[str, str])->PageCheck:
+        """
+        Requests page following redirects hop by hop
+        :param method: HTTP method
+        :param url: url of page
+        :param headers: additional request headers
+        :return: result of page check
+        """
+        redirects = []
+        target = url
+        fingerprint = None
+        for _ in range(self.max_redirects + 1):
+            hop = await self.redirects.lookup(target)
+            if hop is None:
+                self.redirects.begin(target)
+                try:
+                    async with self.__transport.request(
+                            method, target, headers
+                    ) as response:
+                        location = redirect_location(response)
+                        if location is None:
+                            if method == "GET":
+                                fingerprint = await self.read_body(response)
+                            page = page_check(url, response, redirects)
+                            break
+                        hop = response.status, location
+                finally:
+                    self.redirects.end(target, hop)
+            status, location = hop
+            redirects.append((status, target))
+            target = location
+        else:
+            raise TooManyRedirects(self.max_redirects)
+        # compared after connection is released, as probe of error page
+        # may need connection to the same host
+        if fingerprint and await self.error_pages.is_error_page(
+                self.__transport, target, fingerprint,
+                {"user-agent": headers["user-agent"]}
+        ):
+            return page._replace(warnings=get_warnings(redirects, True))
+        return page
+
+    async def read_body(self, response: Response)->Optional[str]:
+        """
+        Reads beginning of GET response body, body of page responding 200
+        is fingerprinted if content of pages is checked
+        :param response: response of page
+        :return: fingerprint of page, None if content is not checked
+        """
+        if self.error_pages is None or response.status != 200:
+            await read_limited(response, self.get_limit)
+            return None
+        return await fingerprint_body(response, self.get_limit)
@@ -0,0 +1,110 @@
+"""
+Module with DNS resolution cache for crawler
+classes:
+    CachingResolver - aiohttp resolver caching resolved and failed hosts
+"""
+
+import asyncio
+import socket
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiohttp.abc import AbstractResolver
+from aiohttp.resolver import DefaultResolver
+
+
+# getaddrinfo errors meaning that host does not exist
+NXDOMAIN_ERRORS = frozenset(
+    getattr(socket, name) for name in ("EAI_NONAME", "EAI_NODATA")
+    if hasattr(socket, name)
+)
+
+
+def is_nxdomain(error: OSError)->bool:
+    """
+    Checks if resolution error means that host does not exist
+    (as opposed to temporary resolver failure)
+    :param error: error raised by resolver
+    :return: True if host does not exist
+    """
+    return error.errno in NXDOMAIN_ERRORS
+
+
+class CachingResolver(AbstractResolver):
+    """
+    Resolver that keeps resolved addresses for ttl seconds and
+    hosts that do not exist for negative_ttl seconds, so
+    each host is resolved by system resolver once per run.
+    Concurrent resolutions of one host are merged.
+    System resolver does not report records TTL, so it is configured
+    """
+    def __init__(self, ttl: float, negative_ttl: float,
+                 resolver: Optional[AbstractResolver]=None):
+        """
+        :param ttl: seconds while resolved addresses are kept
+        :param negative_ttl: seconds while not existing host is kept
+        :param resolver: resolver used for hosts that are not cached,
+        aiohttp default resolver if not provided
+        """
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.__resolver = resolver or DefaultResolver()
+
+        self.__resolved: Dict[Tuple[str, int, int],
+                              Tuple[float, List[Dict[str, Any]]]] = {}
+        # expiration time and addresses by (host, port, family)
+
+        self.__failed: Dict[str, Tuple[float, OSError]] = {}
+        # expiration time and error by not existing host
+
+        self.__pending: Dict[Tuple[str, int, int], asyncio.Future] = {}
+        # resolutions in progress
+
+    def failure(self, host: str)->Optional[OSError]:
+        """
+        Gets error of host known to not exist
+        :param host: host name
+        :return: resolution error, None if host is not known to fail
+        """
+        if host not in self.__failed:
+            return None
+        expires, error = self.__failed[host]
+        if expires < asyncio.get_event_loop().time():
+            del self.__failed[host]
+            return None
+        return error
+
+    async def resolve(self, host: str, port: int=0,
+                      family: int=socket.AF_INET)->List[Dict[str, Any]]:
+        error = self.failure(host)
+        if error:
+            raise error
+
+        key = (host, port, family)
+        now = asyncio.get_event_loop().time()
+        if key in self.__resolved and self.__resolved[key][0] >= now:
+            return self.__resolved[key][1]
+        if key in self.__pending:
+            return await asyncio.shield(self.__pending[key])
+
+        future = asyncio.get_event_loop().create_future()
+        self.__pending[key] = future
+        try:
+            addresses = await self.__resolver.resolve(host, port, family)
+        except OSError as e:
+            if is_nxdomain(e):
+                self.__failed[host] = (now + self.negative_ttl, e)
+            future.set_exception(e)
+            future.exception()  # error is retrieved by waiters if any
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        else:
+            self.__resolved[key] = (now + self.ttl, addresses)
+            future.set_result(addresses)
+            return addresses
+        finally:
+            del self.__pending[key]
+
+    async def close(self):
+        await self.__resolver.close()
@@ -0,0 +1,362 @@
+"""
+Module with asyncio engine running crawlers of all clients
+classes:
+    CrawlEngine - engine checking urls of many clients concurrently
+"""
+
+import asyncio
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+from aiohttp.abc import AbstractResolver
+
+from settings.config import CRAWLER_CONCURRENCY, CRAWLER_HOST_CONCURRENCY, \
+    CRAWLER_HOST_MIN_GAP, CRAWLER_REDIRECT_TTL, CRAWLER_KEEPALIVE, \
+    CRAWLER_DNS_TTL, CRAWLER_DNS_NEGATIVE_TTL, CRAWLER_BREAKER_THRESHOLD, \
+    CRAWLER_BREAKER_COOLDOWN, CRAWLER_CONNECT_TIMEOUT, CRAWLER_READ_TIMEOUT, \
+    CRAWLER_CONTENT_CHECK, CRAWLER_TRANSPORT, CRAWLER_H2_HOST_CONCURRENCY, \
+    CRAWLER_H2_HOST_MIN_GAP
+from tasks.crawling.breaker import CircuitBreaker
+from tasks.crawling.crawler import SiteCrawler, PageCheck, Validators, \
+    failed_check
+from tasks.crawling.dns import CachingResolver
+from tasks.crawling.errors import CrawlerException
+from tasks.crawling.fingerprint import ErrorPages
+from tasks.crawling.redirects import RedirectCache
+from tasks.crawling.retry import RetryPolicy
+from tasks.crawling.scheduler import HostScheduler
+from tasks.crawling.transport import Transport, AiohttpTransport, \
+    HttpxTransport
+from tasks.crawling.urls import url_host, registered_domain
+
+
+# callback receiving result of every checked page
+ResultCallback = Callable[[PageCheck], None]
+
+# callback receiving url and seconds spent on single check of page
+# (retried page is reported for each attempt)
+TimingCallback = Callable[[str, float], None]
+
+# job of scheduler: crawler of client, url and number of attempt
+Job = Tuple[SiteCrawler, str, int]
+
+# headers sent with every request
+DEFAULT_HEADERS = {'accept-language': "ru-RU,ru;q=0.8,en-US;q=0.6,en;q=0.4"}
+
+
+class CrawlEngine:
+    """
+    Engine that keeps many requests in flight on single event loop
+    Limits:
+        concurrency - requests in flight across all hosts
+        host_concurrency - requests in flight to single registered domain
+        host_min_gap - seconds between requests to single registered domain
+        h2_host_concurrency, h2_host_min_gap - the same limits
+        of "http2" transport, requests to host are multiplexed over
+        single connection, so more of them are kept in flight
+    Redirect hops are cached for redirect_ttl seconds and shared
+    by crawlers of all clients.
+    Crawlers share one transport, its connections pool is sized to
+    concurrency limits and keeps idle connections alive for
+    keepalive seconds, so following requests to host skip handshakes.
+    Transport "aiohttp" speaks HTTP/1.1, "http2" multiplexes requests
+    to one host over single connection (see HttpxTransport), DNS cache
+    below is used by "aiohttp" transport only. If "http2" transport
+    is not available (httpx or h2 is not installed) "aiohttp" is used.
+    Hosts are resolved once per dns_ttl seconds, if host does not
+    exist all its waiting pages are reported with the same error at once.
+    When host fails to connect breaker_threshold times in a row, its
+    waiting pages are held for breaker_cooldown seconds (see
+    CircuitBreaker), then one of them is requested as probe: if it
+    succeeds held pages are requested, otherwise they are reported
+    with error of probe.
+    Every connection and read is limited by connect_timeout and
+    read_timeout seconds.
+    Pages failed for transient reasons are put back to scheduler
+    according to retry policy, result is reported after last attempt.
+    If content_check is set, pages responding 200 with content of error
+    page of their host are reported with warning
+    """
+    def __init__(self, concurrency: int=CRAWLER_CONCURRENCY,
+                 host_concurrency: int=CRAWLER_HOST_CONCURRENCY,
+                 host_min_gap: float=CRAWLER_HOST_MIN_GAP,
+                 redirect_ttl: float=CRAWLER_REDIRECT_TTL,
+                 keepalive: float=CRAWLER_KEEPALIVE,
+                 dns_ttl: float=CRAWLER_DNS_TTL,
+                 dns_negative_ttl: float=CRAWLER_DNS_NEGATIVE_TTL,
+                 breaker_threshold: int=CRAWLER_BREAKER_THRESHOLD,
+                 breaker_cooldown: float=CRAWLER_BREAKER_COOLDOWN,
+                 connect_timeout: float=CRAWLER_CONNECT_TIMEOUT,
+                 read_timeout: float=CRAWLER_READ_TIMEOUT,
+                 retry: Optional[RetryPolicy]=None,
+                 content_check: bool=CRAWLER_CONTENT_CHECK,
+                 transport: str=CRAWLER_TRANSPORT,
+                 resolver: Optional[AbstractResolver]=None,
+                 h2_host_concurrency: int=CRAWLER_H2_HOST_CONCURRENCY,
+                 h2_host_min_gap: float=CRAWLER_H2_HOST_MIN_GAP):
+        """
+        :param concurrency: maximum of requests in flight
+        :param host_concurrency: maximum of requests in flight to one host
+        :param host_min_gap: minimal seconds between requests to one host
+        :param redirect_ttl: seconds while redirect hop is reused
+        :param keepalive: seconds while idle connection is kept
+        :param dns_ttl: seconds while resolved host address is kept
+        :param dns_negative_ttl: seconds while not existing host is kept
+        :param breaker_threshold: connection failures stopping requests
+        to host
+        :param breaker_cooldown: seconds till stopped host is probed again
+        :param connect_timeout: seconds to connect to host
+        :param read_timeout: seconds to wait for data from host
+        :param retry: policy of retrying transient failures,
+        default RetryPolicy if not provided
+        :param content_check: compare content of pages with error pages
+        :param transport: name of transport, "aiohttp" or "http2"
+        :param resolver: resolver of hosts that are not cached,
+        system resolver if not provided
+        :param h2_host_concurrency: maximum of requests in flight
+        to one host with "http2" transport
+        :param h2_host_min_gap: minimal seconds between requests to one
+        host with "http2" transport
+        """
+        if transport not in ("aiohttp", "http2"):
+            raise CrawlerException(f"Unknown crawler transport: {transport}")
+        self.concurrency = concurrency
+        self.host_concurrency = host_concurrency
+        self.host_min_gap = host_min_gap
+        self.redirect_ttl = redirect_ttl
+        self.keepalive = keepalive
+        self.dns_ttl = dns_ttl
+        self.dns_negative_ttl = dns_negative_ttl
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retry = retry or RetryPolicy()
+        self.content_check = content_check
+        self.transport = transport
+        self.resolver = resolver
+        self.h2_host_concurrency = h2_host_concurrency
+        self.h2_host_min_gap = h2_host_min_gap
+
+    def new_session(self, resolver: CachingResolver)->ClientSession:
+        """
+        Creates session with connections pool sized to concurrency limits
+        :param resolver: resolver of hosts
+        :return: aiohttp.ClientSession
+        """
+        connector = TCPConnector(
+            limit=self.concurrency,
+            limit_per_host=self.host_concurrency,
+            keepalive_timeout=self.keepalive,
+            enable_cleanup_closed=True,
+            resolver=resolver,
+            use_dns_cache=False  # resolver caches itself
+        )
+        return ClientSession(
+            connector=connector,
+            timeout=ClientTimeout(
+                total=None,
+                sock_connect=self.connect_timeout,
+                sock_read=self.read_timeout
+            ),
+            headers=DEFAULT_HEADERS
+        )
+
+    def new_transport(self, resolver: CachingResolver)->Transport:
+        """
+        Creates transport with connections pool sized to concurrency limits
+        :param resolver: resolver of hosts (used by aiohttp transport)
+        :return: transport to send requests with
+        """
+        if self.transport == "http2":
+            try:
+                return HttpxTransport(
+                    self.concurrency, self.keepalive, self.connect_timeout,
+                    self.read_timeout, DEFAULT_HEADERS
+                )
+            except CrawlerException as e:
+                logging.getLogger(__name__).warning(
+                    "%s, HTTP/1.1 transport (aiohttp) is used instead", e
+                )
+        return AiohttpTransport(self.new_session(resolver))
+
+    async def run(self, pages_by_login: Dict[str, List[str]],
+                  on_result: ResultCallback,
+                  validators: Optional[Dict[str, Validators]]=None,
+                  priorities: Optional[Dict[str, float]]=None,
+                  on_timing: Optional[TimingCallback]=None):
+        """
+        Checks all provided pages and passes each result to callback
+        Pages of other hosts are checked while host is waiting
+        for its politeness gap, pages with higher priority go first
+        :param pages_by_login: dictionary where
+            keys - clients logins
+            values - lists of urls belonging to one client
+        :param on_result: callback for every checked page
+        :param validators: ETag and Last-Modified of pages checked earlier
+        by url, such pages are checked with conditional requests
+        :param priorities: priorities of pages by url
+        :param on_timing: callback for time of every check of page
+        :return: None
+        """
+        loop = asyncio.get_event_loop()
+        validators = validators or {}
+        priorities = priorities or {}
+        resolver = CachingResolver(
+            self.dns_ttl, self.dns_negative_ttl, self.resolver
+        )
+        transport = self.new_transport(resolver)
+        if isinstance(transport, HttpxTransport):
+            scheduler = HostScheduler(
+                self.h2_host_min_gap, self.h2_host_concurrency
+            )
+        else:
+            scheduler = HostScheduler(
+                self.host_min_gap, self.host_concurrency
+            )
+        redirects = RedirectCache(self.redirect_ttl)
+        breaker = CircuitBreaker(
+            self.breaker_threshold, self.breaker_cooldown
+        )
+        error_pages = ErrorPages() if self.content_check else None
+        crawlers = {
+            login: SiteCrawler(transport, redirects, error_pages=error_pages)
+            for login in pages_by_login
+        }
+        for login, pages in pages_by_login.items():
+            for url in pages:
+                scheduler.put(
+                    registered_domain(url_host(url)),
+                    (crawlers[login], url, 0),
+                    priority=priorities.get(url, 0.0)
+                )
+
+        held: Dict[str, List[Job]] = {}
+        # jobs of hosts with open breaker by host name,
+        # waiting for result of probe request
+
+        probes: Dict[str, str] = {}
+        # url of probe job of hosts with open breaker by host name
+
+        def waiting(host_name: str)->Callable[[Job], bool]:
+            """
+            Creates predicate of waiting jobs of host_name,
+            probe job stays scheduled to report held jobs after it
+            :param host_name: host name
+            :return: predicate for scheduler.drop
+            """
+            probe = probes.get(host_name)
+            return lambda job: url_host(job[1]) == host_name \
+                and job[1] != probe
+
+        def fail_waiting(host: str, host_name: str, result: PageCheck):
+            """
+            Reports waiting pages of host_name with result of failed
+            page without requesting them
+            :param host: scheduler key of host
+            :param host_name: host name of failed page
+            :param result: result of failed page
+            :return: None
+            """
+            for _, dropped_url, _ in scheduler.drop(host, waiting(host_name)):
+                on_result(
+                    failed_check(dropped_url, result.error, result.status)
+                )
+
+        def hold(host: str, host_name: str, jobs: List[Job]):
+            """
+            Holds jobs of host_name till its breaker lets probe request,
+            one of held jobs is scheduled as probe if there is none
+            :param host: scheduler key of host
+            :param host_name: host name with open breaker
+            :param jobs: jobs to hold
+            :return: None
+            """
+            held.setdefault(host_name, []).extend(jobs)
+            if host_name in probes or not held[host_name]:
+                return
+            probe = held[host_name].pop()
+            probes[host_name] = probe[1]
+            scheduler.put(
+                host, probe, breaker.retry_in(host_name),
+                priorities.get(probe[1], 0.0)
+            )
+
+        def release_held(host: str, host_name: str):
+            """
+            Schedules held jobs of host_name after its breaker closed
+            :param host: scheduler key of host
+            :param host_name: host name with closed breaker
+            :return: None
+            """
+            probes.pop(host_name, None)
+            for job in held.pop(host_name, []):
+                scheduler.put(host, job, priority=priorities.get(job[1], 0.0))
+
+        def fail_held(host_name: str, result: PageCheck):
+            """
+            Reports held jobs of host_name with result of failed probe
+            :param host_name: host name which probe failed
+            :param result: result of probe
+            :return: None
+            """
+            probes.pop(host_name, None)
+            for _, held_url, _ in held.pop(host_name, []):
+                on_result(failed_check(held_url, result.error, result.status))
+
+        async def worker():
+            while True:
+                scheduled = await scheduler.get()
+                if scheduled is None:
+                    return
+                host, job = scheduled
+                crawler, url, attempt = job
+                host_name = url_host(url)
+                probe = probes.get(host_name) == url
+                if breaker.rejection(host_name, url):
+                    scheduler.done(host)
+                    if probe:
+                        # probe is due before cooldown passes
+                        scheduler.put(
+                            host, job, breaker.retry_in(host_name),
+                            priorities.get(url, 0.0)
+                        )
+                    else:
+                        hold(host, host_name, [job])
+                    continue
+                delay = None
+                try:
+                    started = loop.time()
+                    result = await crawler.check(url, validators.get(url))
+                    if on_timing is not None:
+                        on_timing(url, loop.time() - started)
+                    breaker.record(host_name, url, result.error)
+                    delay = self.retry.delay(result, attempt)
+                finally:
+                    scheduler.done(host)
+                if not breaker.is_open(host_name):
+                    release_held(host, host_name)
+                elif probe:
+                    fail_held(host_name, result)
+                else:
+                    hold(host, host_name, scheduler.drop(
+                        host, waiting(host_name)
+                    ))
+                if delay is not None and not breaker.is_open(host_name):
+                    scheduler.put(
+                        host, (crawler, url, attempt + 1), delay,
+                        priorities.get(url, 0.0)
+                    )
+                    continue
+                on_result(result)
+
+                if resolver.failure(host_name):
+                    fail_waiting(host, host_name, result)
+
+        try:
+            await asyncio.gather(*(
+                worker() for _ in range(self.concurrency)
+            ))
+        finally:
+            await transport.close()
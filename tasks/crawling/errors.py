@@ -0,0 +1,60 @@
+"""
+Exceptions raised while checking landing pages
+classes:
+    CrawlerException - base exception of crawler
+    TooManyRedirects - page redirects more times than allowed
+    PageTimeout - page was not checked in time
+    ConnectionFailed - host is unreachable
+    ConnectionReset - connection was dropped by host
+    BrokenResponse - response of host could not be read
+"""
+
+
+class CrawlerException(Exception):
+    """
+    Exception raised by crawler while checking page
+    """
+    pass
+
+
+class TooManyRedirects(CrawlerException):
+    """
+    Exception raised when page redirects more times than allowed
+    """
+    def __init__(self, limit: int):
+        super().__init__(f"Too many redirects (more than {limit})")
+
+
+class PageTimeout(CrawlerException):
+    """
+    Exception raised when host does not connect or respond in time
+    or page is not checked in its time budget
+    Its text is used as status of page, so all timeouts
+    are reported the same way
+    """
+    def __init__(self):
+        super().__init__("Timeout")
+
+
+class ConnectionFailed(CrawlerException):
+    """
+    Exception raised when connection to host could not be established
+    (host does not exist, refuses connections, TLS failed...)
+    Transports raise it with text of original error
+    """
+    pass
+
+
+class ConnectionReset(ConnectionFailed):
+    """
+    Exception raised when host dropped connection while request
+    was sent or response was read, such failures are transient
+    """
+    pass
+
+
+class BrokenResponse(CrawlerException):
+    """
+    Exception raised when response of host is malformed
+    """
+    pass
@@ -0,0 +1,255 @@
+"""
+Module for detecting pages that respond 200 with content of error page
+(as "product not found" page instead of 404)
+classes:
+    ContentFingerprint - streaming hash of page text
+    ErrorPages - fingerprints of error pages of hosts
+functions:
+    url_words - gets words of url path and query
+    fingerprint_body - hashes beginning of response body
+"""
+
+import asyncio
+import codecs
+import hashlib
+import re
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple
+from urllib.parse import urlsplit, unquote_plus
+from uuid import uuid4
+
+from settings.config import CRAWLER_GET_LIMIT, CRAWLER_FINGERPRINT_LIMIT
+from tasks.crawling.transport import Transport, Response
+
+
+# html tag with its closing slash and name
+TAG = re.compile(r"<(/?)([a-zA-Z0-9]*)[^>]*>")
+
+# words of page text, numbers are dropped as they change between pages
+# (ids, prices, dates)
+WORD = re.compile(r"[^\W\d_]+")
+
+# word at the end of text, that may continue in next chunk
+TRAILING_WORD = re.compile(r"[^\W\d_]+$")
+
+# tags which content is not text of page
+SKIPPED_TAGS = frozenset(("script", "style", "noscript", "svg", "template"))
+
+# maximum of characters of unfinished tag kept between chunks
+MAX_CARRY = 4096
+
+# url (after redirects) and fingerprint of error page
+ErrorPage = Tuple[str, str]
+
+
+def url_words(url: str)->FrozenSet[str]:
+    """
+    Gets words of url path and query, error pages often repeat
+    requested url, so these words are not hashed
+    :param url: url
+    :return: lowercase words
+    """
+    parts = urlsplit(url)
+    return frozenset(
+        WORD.findall(unquote_plus(f"{parts.path} {parts.query}").lower())
+    )
+
+
+class ContentFingerprint:
+    """
+    Streaming hash of page text: markup, scripts, styles, numbers and
+    words of requested url are dropped, so pages generated by the same
+    template with the same message get the same fingerprint.
+    No more than limit characters of text are hashed and body
+    is never kept whole
+    Usage:
+        fingerprint = ContentFingerprint(limit, ignored)
+        for chunk in body: fingerprint.feed(chunk)
+        fingerprint.hexdigest()
+    """
+    def __init__(self, limit: int, ignored: Iterable[str]=(),
+                 encoding: str="utf-8"):
+        """
+        :param limit: maximum of text characters hashed
+        :param ignored: words not hashed
+        :param encoding: encoding of body
+        """
+        self.limit = limit
+        self.ignored = frozenset(ignored)
+
+        try:
+            self.__decoder = codecs.getincrementaldecoder(encoding)("ignore")
+        except LookupError:
+            self.__decoder = codecs.getincrementaldecoder("utf-8")("ignore")
+        # decoder keeping bytes of characters split between chunks
+
+        self.__hash = hashlib.sha1()
+        # hash of text words
+
+        self.__hashed: int = 0
+        # characters of text hashed
+
+        self.__carry: str = ""
+        # unfinished tag or word from previous chunk
+
+        self.__skipping: bool = False
+        # is content of skipped tag being read
+
+    @property
+    def full(self)->bool:
+        """
+        Is limit of hashed text reached
+        """
+        return self.__hashed >= self.limit
+
+    def feed(self, chunk: bytes):
+        """
+        Hashes text of next chunk of body
+        :param chunk: bytes of body
+        :return: None
+        """
+        if self.full:
+            return
+        text = self.__carry + self.__decoder.decode(chunk)
+        self.__carry = ""
+        cut = text.rfind("<")
+        if cut != -1 and text.find(">", cut) == -1:
+            text, self.__carry = text[:cut], text[cut:cut + MAX_CARRY]
+        else:
+            word = TRAILING_WORD.search(text)
+            if word:
+                text, self.__carry = text[:word.start()], word.group()
+        self.__hash_text(text)
+
+    def hexdigest(self)->str:
+        """
+        :return: fingerprint of hashed text
+        """
+        if not self.__carry.startswith("<"):
+            self.__hash_text(self.__carry)  # last word of body
+        self.__carry = ""
+        return self.__hash.hexdigest()
+
+    def __hash_text(self, text: str):
+        """
+        Hashes text of page skipping markup
+        :param text: text with complete tags
+        :return: None
+        """
+        position = 0
+        for match in TAG.finditer(text):
+            if not self.__skipping:
+                self.__add(text[position:match.start()])
+            closing, name = match.groups()
+            if name.lower() in SKIPPED_TAGS:
+                self.__skipping = not closing
+            position = match.end()
+        if not self.__skipping:
+            self.__add(text[position:])
+
+    def __add(self, text: str):
+        """
+        Hashes words of text not exceeding limit
+        :param text: text without markup
+        :return: None
+        """
+        for word in WORD.findall(text.lower()):
+            if self.full:
+                return
+            if word in self.ignored:
+                continue
+            self.__hash.update(word.encode("utf-8") + b" ")
+            self.__hashed += len(word) + 1
+
+
+async def fingerprint_body(response: Response, limit: int=CRAWLER_GET_LIMIT,
+                           text_limit: int=CRAWLER_FINGERPRINT_LIMIT)->str:
+    """
+    Hashes beginning of response body reading it chunk by chunk
+    :param response: response of page
+    :param limit: maximum of body bytes read
+    :param text_limit: maximum of text characters hashed
+    :return: fingerprint of page text
+    """
+    fingerprint = ContentFingerprint(
+        text_limit, url_words(response.url), response.encoding or "utf-8"
+    )
+    read = 0
+    while read < limit and not fingerprint.full:
+        chunk = await response.read(min(8192, limit - read))
+        if not chunk:
+            break
+        read += len(chunk)
+        fingerprint.feed(chunk)
+    return fingerprint.hexdigest()
+
+
+class ErrorPages:
+    """
+    Fingerprints of error pages of hosts: host is asked for random
+    nonexistent path once, if it responds 200 (possibly after
+    redirects) fingerprint of that page is kept and pages of host
+    with the same fingerprint are error pages.
+    Probe of host is shared by all crawlers waiting for it
+    """
+    def __init__(self, get_limit: int=CRAWLER_GET_LIMIT,
+                 text_limit: int=CRAWLER_FINGERPRINT_LIMIT):
+        """
+        :param get_limit: maximum of body bytes read
+        :param text_limit: maximum of text characters hashed
+        """
+        self.get_limit = get_limit
+        self.text_limit = text_limit
+
+        self.__error_pages: Dict[str, asyncio.Future] = {}
+        # error page (None if host responds with error status properly)
+        # by scheme and host
+
+    async def is_error_page(self, transport: Transport, url: str,
+                            fingerprint: str,
+                            headers: Optional[Dict[str, str]]=None)->bool:
+        """
+        Checks if page has the same content as error page of its host,
+        page that error page redirects to (as main page) is not error page
+        :param transport: transport to probe host with
+        :param url: url of page (after redirects)
+        :param fingerprint: fingerprint of page
+        :param headers: headers of probe request
+        :return: True if page is error page
+        """
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        if origin not in self.__error_pages:
+            future = asyncio.get_event_loop().create_future()
+            self.__error_pages[origin] = future
+            try:
+                error_page = await self.probe(transport, origin, headers)
+            except Exception:
+                error_page = None
+            except BaseException:
+                del self.__error_pages[origin]  # probed by next page
+                future.set_result(None)
+                raise
+            future.set_result(error_page)
+        error_page = await asyncio.shield(self.__error_pages[origin])
+        return error_page is not None and error_page[1] == fingerprint \
+            and error_page[0] != url
+
+    async def probe(self, transport: Transport, origin: str,
+                    headers: Optional[Dict[str, str]])->Optional[ErrorPage]:
+        """
+        Requests random nonexistent path of host
+        :param transport: transport to send request with
+        :param origin: scheme and host
+        :param headers: headers of request
+        :return: url and fingerprint of error page, None if host
+        responds with error status
+        """
+        async with transport.request(
+                "GET", f"{origin}/{uuid4().hex}", headers or {},
+                allow_redirects=True
+        ) as response:
+            if response.status != 200:
+                return None
+            return response.url, await fingerprint_body(
+                response, self.get_limit, self.text_limit
+            )
@@ -0,0 +1,134 @@
+"""
+Module with headless worker checking pages from shared job table
+(see CrawlJob), so several machines can check pages of one run
+classes:
+    JobWorker - worker leasing jobs and saving results
+"""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+from sqlalchemy.orm import sessionmaker
+
+from settings.config import CRAWLER_JOB_BATCH, CRAWLER_JOB_LEASE, \
+    CRAWLER_JOB_ATTEMPTS, CRAWLER_JOB_POLL
+from model.alchemy.crawl_jobs import CrawlJob
+from tasks.crawling.crawler import PageCheck
+from tasks.crawling.engine import CrawlEngine
+
+
+class JobWorker:
+    """
+    Worker that leases batches of jobs, checks their pages with
+    CrawlEngine and saves results back to job table.
+    While batch is checked its lease is prolonged every third of lease,
+    and ready results are saved, so if worker dies only unsaved jobs
+    are given to other workers after lease expires.
+    All queries to job table are run by single writer thread, so they
+    do not block requests in flight on event loop
+    """
+    def __init__(self, engine, name: str, batch: int=CRAWLER_JOB_BATCH,
+                 lease: float=CRAWLER_JOB_LEASE,
+                 max_attempts: int=CRAWLER_JOB_ATTEMPTS,
+                 poll: float=CRAWLER_JOB_POLL):
+        """
+        :param engine: SQLAlchemy engine of shared job table
+        :param name: unique id of worker
+        :param batch: maximum of jobs leased at once
+        :param lease: seconds while leased jobs are kept by worker
+        :param max_attempts: leases of job before it is failed
+        :param poll: seconds between polls when there is no jobs
+        """
+        self.name = name
+        self.batch = batch
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.poll = poll
+
+        self.__session = sessionmaker(bind=engine, expire_on_commit=False)()
+        # session of shared job table, used by writer thread only
+
+        self.__writer = ThreadPoolExecutor(1)
+        # thread running queries to job table
+
+        self.__log = logging.getLogger(f"worker.{name}")
+        # logger of worker
+
+    def run(self, exit_when_idle: bool=False):
+        """
+        Processes jobs till stopped
+        :param exit_when_idle: return when there is no jobs
+        :return: None
+        """
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            while True:
+                jobs = self.__writer.submit(
+                    CrawlJob.lease, self.__session, self.name, self.batch,
+                    self.lease, self.max_attempts
+                ).result()
+                if not jobs:
+                    if exit_when_idle:
+                        return
+                    time.sleep(self.poll)
+                    continue
+                self.__log.info("leased %d pages", len(jobs))
+                loop.run_until_complete(self.process(jobs))
+        finally:
+            loop.close()
+            self.__writer.submit(self.__session.close).result()
+            self.__writer.shutdown()
+
+    async def process(self, jobs: List[CrawlJob]):
+        """
+        Checks pages of leased jobs, keeps lease and saves results
+        :param jobs: leased jobs
+        :return: None
+        """
+        pages_by_login: Dict[str, List[str]] = {}
+        jobs_by_url: Dict[str, List[int]] = {}
+        validators = {}
+        priorities = {}
+        for job in jobs:
+            priorities[job.url] = job.priority or 0.0
+            pages_by_login.setdefault(job.login, []).append(job.url)
+            jobs_by_url.setdefault(job.url, []).append(job.id)
+            if job.etag or job.last_modified:
+                validators[job.url] = (job.etag, job.last_modified)
+        unfinished = {job.id for job in jobs}
+        done: List[Tuple[int, PageCheck]] = []
+        loop = asyncio.get_event_loop()
+
+        def checked(page: PageCheck):
+            job_id = jobs_by_url[page.url].pop()
+            unfinished.discard(job_id)
+            done.append((job_id, page))
+
+        async def save():
+            results = list(done)
+            done.clear()
+            await loop.run_in_executor(
+                self.__writer, CrawlJob.complete, self.__session, results
+            )
+
+        async def heartbeat():
+            while True:
+                await asyncio.sleep(self.lease / 3)
+                await save()
+                await loop.run_in_executor(
+                    self.__writer, CrawlJob.heartbeat, self.__session,
+                    self.name, set(unfinished), self.lease
+                )
+
+        keeping = asyncio.ensure_future(heartbeat())
+        try:
+            await CrawlEngine().run(
+                pages_by_login, checked, validators, priorities
+            )
+        finally:
+            keeping.cancel()
+            await save()
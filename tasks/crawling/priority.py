@@ -0,0 +1,54 @@
+"""
+Module with priorities of checked pages, so pages that matter most
+are checked in the first minutes of run
+Data-wrappers:
+    PageFacts - what is known about page before check
+functions:
+    is_failure - checks if result of previous check is failure
+    default_score - priority of page by its facts
+"""
+
+from collections import namedtuple
+from typing import Callable, Optional
+
+from tasks.crawling.crawler import get_error_page_warning
+
+
+# failed - page had error status, could not be checked or served error
+# page of its host on previous check
+# ads - number of ads referencing page
+# active - page is referenced by ad of campaign that is on
+PageFacts = namedtuple("PageFacts", "failed ads active")
+
+# function getting priority of page, pages with higher priority
+# are checked earlier
+ScoreFunction = Callable[[PageFacts], float]
+
+
+def is_failure(status: Optional[str], warnings: Optional[str])->bool:
+    """
+    Checks if result of previous check is failure: status is not 2xx
+    or 3xx (error texts as timeouts and connection errors are not
+    status codes) or page served error page of its host.
+    Redirect warnings are not failures, as most ads urls pass
+    tracker redirects
+    :param status: status code or error text
+    :param warnings: all warnings as single string
+    :return: True if page failed
+    """
+    if not status or not status.isdigit() or not 200 <= int(status) < 400:
+        return True
+    return get_error_page_warning(True) in (warnings or "")
+
+
+def default_score(facts: PageFacts)->float:
+    """
+    Priority of page: pages failed on previous check go first,
+    then pages of active campaigns, pages referenced by more ads
+    go first among equal ones
+    :param facts: facts about page
+    :return: priority
+    """
+    return (1000 if facts.failed else 0) \
+        + (100 if facts.active else 0) \
+        + min(facts.ads, 99)
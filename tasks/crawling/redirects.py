@@ -0,0 +1,99 @@
+"""
+Module with cache of redirects shared by all crawlers
+classes:
+    RedirectCache - cache of single redirect hops
+functions:
+    redirect_location - gets target of redirect from response
+"""
+
+import asyncio
+from typing import Dict, Optional, Tuple
+from urllib.parse import urljoin
+
+
+# status codes of redirect responses
+REDIRECT_STATUSES = frozenset((301, 302, 303, 307, 308))
+
+# status code and absolute target url of redirect
+Hop = Tuple[int, str]
+
+
+def redirect_location(response)->Optional[str]:
+    """
+    Gets target of redirect from response
+    :param response: response of transport
+    :return: absolute url of redirect target,
+    None if response is not redirect
+    """
+    location = response.headers.get("Location")
+    if response.status not in REDIRECT_STATUSES or not location:
+        return None
+    return urljoin(response.url, location)
+
+
+class RedirectCache:
+    """
+    Cache of redirect hops: source url -> status code and target url
+    Many ads urls pass through the same tracker or shortener, so hops
+    are resolved once and kept for ttl seconds. While hop is being
+    resolved by one crawler, others requesting it wait for result.
+    Usage:
+        hop = await cache.lookup(url)
+        if hop is None:
+            cache.begin(url)
+            try:
+                ... request url, hop = (status, location) if redirected
+            finally:
+                cache.end(url, hop)
+    """
+    def __init__(self, ttl: float):
+        """
+        :param ttl: seconds while hop is kept
+        """
+        self.ttl = ttl
+
+        self.__hops: Dict[str, Tuple[int, str, float]] = {}
+        # status code, target url and expiration time by source url
+
+        self.__pending: Dict[str, asyncio.Future] = {}
+        # hops that are being resolved by source url
+
+    async def lookup(self, url: str)->Optional[Hop]:
+        """
+        Gets known hop, waits if it is being resolved
+        :param url: source url
+        :return: status code and target url, None if hop is unknown
+        or url is not redirected
+        """
+        while url in self.__pending:
+            await asyncio.shield(self.__pending[url])
+        if url not in self.__hops:
+            return None
+        status, location, expires = self.__hops[url]
+        if expires < asyncio.get_event_loop().time():
+            del self.__hops[url]
+            return None
+        return status, location
+
+    def begin(self, url: str):
+        """
+        Marks hop as being resolved
+        :param url: source url
+        :return: None
+        """
+        self.__pending[url] = asyncio.get_event_loop().create_future()
+
+    def end(self, url: str, hop: Optional[Hop]=None):
+        """
+        Saves resolved hop and wakes crawlers waiting for it
+        :param url: source url
+        :param hop: status code and target url, None if url is not
+        redirected or request failed
+        :return: None
+        """
+        if hop:
+            status, location = hop
+            self.__hops[url] = (
+                status, location, asyncio.get_event_loop().time() + self.ttl
+            )
+        self.__pending.pop(url).set_result(None)
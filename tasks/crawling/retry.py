@@ -0,0 +1,95 @@
+"""
+Module with retry policy for pages that failed for transient reasons
+classes:
+    RetryPolicy - decides if and when failed page is checked again
+functions:
+    is_transient - checks if result of page check may change on retry
+    parse_retry_after - gets seconds to wait from Retry-After header
+"""
+
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from random import uniform
+from typing import Optional
+
+from settings.config import CRAWLER_RETRIES, CRAWLER_RETRY_BASE_DELAY, \
+    CRAWLER_RETRY_MAX_DELAY
+from tasks.crawling.crawler import PageCheck
+from tasks.crawling.errors import ConnectionReset
+
+
+# statuses of overloaded or temporary unavailable servers
+TRANSIENT_STATUSES = frozenset(("429", "502", "503", "504"))
+
+
+def is_transient(result: PageCheck)->bool:
+    """
+    Checks if page failed for reason that may pass on retry:
+    connection was reset or server responded 429, 502, 503 or 504
+    :param result: result of page check
+    :return: True if page should be checked again
+    """
+    if result.error is None:
+        return result.status in TRANSIENT_STATUSES
+    return isinstance(result.error, ConnectionReset)
+
+
+def parse_retry_after(value: Optional[str])->Optional[float]:
+    """
+    Gets seconds to wait from Retry-After header
+    that is either number of seconds or HTTP date
+    :param value: value of header
+    :return: seconds to wait, None if header is missing or malformed
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class RetryPolicy:
+    """
+    Policy of retrying transient failures (see is_transient)
+    with exponential backoff: n-th retry waits from half to full of
+    base_delay * 2 ** n seconds (no more than max_delay), random part
+    spreads retries of pages failed at once.
+    Delay requested by server in Retry-After is respected,
+    page is not retried if server asks to wait longer than max_delay
+    """
+    def __init__(self, retries: int=CRAWLER_RETRIES,
+                 base_delay: float=CRAWLER_RETRY_BASE_DELAY,
+                 max_delay: float=CRAWLER_RETRY_MAX_DELAY):
+        """
+        :param retries: maximum of retries of one page
+        :param base_delay: seconds before first retry
+        :param max_delay: maximal seconds before retry
+        """
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, result: PageCheck, attempt: int)->Optional[float]:
+        """
+        Gets seconds to wait before checking page again
+        :param result: result of page check
+        :param attempt: number of retries already done
+        :return: seconds to wait, None if page should not be retried
+        """
+        if attempt >= self.retries or not is_transient(result):
+            return None
+        backoff = min(self.max_delay, self.base_delay * 2 ** attempt)
+        delay = uniform(backoff / 2, backoff)
+        requested = parse_retry_after(result.retry_after)
+        if requested is not None:
+            if requested > self.max_delay:
+                return None
+            delay = max(delay, requested)
+        return delay
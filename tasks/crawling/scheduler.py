@@ -0,0 +1,202 @@
+"""
+Module with scheduler of crawl jobs
+classes:
+    HostScheduler - scheduler keeping politeness limits per host
+"""
+
+import asyncio
+from collections import defaultdict
+from heapq import heappush, heappop, heapify
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+
+class HostScheduler:
+    """
+    Scheduler of crawl jobs keyed by host (generally registered domain)
+    Jobs of one host are started no more often than once per min_gap
+    seconds and no more than max_active of them run at once, jobs
+    of other hosts are started while host waits.
+    Jobs with higher priority are started first: among hosts that may
+    start job the host with most important waiting job is chosen,
+    and its most important job is started.
+    Usage by each worker:
+        job = await scheduler.get() - None when all jobs are finished
+        ... process job ...
+        scheduler.done(host) - when job of host is finished
+    Waiting jobs that should not be processed (as jobs of failed host)
+    are removed by scheduler.drop.
+    Job put with delay (as retry) is queued when its delay passes,
+    workers process other jobs meanwhile
+    """
+    def __init__(self, min_gap: float, max_active: int):
+        """
+        :param min_gap: minimal seconds between starts of jobs of one host
+        :param max_active: maximum of running jobs of one host
+        """
+        self.min_gap = min_gap
+        self.max_active = max_active
+
+        self.__queues: Dict[str, List[Tuple[float, int, Any]]] = \
+            defaultdict(list)
+        # heap of (negative priority, order of put, job) of each host
+
+        self.__waiting: List[Tuple[float, str]] = []
+        # heap of (time when host may start next job, host)
+
+        self.__ready: List[Tuple[float, str]] = []
+        # heap of (negative priority of most important job, host)
+        # of hosts that may start job now
+
+        self.__scheduled: Set[str] = set()
+        # hosts that are in waiting or ready heap
+
+        self.__active: Dict[str, int] = defaultdict(int)
+        # running jobs of each host
+
+        self.__last_start: Dict[str, float] = {}
+        # time when last job of each host was started
+
+        self.__running: int = 0
+        # running jobs of all hosts
+
+        self.__delayed: List[Tuple[float, int, str, Any, float]] = []
+        # heap of (time when job is queued, order of put, host, job,
+        # priority)
+
+        self.__order: int = 0
+        # jobs put, keeps order of jobs with the same priority or time
+
+        self.__changed = asyncio.Event()
+        # set each time when jobs may become available
+
+    def put(self, host: str, job: Any, delay: float=0.0,
+            priority: float=0.0):
+        """
+        Adds job to queue of host
+        :param host: key which politeness limits are applied to
+        :param job: any job item
+        :param delay: seconds before job is queued
+        :param priority: importance of job, higher is started earlier
+        :return: None
+        """
+        self.__order += 1
+        if delay > 0:
+            queued_at = asyncio.get_event_loop().time() + delay
+            heappush(
+                self.__delayed,
+                (queued_at, self.__order, host, job, priority)
+            )
+            self.__notify()
+            return
+        heappush(self.__queues[host], (-priority, self.__order, job))
+        self.__schedule(host)
+
+    async def get(self)->Optional[Tuple[str, Any]]:
+        """
+        Waits till job of some host may be started
+        :return: host and job, None if there is no jobs left
+        """
+        loop = asyncio.get_event_loop()
+        while True:
+            now = loop.time()
+            while self.__delayed and self.__delayed[0][0] <= now:
+                _, _, host, job, priority = heappop(self.__delayed)
+                self.put(host, job, priority=priority)
+            while self.__waiting and self.__waiting[0][0] <= now:
+                _, host = heappop(self.__waiting)
+                if self.__queues[host]:
+                    heappush(self.__ready, (self.__queues[host][0][0], host))
+                else:
+                    self.__scheduled.discard(host)
+            while self.__ready:
+                key, host = heappop(self.__ready)
+                queue = self.__queues[host]
+                if not queue:
+                    self.__scheduled.discard(host)
+                    continue  # all jobs of host were dropped
+                if queue[0][0] != key:
+                    # more important job was put or top job was dropped
+                    heappush(self.__ready, (queue[0][0], host))
+                    continue
+                self.__scheduled.discard(host)
+                _, _, job = heappop(queue)
+                self.__active[host] += 1
+                self.__last_start[host] = now
+                self.__running += 1
+                self.__schedule(host)
+                return host, job
+            if not self.__waiting and not self.__running \
+                    and not self.__delayed:
+                return None
+            wake_at = [heap[0][0] for heap in (self.__waiting, self.__delayed)
+                       if heap]
+            await self.__wait(min(wake_at) - now if wake_at else None)
+
+    def drop(self, host: str, predicate: Callable[[Any], bool])->List[Any]:
+        """
+        Removes waiting and delayed jobs of host matching predicate
+        :param host: host which jobs are removed
+        :param predicate: function returning True for jobs to remove
+        :return: removed jobs
+        """
+        queue = self.__queues[host]
+        dropped = [item[2] for item in queue if predicate(item[2])]
+        if dropped:
+            self.__queues[host] = [
+                item for item in queue if not predicate(item[2])
+            ]
+            heapify(self.__queues[host])
+        delayed = [item for item in self.__delayed
+                   if item[2] == host and predicate(item[3])]
+        if delayed:
+            self.__delayed = [item for item in self.__delayed
+                              if item[2] != host or not predicate(item[3])]
+            heapify(self.__delayed)
+            dropped.extend(item[3] for item in delayed)
+        return dropped
+
+    def done(self, host: str):
+        """
+        Marks job of host as finished
+        :param host: host of finished job
+        :return: None
+        """
+        self.__active[host] -= 1
+        self.__running -= 1
+        self.__schedule(host)
+        self.__notify()
+
+    def __schedule(self, host: str):
+        """
+        Puts host to waiting heap if it has waiting jobs
+        and its running jobs limit is not reached
+        :param host: host to schedule
+        :return: None
+        """
+        if host in self.__scheduled or not self.__queues[host] \
+                or self.__active[host] >= self.max_active:
+            return
+        ready_at = self.__last_start[host] + self.min_gap \
+            if host in self.__last_start else 0.0
+        heappush(self.__waiting, (ready_at, host))
+        self.__scheduled.add(host)
+        self.__notify()
+
+    def __notify(self):
+        """
+        Wakes all waiting workers
+        :return: None
+        """
+        self.__changed.set()
+        self.__changed = asyncio.Event()
+
+    async def __wait(self, timeout: Optional[float]):
+        """
+        Waits till jobs may become available or till timeout
+        :param timeout: seconds to wait, None to wait without timeout
+        :return: None
+        """
+        try:
+            await asyncio.wait_for(self.__changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
@@ -0,0 +1,77 @@
+"""
+Module for checking pages in several processes
+Pages are split by registered domain, so politeness limits of host
+are kept by single process, CRAWLER_CONCURRENCY is split between
+processes, so it limits requests in flight of all of them
+functions:
+    shard_by_host - splits pages to shards by host
+    crawl_shard - checks pages of single shard (runs in child process)
+"""
+
+import asyncio
+from typing import Dict, List, Optional
+from zlib import crc32
+
+from settings.config import CRAWLER_CONCURRENCY
+from tasks.crawling.crawler import Validators
+from tasks.crawling.engine import CrawlEngine
+from tasks.crawling.errors import CrawlerException
+from tasks.crawling.urls import url_host, registered_domain
+
+
+def shard_by_host(pages_by_login: Dict[str, List[str]],
+                  shards: int)->List[Dict[str, List[str]]]:
+    """
+    Splits pages to shards so all pages of registered domain are
+    in the same shard
+    :param pages_by_login: dictionary where
+        keys - clients logins
+        values - lists of urls belonging to one client
+    :param shards: number of shards
+    :return: list of pages grouped by login for each shard
+    """
+    result = [{} for _ in range(shards)]
+    for login, pages in pages_by_login.items():
+        for url in pages:
+            # crc32 is used as it does not change between processes
+            host = registered_domain(url_host(url)).encode("utf-8")
+            result[crc32(host) % shards].setdefault(login, []).append(url)
+    return result
+
+
+def crawl_shard(pages_by_login: Dict[str, List[str]],
+                validators: Optional[Dict[str, Validators]],
+                priorities: Optional[Dict[str, float]], results,
+                processes: int=1):
+    """
+    Checks pages of shard on its own event loop and puts each
+    result to queue as PageCheck tuple. Exceptions are not sent
+    (they are not always picklable), their text is status of page.
+    After all pages queue gets None, if shard failed
+    queue gets CrawlerException before it
+    :param pages_by_login: pages of shard grouped by login
+    :param validators: ETag and Last-Modified of pages checked earlier
+    by url
+    :param priorities: priorities of pages by url
+    :param results: multiprocessing queue for results
+    :param processes: number of processes checking shards, each of them
+    keeps its share of CRAWLER_CONCURRENCY requests in flight
+    :return: None
+    """
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_until_complete(
+            CrawlEngine(
+                concurrency=max(1, CRAWLER_CONCURRENCY // processes)
+            ).run(
+                pages_by_login,
+                lambda page: results.put(tuple(page._replace(error=None))),
+                validators, priorities
+            )
+        )
+    except Exception as e:
+        results.put(CrawlerException(f"Crawling process failed: {e}"))
+    finally:
+        loop.close()
+        results.put(None)
@@ -1,48 +1,456 @@
 """
 Module with tasks for crawling pages
 classes:
-    CheckUrls - task for checking URLS of one client
+    CheckUrls - task for checking URLS of all clients
+    LoadCheckpoint - task getting pages of unfinished run
 """
-from typing import Dict, List
+import asyncio
+import multiprocessing
+import queue
+import time
+from typing import Dict, List, Optional, Set, Tuple
+from uuid import uuid4
 
 from PyQt5.QtCore import QThread, pyqtSignal
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
 
-from tasks.crawling.crawler import SiteCrawler
+from settings.config import CRAWLER_CACHE_TTL, CRAWLER_CACHE_SIZE, \
+    CRAWLER_PROCESSES, CRAWLER_JOBS_DB, CRAWLER_JOB_POLL, CRAWLER_RUN_DEADLINE
+from model.alchemy.common import engine, cache_engine, JobsBase
+from model.alchemy.crawl_cache import CrawlCacheEntry, CrawlCheckpoint
+from model.alchemy.crawl_jobs import CrawlJob
+from model.alchemy.links import LinkUrl
+from tasks.crawling.crawler import PageCheck, Validators
+from tasks.crawling.engine import CrawlEngine, ResultCallback
+from tasks.crawling.errors import CrawlerException
+from tasks.crawling.priority import PageFacts, ScoreFunction, \
+    default_score, is_failure
+from tasks.crawling.sharding import shard_by_host, crawl_shard
+from tasks.crawling.urls import normalize_url
 
 
 class CheckUrls(QThread):
     """
     Crawling task for checking all provided urls
-    (generally all pages of one client)
-    :emits got_url(url, status_code, warnings): emits when
-    one particular page is parsed
+    (generally all pages of all clients)
+    Pipeline:
+        - urls are normalized (see normalize_url), so equivalent urls
+        are checked once and result is emitted for each of them;
+        normalized url is only the key of equivalent urls, the first
+        of provided urls is requested, as stripped url may be not
+        referenced by any ad
+        - pages checked not earlier than cache ttl ago are taken from
+        cache
+        - other pages are checked concurrently by CrawlEngine on event
+        loop running in this thread and saved to cache
+        - if processes is more than 1, pages are split by host between
+        processes, each running its own CrawlEngine, results are sent
+        back to this thread through queue
+        - if jobs_db is set, pages are enqueued to shared job table and
+        checked by workers (see worker.py), this thread only collects
+        results
+    Pages are checked in order of priority given by score function
+    (see PageFacts): by default pages failed on previous check,
+    pages of active campaigns and pages referenced by many ads go first.
+    Stale pages that were fine last time are checked with conditional
+    requests, and if server responds 304 (not modified) cached
+    result is reused.
+    Pages of run are saved to checkpoint and marked as they are checked,
+    so run stopped by deadline or app exit is resumed (resume=True)
+    without checking finished pages again
+    :emits got_urls(pages): emits when batch of pages is parsed
+    (each commit_every pages and when task is finished), so pages
+    are saved to DB by batches; pages - list of tuples
         url - url of parsed page
         status_code - status code of parsed page as string
         warnings - all warnings as single string
     """
-    got_url = pyqtSignal(str, str, str)
+    got_urls = pyqtSignal(list)
     error_occurred = pyqtSignal(Exception)
 
-    def __init__(self, pages_by_login: Dict[str, List[str]]):
+    # results saved to cache per one commit and emitted per one batch
+    commit_every = 100
+
+    def __init__(self, pages_by_login: Dict[str, List[str]],
+                 cache_ttl: int=CRAWLER_CACHE_TTL,
+                 cache_size: int=CRAWLER_CACHE_SIZE,
+                 processes: int=CRAWLER_PROCESSES,
+                 jobs_db: Optional[str]=CRAWLER_JOBS_DB,
+                 score: ScoreFunction=default_score,
+                 deadline: Optional[float]=CRAWLER_RUN_DEADLINE,
+                 resume: bool=False):
         """
-        :param pages_by_login: dictionary where 
+        :param pages_by_login: dictionary where
             keys - clients logins
             values - lists of urls belonging to one client
+        :param cache_ttl: seconds while page check result is reused
+        :param cache_size: maximum of page check results kept in cache
+        :param processes: number of processes checking pages
+        :param jobs_db: SQLAlchemy url of job table shared with workers
+        :param score: function getting priority of page
+        :param deadline: seconds of checking pages, unchecked pages
+        are left for resumed run, no limit if None
+        :param resume: continue saved run, pages checked in it
+        are taken from cache however old they are
         """
         super().__init__()
-        print(pages_by_login)
-        self.crawlers = [
-            iter(SiteCrawler(self, pages))
-            for login, pages in pages_by_login.items()
-        ]
+        self.pages_by_login = pages_by_login
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self.processes = processes
+        self.jobs_db = jobs_db
+        self.score = score
+        self.deadline = deadline
+        self.resume = resume
+
+        self.__originals: Dict[str, List[str]] = {}
+        # provided urls by normalized urls
+
+        self.__stop_at: Optional[float] = None
+        # monotonic time when checking pages stops
+
+        self.__unemitted: List[Tuple[str, str, str]] = []
+        # results of pages that are not emitted yet
+
+    def run(self):
+        session = sessionmaker(bind=cache_engine, expire_on_commit=False)()
+        if self.deadline is not None:
+            self.__stop_at = time.monotonic() + self.deadline
+        try:
+            pages_by_login = self.deduplicate()
+            if self.resume:
+                finished = CrawlCheckpoint.finished(session)
+            else:
+                finished = set()
+                CrawlCheckpoint.save(session, (
+                    (url, login, normalize_url(url))
+                    for login, pages in self.pages_by_login.items()
+                    for url in pages
+                ))
+            stale_by_login, previous = self.emit_cached(
+                session, pages_by_login, finished
+            )
+            revalidated = {
+                url: entry for url, entry in previous.items()
+                if entry.status == "200"
+                and (entry.etag or entry.last_modified)
+            }
+            priorities = self.prioritize(stale_by_login, previous)
+            validators = {
+                url: (entry.etag, entry.last_modified)
+                for url, entry in revalidated.items()
+            }
+            keys = {
+                self.__originals[key][0]: key
+                for pages in stale_by_login.values() for key in pages
+            }
+            # normalized urls by requested urls
+            unsaved = 0
+
+            def checked(page: PageCheck):
+                nonlocal unsaved
+                page = page._replace(url=keys[page.url])
+                if page.status == "304" and page.url in revalidated:
+                    entry = revalidated[page.url]
+                    page = PageCheck(
+                        page.url, entry.status, entry.warning_text,
+                        entry.redirect_chain,
+                        page.etag or entry.etag,
+                        page.last_modified or entry.last_modified,
+                        None, None
+                    )
+                CrawlCacheEntry.store(
+                    session, page.url, page.status, page.warnings,
+                    page.redirects, page.etag, page.last_modified
+                )
+                CrawlCheckpoint.mark_done(session, page.url)
+                unsaved += 1
+                if unsaved >= self.commit_every:
+                    session.commit()
+                    unsaved = 0
+                self.emit(page.url, page.status, page.warnings)
+
+            if self.jobs_db:
+                crawl = self.crawl_distributed
+            elif self.processes > 1:
+                crawl = self.crawl_sharded
+            else:
+                crawl = self.crawl
+            crawl(
+                {
+                    login: [self.__originals[key][0] for key in pages]
+                    for login, pages in stale_by_login.items()
+                },
+                {self.__originals[key][0]: value
+                 for key, value in validators.items()},
+                {self.__originals[key][0]: value
+                 for key, value in priorities.items()},
+                checked
+            )
+            session.commit()
+            if not CrawlCheckpoint.is_unfinished(session):
+                CrawlCheckpoint.clear(session)
+            CrawlCacheEntry.evict(session, self.cache_size)
+        except Exception as e:
+            self.error_occurred.emit(e)
+        finally:
+            self.flush()
+            session.close()
+
+    def remaining(self)->Optional[float]:
+        """
+        :return: seconds left till deadline, None if there is no deadline
+        """
+        if self.__stop_at is None:
+            return None
+        return max(0.0, self.__stop_at - time.monotonic())
+
+    def crawl(self, pages_by_login: Dict[str, List[str]],
+              validators: Dict[str, Validators],
+              priorities: Dict[str, float], on_result: ResultCallback):
+        """
+        Checks pages on event loop running in this thread
+        :param pages_by_login: urls to request grouped by login
+        :param validators: ETag and Last-Modified of pages by url
+        :param priorities: priorities of pages by url
+        :param on_result: callback for every checked page
+        :return: None
+        """
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(asyncio.wait_for(
+                CrawlEngine().run(
+                    pages_by_login, on_result, validators, priorities
+                ),
+                self.remaining()
+            ))
+        except asyncio.TimeoutError:
+            pass  # deadline reached, rest of pages is left for next run
+        finally:
+            loop.close()
+
+    def crawl_sharded(self, pages_by_login: Dict[str, List[str]],
+                      validators: Dict[str, Validators],
+                      priorities: Dict[str, float],
+                      on_result: ResultCallback):
+        """
+        Checks pages in processes pool, pages are split between
+        processes by host (see shard_by_host), results are
+        passed to callback in this thread as they come
+        :param pages_by_login: urls to request grouped by login
+        :param validators: ETag and Last-Modified of pages by url
+        :param priorities: priorities of pages by url
+        :param on_result: callback for every checked page
+        :return: None
+        """
+        # processes are spawned as forking process with Qt is unsafe
+        context = multiprocessing.get_context("spawn")
+        results = context.Queue()
+        workers = []
+        for shard in shard_by_host(pages_by_login, self.processes):
+            if not shard:
+                continue
+            shard_urls = [url for pages in shard.values() for url in pages]
+            workers.append(context.Process(
+                target=crawl_shard,
+                args=(
+                    shard,
+                    {url: validators[url]
+                     for url in shard_urls if url in validators},
+                    {url: priorities[url]
+                     for url in shard_urls if url in priorities},
+                    results,
+                    self.processes
+                ),
+                daemon=True
+            ))
+        for worker in workers:
+            worker.start()
+        try:
+            finished = 0
+            while finished < len(workers):
+                if self.remaining() == 0:
+                    break  # deadline reached, processes are terminated
+                try:
+                    item = results.get(timeout=min(1, self.remaining() or 1))
+                except queue.Empty:
+                    if not any(worker.is_alive() for worker in workers):
+                        raise CrawlerException(
+                            "Crawling process exited unexpectedly"
+                        )
+                    continue
+                if item is None:
+                    finished += 1
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    on_result(PageCheck(*item))
+        finally:
+            for worker in workers:
+                if worker.is_alive():
+                    worker.terminate()
+                worker.join()
+
+    def crawl_distributed(self, pages_by_login: Dict[str, List[str]],
+                          validators: Dict[str, Validators],
+                          priorities: Dict[str, float],
+                          on_result: ResultCallback):
+        """
+        Enqueues pages to shared job table and passes results
+        saved by workers to callback till all pages are checked
+        :param pages_by_login: urls to request grouped by login
+        :param validators: ETag and Last-Modified of pages by url
+        :param priorities: priorities of pages by url
+        :param on_result: callback for every checked page
+        :return: None
+        """
+        engine = create_engine(self.jobs_db)
+        JobsBase.metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+        run_id = uuid4().hex
+        try:
+            CrawlJob.enqueue(
+                session, run_id, pages_by_login, validators, priorities
+            )
+            while True:
+                pending = CrawlJob.pending(session, run_id)
+                for job in CrawlJob.collect(session, run_id):
+                    on_result(PageCheck(
+                        job.url, job.status, job.warning_text,
+                        job.redirect_chain, job.etag, job.last_modified,
+                        None, None
+                    ))
+                if not pending or self.remaining() == 0:
+                    break
+                self.sleep(CRAWLER_JOB_POLL)
+        finally:
+            CrawlJob.clear(session, run_id)
+            session.close()
+
+    def deduplicate(self)->Dict[str, List[str]]:
+        """
+        Collapses equivalent urls to single normalized url,
+        page referenced by several clients is checked as page of
+        the first of them
+        :return: normalized urls grouped by login
+        """
+        pages_by_login = {}
+        for login, pages in self.pages_by_login.items():
+            pages_by_login[login] = []
+            for url in pages:
+                key = normalize_url(url)
+                if key in self.__originals:
+                    self.__originals[key].append(url)
+                else:
+                    self.__originals[key] = [url]
+                    pages_by_login[login].append(key)
+        return pages_by_login
+
+    def emit(self, key: str, status: str, warnings: str):
+        """
+        Emits result of page check for all urls equivalent to checked one,
+        results are emitted by batches of commit_every pages
+        :param key: normalized url of checked page
+        :param status: status code or error text
+        :param warnings: all warnings as single string
+        :return: None
+        """
+        for url in self.__originals[key]:
+            self.__unemitted.append((url, status, warnings))
+        if len(self.__unemitted) >= self.commit_every:
+            self.flush()
+
+    def flush(self):
+        """
+        Emits results of pages that are not emitted yet as single batch
+        :return: None
+        """
+        if self.__unemitted:
+            self.got_urls.emit(self.__unemitted)
+            self.__unemitted = []
+
+    def emit_cached(self, session, pages_by_login: Dict[str, List[str]],
+                    finished: Set[str])\
+            ->Tuple[Dict[str, List[str]], Dict[str, CrawlCacheEntry]]:
+        """
+        Emits results of pages found fresh in cache
+        :param session: SQLAlchemy session of cache database
+        :param pages_by_login: normalized urls grouped by login
+        :param finished: normalized urls checked in resumed run,
+        their cached results are used however old they are
+        :return: pages that are not in cache or stale grouped by login,
+        stale entries by normalized urls
+        """
+        cached = CrawlCacheEntry.by_urls(session, self.__originals)
+        stale_by_login = {}
+        previous = {}
+        for login, pages in pages_by_login.items():
+            stale_by_login[login] = []
+            for url in pages:
+                entry = cached.get(url)
+                if entry and (
+                        url in finished or entry.is_fresh(self.cache_ttl)
+                ):
+                    CrawlCheckpoint.mark_done(session, url)
+                    self.emit(url, entry.status, entry.warning_text)
+                    continue
+                if entry:
+                    previous[url] = entry
+                stale_by_login[login].append(url)
+        return stale_by_login, previous
+
+    def prioritize(self, pages_by_login: Dict[str, List[str]],
+                   previous: Dict[str, CrawlCacheEntry])->Dict[str, float]:
+        """
+        Gets priorities of pages by score function using previous
+        checks and ads referencing pages
+        :param pages_by_login: normalized urls grouped by login
+        :param previous: stale cache entries by normalized urls
+        :return: priorities by normalized urls
+        """
+        session = sessionmaker(bind=engine)()
+        try:
+            stats = LinkUrl.ads_stats(session)
+        finally:
+            session.close()
+        priorities = {}
+        for pages in pages_by_login.values():
+            for url in pages:
+                entry = previous.get(url)
+                referenced = [
+                    stats[original] for original in self.__originals[url]
+                    if original in stats
+                ]
+                priorities[url] = self.score(PageFacts(
+                    failed=bool(entry) and is_failure(
+                        entry.status, entry.warning_text
+                    ),
+                    ads=sum(ads for ads, _ in referenced),
+                    active=any(active for _, active in referenced)
+                ))
+        return priorities
+
+
+class LoadCheckpoint(QThread):
+    """
+    Task getting pages of run that was not finished
+    (stopped by deadline or app exit)
+    :emits got_pages(pages_by_login): pages of unfinished run,
+    empty dictionary if there is no such run
+    """
+    got_pages = pyqtSignal(dict)
+    error_occurred = pyqtSignal(Exception)
 
     def run(self):
-        while self.crawlers:
-            crawler = self.crawlers.pop(0)
-            try:
-                url, answer, warnings = crawler.__next__()
-            except StopIteration:
-                pass
+        session = sessionmaker(bind=cache_engine)()
+        try:
+            if CrawlCheckpoint.is_unfinished(session):
+                self.got_pages.emit(CrawlCheckpoint.pages(session))
             else:
-                self.got_url.emit(url, answer, warnings)
-                self.crawlers.append(crawler)
+                self.got_pages.emit({})
+        except Exception as e:
+            self.error_occurred.emit(e)
+        finally:
+            session.close()
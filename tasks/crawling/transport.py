@@ -0,0 +1,290 @@
+"""
+Module with transports sending requests of crawler
+Crawler works with Transport and Response interfaces only, errors
+of HTTP libraries are translated to crawler errors (see errors module)
+classes:
+    Response - response of host
+    Transport - interface of transport
+    AiohttpTransport - HTTP/1.1 transport based on aiohttp session
+    HttpxTransport - HTTP/2 transport based on httpx client, requests
+    to one host are multiplexed over single connection
+"""
+
+import asyncio
+import errno
+from contextlib import contextmanager
+from typing import Dict, Mapping, Optional
+
+from aiohttp import ClientSession, ClientConnectionError, ClientOSError, \
+    ClientPayloadError, ClientResponseError, ServerDisconnectedError
+
+from tasks.crawling.errors import CrawlerException, PageTimeout, \
+    ConnectionFailed, ConnectionReset, BrokenResponse
+
+try:
+    import httpx
+except ImportError:
+    httpx = None  # HTTP/2 transport is not available
+
+
+# errors of connection dropped by host
+RESET_ERRNOS = frozenset((errno.ECONNRESET, errno.EPIPE))
+
+
+class Response:
+    """
+    Response of host, body is not read until requested
+    fields:
+        status - status code
+        headers - case insensitive mapping of headers
+        url - url of response
+        encoding - charset of body if declared
+    """
+    status: int
+    headers: Mapping[str, str]
+    url: str
+    encoding: Optional[str]
+
+    async def read(self, size: int)->bytes:
+        """
+        Reads next part of body
+        :param size: maximum of bytes to read
+        :return: bytes of body, empty if body is read
+        """
+        raise NotImplementedError
+
+
+class Transport:
+    """
+    Interface of transport sending requests of crawler
+    Usage:
+        async with transport.request(method, url, headers) as response:
+            ... response.status, await response.read(size) ...
+        await transport.close() - when crawling is finished
+    """
+    def request(self, method: str, url: str, headers: Dict[str, str],
+                allow_redirects: bool=False):
+        """
+        Sends request
+        :param method: HTTP method
+        :param url: url of page
+        :param headers: request headers
+        :param allow_redirects: follow redirects
+        :return: async context manager of Response
+        """
+        raise NotImplementedError
+
+    async def close(self):
+        """
+        Closes all connections
+        :return: None
+        """
+        raise NotImplementedError
+
+
+@contextmanager
+def aiohttp_errors():
+    """
+    Inner context manager translating aiohttp errors to crawler errors
+    """
+    try:
+        yield
+    except asyncio.TimeoutError as e:
+        raise PageTimeout() from e
+    except ServerDisconnectedError as e:
+        raise ConnectionReset(str(e) or "Server disconnected") from e
+    except ClientOSError as e:
+        if e.errno in RESET_ERRNOS:
+            raise ConnectionReset(str(e)) from e
+        raise ConnectionFailed(str(e)) from e
+    except ClientConnectionError as e:
+        raise ConnectionFailed(str(e)) from e
+    except (ClientPayloadError, ClientResponseError) as e:
+        raise BrokenResponse(str(e)) from e
+
+
+class AiohttpResponse(Response):
+    """
+    Response wrapping aiohttp.ClientResponse
+    """
+    def __init__(self, response):
+        """
+        :param response: aiohttp.ClientResponse
+        """
+        self.status = response.status
+        self.headers = response.headers
+        self.url = str(response.url)
+        self.encoding = response.charset
+
+        self.__response = response
+        # wrapped response
+
+    async def read(self, size: int)->bytes:
+        with aiohttp_errors():
+            return await self.__response.content.read(size)
+
+
+class AiohttpRequest:
+    """
+    Inner async context manager sending request with aiohttp session
+    and releasing connection on exit
+    """
+    def __init__(self, session: ClientSession, method: str, url: str,
+                 headers: Dict[str, str], allow_redirects: bool):
+        self.__request = lambda: session.request(
+            method, url, headers=headers, allow_redirects=allow_redirects
+        )
+        # sends request when awaited
+
+        self.__response = None
+        # aiohttp.ClientResponse
+
+    async def __aenter__(self)->AiohttpResponse:
+        with aiohttp_errors():
+            self.__response = await self.__request()
+        return AiohttpResponse(self.__response)
+
+    async def __aexit__(self, *exc_info):
+        self.__response.release()
+
+
+class AiohttpTransport(Transport):
+    """
+    HTTP/1.1 transport sending requests with aiohttp session,
+    each request takes connection from pool of session
+    """
+    def __init__(self, session: ClientSession):
+        """
+        :param session: session with connections pool
+        """
+        self.__session = session
+        # session with connections pool
+
+    def request(self, method: str, url: str, headers: Dict[str, str],
+                allow_redirects: bool=False)->AiohttpRequest:
+        return AiohttpRequest(
+            self.__session, method, url, headers, allow_redirects
+        )
+
+    async def close(self):
+        await self.__session.close()
+
+
+@contextmanager
+def httpx_errors():
+    """
+    Inner context manager translating httpx errors to crawler errors
+    """
+    try:
+        yield
+    except httpx.TimeoutException as e:
+        raise PageTimeout() from e
+    except (httpx.RemoteProtocolError, httpx.ReadError,
+            httpx.WriteError) as e:
+        raise ConnectionReset(str(e) or type(e).__name__) from e
+    except httpx.NetworkError as e:
+        raise ConnectionFailed(str(e) or type(e).__name__) from e
+    except httpx.HTTPError as e:
+        raise BrokenResponse(str(e) or type(e).__name__) from e
+
+
+class HttpxResponse(Response):
+    """
+    Response wrapping streamed httpx.Response
+    """
+    def __init__(self, response):
+        """
+        :param response: httpx.Response
+        """
+        self.status = response.status_code
+        self.headers = response.headers
+        self.url = str(response.url)
+        self.encoding = response.charset_encoding
+
+        self.__chunks = response.aiter_bytes()
+        # iterator of body chunks
+
+        self.__buffer: bytes = b""
+        # part of chunk left from previous read
+
+    async def read(self, size: int)->bytes:
+        with httpx_errors():
+            while len(self.__buffer) < size:
+                try:
+                    self.__buffer += await self.__chunks.__anext__()
+                except StopAsyncIteration:
+                    break
+        data, self.__buffer = self.__buffer[:size], self.__buffer[size:]
+        return data
+
+
+class HttpxRequest:
+    """
+    Inner async context manager sending request with httpx client
+    and closing response stream on exit
+    """
+    def __init__(self, client, method: str, url: str,
+                 headers: Dict[str, str], allow_redirects: bool):
+        self.__stream = client.stream(
+            method, url, headers=headers, follow_redirects=allow_redirects
+        )
+        # context manager of streamed response
+
+    async def __aenter__(self)->HttpxResponse:
+        with httpx_errors():
+            return HttpxResponse(await self.__stream.__aenter__())
+
+    async def __aexit__(self, *exc_info):
+        await self.__stream.__aexit__(*exc_info)
+
+
+class HttpxTransport(Transport):
+    """
+    HTTP/2 transport sending requests with httpx client: requests
+    to host supporting HTTP/2 are multiplexed over single connection,
+    so many pages of one host are checked concurrently without more
+    sockets, other hosts are requested with HTTP/1.1
+    """
+    def __init__(self, concurrency: int, keepalive: float,
+                 connect_timeout: float, read_timeout: float,
+                 headers: Optional[Dict[str, str]]=None):
+        """
+        :param concurrency: maximum of connections
+        :param keepalive: seconds while idle connection is kept
+        :param connect_timeout: seconds to connect to host
+        :param read_timeout: seconds to wait for data from host
+        :param headers: headers sent with every request
+        :raises CrawlerException: if httpx or h2 is not installed
+        """
+        if httpx is None:
+            raise CrawlerException(
+                "HTTP/2 transport needs httpx (pip install httpx[http2])"
+            )
+        try:
+            self.__client = httpx.AsyncClient(
+                http2=True,
+                limits=httpx.Limits(
+                    max_connections=concurrency,
+                    max_keepalive_connections=concurrency,
+                    keepalive_expiry=keepalive
+                ),
+                timeout=httpx.Timeout(
+                    connect=connect_timeout, read=read_timeout,
+                    write=read_timeout, pool=None
+                ),
+                headers=headers
+            )
+            # client with connections pool
+        except ImportError as e:  # h2 is not installed
+            raise CrawlerException(
+                "HTTP/2 transport needs h2 (pip install httpx[http2])"
+            ) from e
+
+    def request(self, method: str, url: str, headers: Dict[str, str],
+                allow_redirects: bool=False)->HttpxRequest:
+        return HttpxRequest(
+            self.__client, method, url, headers, allow_redirects
+        )
+
+    async def close(self):
+        await self.__client.aclose()
@@ -0,0 +1,111 @@
+"""
+Module with helpers for crawled urls
+functions:
+    url_host - gets host part of url
+    registered_domain - gets domain registered by site owner for host
+    normalize_url - gets canonical form of url
+"""
+
+from ipaddress import ip_address
+from typing import Iterable
+from urllib.parse import urlsplit, urlunsplit, unquote_plus
+
+from settings.config import CRAWLER_TRACKING_PARAMS
+
+
+# public suffixes of two labels that are most often met in ads urls,
+# domains under them are registered with third level
+MULTI_LABEL_SUFFIXES = frozenset((
+    "com.ru", "net.ru", "org.ru", "pp.ru",
+    "msk.ru", "spb.ru", "msk.su", "spb.su",
+    "com.ua", "kiev.ua", "org.ua", "com.kz", "org.kz", "com.by",
+    "co.uk", "org.uk", "com.tr", "co.il", "com.au", "com.br", "co.jp",
+))
+
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def url_host(url: str)->str:
+    """
+    Gets host part of url
+    :param url: url
+    :return: lowercase host name, empty string if url has no host
+    """
+    try:
+        return urlsplit(url).hostname or ""
+    except ValueError:
+        return ""
+
+
+def registered_domain(host: str)->str:
+    """
+    Gets domain registered by site owner for provided host
+    as shop.example.com -> example.com, shop.example.com.ru -> example.com.ru
+    IP addresses are returned as is
+    :param host: lowercase host name
+    :return: registered domain
+    """
+    try:
+        ip_address(host)
+        return host
+    except ValueError:
+        pass
+    labels = host.rstrip(".").split(".")
+    if ".".join(labels[-2:]) in MULTI_LABEL_SUFFIXES:
+        return ".".join(labels[-3:])
+    return ".".join(labels[-2:])
+
+
+def is_tracking_param(name: str, rules: Iterable[str])->bool:
+    """
+    Checks if query parameter is used only for tracking
+    :param name: name of query parameter
+    :param rules: tracking parameters names, names ending with *
+    are prefixes
+    :return: True if parameter matches any of rules
+    """
+    name = name.lower()
+    for rule in rules:
+        if rule.endswith("*"):
+            if name.startswith(rule[:-1]):
+                return True
+        elif name == rule:
+            return True
+    return False
+
+
+def normalize_url(url: str,
+                  tracking_params: Iterable[str]=CRAWLER_TRACKING_PARAMS)\
+        ->str:
+    """
+    Gets canonical form of url: scheme and host are lowercased,
+    default port, fragment, empty path and tracking query parameters
+    are dropped
+    as HTTP://Example.com:80/?utm_source=ya#top -> http://example.com/
+    :param url: url
+    :param tracking_params: rules of tracking parameters to be dropped
+    (see is_tracking_param)
+    :return: normalized url, url as is if it can not be parsed
+    """
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    host = parts.hostname or ""
+    if ":" in host:
+        host = f"[{host}]"  # IPv6 address
+    if port and port != DEFAULT_PORTS.get(scheme):
+        host += f":{port}"
+    if parts.username or parts.password:
+        host = parts.netloc.rsplit("@", 1)[0] + "@" + host
+    # parameters are filtered as is, so rest of query is not re-encoded
+    query = "&".join(
+        param for param in parts.query.split("&")
+        if param and not is_tracking_param(
+            unquote_plus(param.split("=", 1)[0]), tracking_params
+        )
+    )
+    return urlunsplit((scheme, host, parts.path or "/", query, ""))
@@ -4,7 +4,7 @@ Classes:
     SaveAdsFromAPI - tasks that saves API items to DB
 """
 
-from typing import List
+from typing import List, Tuple
 
 from sqlalchemy import and_
 from PyQt5.QtCore import pyqtSignal
@@ -57,22 +57,24 @@ class SaveLinksFromAPI(PQDBTask):
             self.error_occurred.emit(e)
 
 
-class SaveParsedLink(PQDBTask):
+class SaveParsedLinks(PQDBTask):
     """
-    DB Task that saves parsed link to DB
+    DB Task that saves batch of parsed links to DB with single commit
+    :emits saved(count): number of saved links
     """
+    saved = pyqtSignal(int)
 
-    def __init__(self, url: str, status: str, warning: str):
+    def __init__(self, pages: List[Tuple[str, str, str]]):
+        """
+        :param pages: tuples of url, status code and warning text
+        """
         super().__init__()
-        self.url = url
-        self.status = status
-        self.warning = warning
+        self.pages = pages
 
     def run(self):
         try:
-            LinkUrl.from_response(
-                self.session, self.url, self.status, self.warning
-            )
+            LinkUrl.from_responses(self.session, self.pages)
+            self.saved.emit(len(self.pages))
         except Exception as e:
             self.error_occurred.emit(e)
 
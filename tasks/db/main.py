@@ -2,15 +2,34 @@
 Module containing all tasks that manage DB state
 classes:
     InitDB - init task for db
+functions:
+    has_unfinished_crawl - checks if crawl run should be resumed
 """
 
 from PyQt5.QtCore import QThread, pyqtSignal
+from sqlalchemy.orm import sessionmaker
 
-from model.alchemy.common import Base, engine
+from model.alchemy.common import Base, engine, CacheBase, cache_engine
 from model.alchemy.campaign import YandexCampaign
 from model.alchemy.ad_group import YandexAdGroup
 from model.alchemy.ad import YandexAd
 from model.alchemy.links import YandexLink, YandexLinksSet, LinkUrl
+from model.alchemy.crawl_cache import CrawlCacheEntry, CrawlCheckpoint
+from model.alchemy.snapshot import SyncState
+
+
+def has_unfinished_crawl()->bool:
+    """
+    Checks if pages check was interrupted, than database of its
+    ads should be kept to resume it
+    :return: True if there is unfinished run
+    """
+    CacheBase.metadata.create_all(cache_engine)
+    session = sessionmaker(bind=cache_engine)()
+    try:
+        return CrawlCheckpoint.is_unfinished(session)
+    finally:
+        session.close()
 
 
 class InitDB(QThread):
@@ -22,6 +41,7 @@ class InitDB(QThread):
     def run(self):
         try:
             Base.metadata.create_all(engine)
+            CacheBase.metadata.create_all(cache_engine)
             self.finished.emit()  # does not emits don't know why
         except Exception as e:
             self.error_occurred.emit(e)
@@ -0,0 +1,108 @@
+"""
+Module with DB tasks for synced copy of clients accounts
+(persisted in cache db between app runs)
+Classes:
+    GetSyncState - gets times of last sync of clients
+    SaveSyncedChanges - applies changes of clients accounts to synced copy
+    RestoreSnapshot - saves synced accounts to db and gets links
+"""
+
+from typing import List
+
+from PyQt5.QtCore import pyqtSignal
+from sqlalchemy.orm import sessionmaker
+
+from model.alchemy.common import cache_engine
+from model.alchemy.ad import YandexAd
+from model.alchemy.ad_group import YandexAdGroup
+from model.alchemy.campaign import YandexCampaign
+from model.alchemy.links import YandexLinksSet, YandexLink, LinkUrl
+from model.alchemy.snapshot import SyncState
+from tasks.db.common import PQDBTask
+
+
+class GetSyncState(PQDBTask):
+    """
+    DB task that gets times of last sync and synced campaigns of clients
+    :emits got_state: dictionary with
+        keys - logins of synced clients
+        values - timestamp of sync and ids of campaigns
+    """
+    got_state = pyqtSignal(dict)
+
+    def __init__(self, logins: List[str]):
+        """
+        :param logins: clients logins
+        """
+        super().__init__()
+        self.logins = logins
+
+    def run(self):
+        try:
+            session = sessionmaker(bind=cache_engine)()
+            try:
+                self.got_state.emit(SyncState.by_logins(session, self.logins))
+            finally:
+                session.close()
+        except Exception as e:
+            self.error_occurred.emit(e)
+
+
+class SaveSyncedChanges(PQDBTask):
+    """
+    DB task that applies changes of clients accounts to synced copy
+    one by one
+    """
+    def __init__(self, changes: List):
+        """
+        :param changes: YaAPIDirectChanges of clients
+        """
+        super().__init__()
+        self.changes = changes
+
+    def run(self):
+        try:
+            session = sessionmaker(bind=cache_engine)()
+            try:
+                for changes in self.changes:
+                    SyncState.merge(session, changes)
+            finally:
+                session.close()
+        except Exception as e:
+            self.error_occurred.emit(e)
+
+
+class RestoreSnapshot(PQDBTask):
+    """
+    DB task that saves synced accounts of clients to db as if they
+    were fetched from API, and gets their links
+    :emits got_links: dictionary with
+        keys - logins
+        values - lists of links
+    """
+    got_links = pyqtSignal(dict)
+
+    def __init__(self, logins: List[str]):
+        """
+        :param logins: clients logins
+        """
+        super().__init__()
+        self.logins = logins
+
+    def run(self):
+        try:
+            session = sessionmaker(bind=cache_engine)()
+            try:
+                campaigns, groups, ads, sets = SyncState.restore(
+                    session, self.logins
+                )
+            finally:
+                session.close()
+            YandexCampaign.update_from_api(self.session, campaigns)
+            YandexAdGroup.update_from_api(self.session, groups)
+            YandexLinksSet.update_from_api(self.session, ads)
+            YandexAd.update_from_api(self.session, ads)
+            YandexLink.update_from_api(self.session, sets)
+            self.got_links.emit(LinkUrl.by_login(self.session))
+        except Exception as e:
+            self.error_occurred.emit(e)
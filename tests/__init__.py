@@ -0,0 +1,16 @@
+"""
+Tests of the app, run from root of repository:
+    python -m unittest
+Settings of the app (settings/config.py) are not kept in repository,
+if they are absent tests run with default settings (config_dummy.py)
+"""
+
+import importlib
+import sys
+
+try:
+    importlib.import_module("settings.config")
+except ImportError:
+    sys.modules["settings.config"] = importlib.import_module(
+        "settings.config_dummy"
+    )
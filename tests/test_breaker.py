@@ -0,0 +1,80 @@
+"""
+Tests of circuit breaker of hosts
+"""
+
+import asyncio
+import unittest
+
+from tasks.crawling.breaker import CircuitBreaker
+from tasks.crawling.errors import ConnectionFailed
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.addCleanup(self.loop.close)
+        self.breaker = CircuitBreaker(threshold=2, cooldown=0.05)
+        self.error = ConnectionFailed("down")
+
+    def open(self):
+        """
+        Opens breaker of host with threshold of connection failures
+        """
+        for i in range(self.breaker.threshold):
+            self.assertIsNone(self.breaker.rejection("host", f"/{i}"))
+            self.breaker.record("host", f"/{i}", self.error)
+
+    def cool_down(self):
+        self.loop.run_until_complete(asyncio.sleep(self.breaker.cooldown))
+
+    def test_opens_after_threshold_of_failures(self):
+        self.breaker.record("host", "/0", self.error)
+        self.assertFalse(self.breaker.is_open("host"))
+        self.breaker.record("host", "/1", None)
+        self.breaker.record("host", "/2", self.error)
+        self.assertFalse(self.breaker.is_open("host"))
+        self.breaker.record("host", "/3", self.error)
+        self.assertTrue(self.breaker.is_open("host"))
+        self.assertIs(self.breaker.rejection("host", "/4"), self.error)
+        self.assertGreater(self.breaker.retry_in("host"), 0)
+        self.assertIsNone(self.breaker.rejection("other", "/"))
+
+    def test_half_open_lets_single_probe(self):
+        self.open()
+        self.cool_down()
+        self.assertEqual(self.breaker.retry_in("host"), 0)
+        self.assertIsNone(self.breaker.rejection("host", "/probe"))
+        self.assertIs(self.breaker.rejection("host", "/other"), self.error)
+
+    def test_closes_when_probe_succeeds(self):
+        self.open()
+        self.cool_down()
+        self.breaker.rejection("host", "/probe")
+        self.breaker.record("host", "/probe", None)
+        self.assertFalse(self.breaker.is_open("host"))
+        self.assertIsNone(self.breaker.rejection("host", "/other"))
+
+    def test_opens_again_when_probe_fails(self):
+        self.open()
+        self.cool_down()
+        self.breaker.rejection("host", "/probe")
+        self.breaker.record("host", "/probe", self.error)
+        self.assertTrue(self.breaker.is_open("host"))
+        self.assertIs(self.breaker.rejection("host", "/other"), self.error)
+
+    def test_other_requests_do_not_change_open_breaker(self):
+        self.open()
+        self.cool_down()
+        self.breaker.rejection("host", "/probe")
+        # requests sent before breaker opened finish after it
+        self.breaker.record("host", "/late", None)
+        self.assertTrue(self.breaker.is_open("host"))
+        self.breaker.record("host", "/late", self.error)
+        self.assertIs(self.breaker.rejection("host", "/other"), self.error)
+        self.breaker.record("host", "/probe", None)
+        self.assertFalse(self.breaker.is_open("host"))
+
+
+if __name__ == '__main__':
+    unittest.main()
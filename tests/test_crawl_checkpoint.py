@@ -0,0 +1,75 @@
+"""
+Tests of checkpoint of crawl run (CrawlCheckpoint),
+SQLite file in temporary directory stands for cache database
+"""
+
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from model.alchemy.common import CacheBase
+from model.alchemy.crawl_cache import CrawlCheckpoint
+
+
+class CrawlCheckpointTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        engine = create_engine(
+            "sqlite:///" + os.path.join(directory.name, "cache.db")
+        )
+        self.addCleanup(engine.dispose)
+        CacheBase.metadata.create_all(engine)
+        self.session = sessionmaker(bind=engine)()
+        self.addCleanup(self.session.close)
+        CrawlCheckpoint.save(self.session, [
+            ("http://site.test/a?utm_source=x", "client", "http://site.test/a"),
+            ("http://site.test/b", "client", "http://site.test/b"),
+            ("http://other.test/", "other", "http://other.test/"),
+        ])
+
+    def test_new_run_is_unfinished(self):
+        self.assertEqual(CrawlCheckpoint.finished(self.session), set())
+        self.assertTrue(CrawlCheckpoint.is_unfinished(self.session))
+        pages = CrawlCheckpoint.pages(self.session)
+        self.assertCountEqual(pages["client"], [
+            "http://site.test/a?utm_source=x", "http://site.test/b"
+        ])
+        self.assertEqual(pages["other"], ["http://other.test/"])
+
+    def test_mark_done_by_normalized_url(self):
+        CrawlCheckpoint.mark_done(self.session, "http://site.test/a")
+        self.session.commit()
+        self.assertEqual(
+            CrawlCheckpoint.finished(self.session), {"http://site.test/a"}
+        )
+        self.assertTrue(CrawlCheckpoint.is_unfinished(self.session))
+
+    def test_run_with_all_pages_done_is_finished(self):
+        for key in ("http://site.test/a", "http://site.test/b",
+                    "http://other.test/"):
+            CrawlCheckpoint.mark_done(self.session, key)
+        self.session.commit()
+        self.assertEqual(len(CrawlCheckpoint.finished(self.session)), 3)
+        self.assertFalse(CrawlCheckpoint.is_unfinished(self.session))
+
+    def test_mark_done_is_committed_with_session(self):
+        CrawlCheckpoint.mark_done(self.session, "http://site.test/b")
+        self.session.rollback()
+        self.assertEqual(CrawlCheckpoint.finished(self.session), set())
+
+    def test_save_replaces_previous_run(self):
+        CrawlCheckpoint.save(self.session, [
+            ("http://new.test/", "client", "http://new.test/")
+        ])
+        self.assertEqual(
+            CrawlCheckpoint.pages(self.session),
+            {"client": ["http://new.test/"]}
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
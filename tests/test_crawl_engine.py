@@ -0,0 +1,82 @@
+"""
+Tests of crawl engine against local tarpit site that accepts
+connections but never answers in time
+"""
+
+import asyncio
+import threading
+import unittest
+from collections import Counter
+
+from aiohttp import web
+
+from tasks.crawling.engine import CrawlEngine
+from tasks.crawling.retry import RetryPolicy
+
+
+class TarpitSite(threading.Thread):
+    """
+    Site answering every page after delay seconds,
+    served on event loop of its own thread
+    """
+    def __init__(self, delay: float):
+        super().__init__(daemon=True)
+        self.delay = delay
+        self.loop = asyncio.new_event_loop()
+        self.port = None
+        self.started = threading.Event()
+
+    async def answer(self, request):
+        await asyncio.sleep(self.delay)
+        return web.Response()
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        app = web.Application()
+        app.router.add_route("*", "/{page}", self.answer)
+        self.runner = web.AppRunner(app, shutdown_timeout=0)
+        self.loop.run_until_complete(self.runner.setup())
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        self.loop.run_until_complete(site.start())
+        self.port = self.runner.addresses[0][1]
+        self.started.set()
+        self.loop.run_forever()
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(
+            self.runner.cleanup(), self.loop
+        ).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.join()
+
+
+class TarpitTest(unittest.TestCase):
+    def setUp(self):
+        self.site = TarpitSite(delay=1)
+        self.site.start()
+        self.site.started.wait()
+        self.addCleanup(self.site.stop)
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.addCleanup(self.loop.close)
+
+    def test_every_page_is_reported_once(self):
+        base = f"http://127.0.0.1:{self.site.port}"
+        pages = [f"{base}/{i}" for i in range(30)]
+        engine = CrawlEngine(
+            concurrency=8, host_concurrency=4, host_min_gap=0,
+            breaker_threshold=2, breaker_cooldown=0.2, read_timeout=0.1,
+            retry=RetryPolicy(retries=0), transport="aiohttp"
+        )
+        results = []
+        self.loop.run_until_complete(
+            engine.run({"client": pages}, results.append)
+        )
+        self.assertEqual(
+            Counter(result.url for result in results), Counter(pages)
+        )
+        self.assertTrue(all(result.error for result in results))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+"""
+Tests of shared job table (CrawlJob), SQLite file in temporary
+directory stands for database shared by workers
+"""
+
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from model.alchemy.common import JobsBase
+from model.alchemy.crawl_jobs import CrawlJob
+from tasks.crawling.crawler import PageCheck
+
+
+class CrawlJobTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.engine = create_engine(
+            "sqlite:///" + os.path.join(self.directory.name, "jobs.db")
+        )
+        JobsBase.metadata.create_all(self.engine)
+        self.app = self.new_session()
+        CrawlJob.enqueue(
+            self.app, "run",
+            {"client": [f"http://site{i}.test/" for i in range(6)]},
+            {}, {"http://site5.test/": 10.0}
+        )
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.directory.cleanup()
+
+    def new_session(self):
+        """
+        Creates session of separate worker (own connection to database)
+        """
+        session = sessionmaker(bind=self.engine, expire_on_commit=False)()
+        self.addCleanup(session.close)
+        return session
+
+    @staticmethod
+    def result(job: CrawlJob)->PageCheck:
+        return PageCheck(job.url, "200", "", [], None, None, None, None)
+
+    def test_lease_takes_most_important_jobs(self):
+        jobs = CrawlJob.lease(self.new_session(), "a", 2, 60, 3)
+        self.assertEqual(len(jobs), 2)
+        self.assertIn("http://site5.test/", [job.url for job in jobs])
+        for job in jobs:
+            self.assertEqual(job.state, "leased")
+            self.assertEqual(job.worker, "a")
+            self.assertEqual(job.attempts, 1)
+
+    def test_leased_job_is_not_given_to_other_worker(self):
+        first = CrawlJob.lease(self.new_session(), "a", 4, 60, 3)
+        second = CrawlJob.lease(self.new_session(), "b", 4, 60, 3)
+        self.assertEqual(len(first), 4)
+        self.assertEqual(len(second), 2)
+        self.assertFalse(
+            {job.id for job in first} & {job.id for job in second}
+        )
+        self.assertEqual(CrawlJob.lease(self.new_session(), "c", 4, 60, 3), [])
+
+    def test_expired_lease_is_queued_again(self):
+        lost = CrawlJob.lease(self.new_session(), "a", 6, -1, 3)
+        taken = CrawlJob.lease(self.new_session(), "b", 6, 60, 3)
+        self.assertEqual(
+            {job.id for job in taken}, {job.id for job in lost}
+        )
+        for job in taken:
+            self.assertEqual(job.worker, "b")
+            self.assertEqual(job.attempts, 2)
+
+    def test_job_fails_after_max_attempts(self):
+        CrawlJob.lease(self.new_session(), "a", 6, -1, 2)
+        CrawlJob.lease(self.new_session(), "b", 6, -1, 2)
+        self.assertEqual(CrawlJob.lease(self.new_session(), "c", 6, 60, 2), [])
+        jobs = CrawlJob.collect(self.app, "run")
+        self.assertEqual(len(jobs), 6)
+        for job in jobs:
+            self.assertEqual(job.status, "Crawling worker failed")
+        self.assertEqual(CrawlJob.pending(self.app, "run"), 0)
+
+    def test_heartbeat_prolongs_lease(self):
+        worker = self.new_session()
+        jobs = CrawlJob.lease(worker, "a", 6, -1, 3)
+        CrawlJob.heartbeat(worker, "a", [job.id for job in jobs[:4]], 60)
+        taken = CrawlJob.lease(self.new_session(), "b", 6, 60, 3)
+        self.assertEqual(
+            {job.id for job in taken}, {job.id for job in jobs[4:]}
+        )
+
+    def test_heartbeat_does_not_prolong_jobs_of_other_worker(self):
+        jobs = CrawlJob.lease(self.new_session(), "a", 6, -1, 3)
+        CrawlJob.heartbeat(
+            self.new_session(), "b", [job.id for job in jobs], 60
+        )
+        taken = CrawlJob.lease(self.new_session(), "c", 6, 60, 3)
+        self.assertEqual(len(taken), 6)
+
+    def test_result_of_job_done_by_other_worker_is_skipped(self):
+        lost = CrawlJob.lease(self.new_session(), "a", 6, -1, 3)
+        worker = self.new_session()
+        taken = CrawlJob.lease(worker, "b", 6, 60, 3)
+        CrawlJob.complete(worker, [(job.id, self.result(job)) for job in taken])
+        CrawlJob.complete(self.new_session(), [
+            (job.id, self.result(job)._replace(status="500")) for job in lost
+        ])
+        jobs = CrawlJob.collect(self.app, "run")
+        self.assertEqual({job.status for job in jobs}, {"200"})
+        self.assertEqual(CrawlJob.collect(self.app, "run"), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
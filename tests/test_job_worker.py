@@ -0,0 +1,81 @@
+"""
+Tests of headless crawling worker (JobWorker) against local site,
+SQLite file in temporary directory stands for shared job table
+"""
+
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+
+from aiohttp import web
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from model.alchemy.common import JobsBase
+from model.alchemy.crawl_jobs import CrawlJob
+from tasks.crawling.jobs import JobWorker
+
+
+class LocalSite(threading.Thread):
+    """
+    Site answering 200 to /ok and 404 to other pages,
+    served on event loop of its own thread
+    """
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.loop = asyncio.new_event_loop()
+        self.port = None
+        self.started = threading.Event()
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        app = web.Application()
+        app.router.add_route("*", "/ok", lambda request: web.Response())
+        self.runner = web.AppRunner(app)
+        self.loop.run_until_complete(self.runner.setup())
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        self.loop.run_until_complete(site.start())
+        self.port = self.runner.addresses[0][1]
+        self.started.set()
+        self.loop.run_forever()
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(
+            self.runner.cleanup(), self.loop
+        ).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.join()
+
+
+class JobWorkerTest(unittest.TestCase):
+    def setUp(self):
+        self.site = LocalSite()
+        self.site.start()
+        self.site.started.wait()
+        self.addCleanup(self.site.stop)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.engine = create_engine(
+            "sqlite:///" + os.path.join(directory.name, "jobs.db")
+        )
+        self.addCleanup(self.engine.dispose)
+        JobsBase.metadata.create_all(self.engine)
+        self.app = sessionmaker(bind=self.engine)()
+        self.addCleanup(self.app.close)
+
+    def test_worker_saves_results_of_all_jobs(self):
+        base = f"http://127.0.0.1:{self.site.port}"
+        pages = [f"{base}/ok", f"{base}/missing"]
+        CrawlJob.enqueue(self.app, "run", {"client": pages}, {}, {})
+        JobWorker(self.engine, "worker", batch=1).run(exit_when_idle=True)
+        statuses = {
+            job.url: job.status for job in CrawlJob.collect(self.app, "run")
+        }
+        self.assertEqual(statuses, {pages[0]: "200", pages[1]: "404"})
+        self.assertEqual(CrawlJob.pending(self.app, "run"), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
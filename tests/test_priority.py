@@ -0,0 +1,26 @@
+"""
+Tests of priorities of checked pages
+"""
+
+import unittest
+
+from tasks.crawling.crawler import get_warnings
+from tasks.crawling.priority import is_failure
+
+
+class IsFailureTest(unittest.TestCase):
+    def test_redirected_page_is_not_failure(self):
+        warnings = get_warnings([(302, "http://tracker.test/click")])
+        self.assertFalse(is_failure("200", warnings))
+
+    def test_error_statuses_are_failures(self):
+        for status in ("404", "500", "Timeout", "Cannot connect", "", None):
+            self.assertTrue(is_failure(status, ""), status)
+
+    def test_error_page_is_failure(self):
+        warnings = get_warnings([(302, "http://tracker.test/click")], True)
+        self.assertTrue(is_failure("200", warnings))
+
+
+if __name__ == '__main__':
+    unittest.main()
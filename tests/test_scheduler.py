@@ -0,0 +1,68 @@
+"""
+Tests of scheduler of crawl jobs by host
+"""
+
+import asyncio
+import unittest
+
+from tasks.crawling.scheduler import HostScheduler
+
+
+class HostSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.addCleanup(self.loop.close)
+        self.scheduler = HostScheduler(min_gap=0, max_active=1)
+
+    def take_all(self):
+        """
+        Gets jobs till scheduler is empty, each job is finished at once
+        :return: jobs in order of start
+        """
+        async def take():
+            jobs = []
+            while True:
+                scheduled = await self.scheduler.get()
+                if scheduled is None:
+                    return jobs
+                host, job = scheduled
+                jobs.append(job)
+                self.scheduler.done(host)
+        return self.loop.run_until_complete(
+            asyncio.wait_for(take(), timeout=5)
+        )
+
+    def test_jobs_of_higher_priority_go_first(self):
+        self.scheduler.put("a", "low", priority=1)
+        self.scheduler.put("a", "high", priority=2)
+        self.scheduler.put("a", "plain")
+        self.assertEqual(self.take_all(), ["high", "low", "plain"])
+
+    def test_delayed_job_is_started_after_delay(self):
+        self.scheduler.put("a", "delayed", delay=0.05)
+        self.scheduler.put("a", "first")
+        started = self.loop.time()
+        self.assertEqual(self.take_all(), ["first", "delayed"])
+        self.assertGreaterEqual(self.loop.time() - started, 0.05)
+
+    def test_drop_removes_waiting_and_delayed_jobs(self):
+        self.scheduler.put("a", "a/1")
+        self.scheduler.put("a", "a/2", delay=0.05)
+        self.scheduler.put("a", "a/keep")
+        self.scheduler.put("b", "b/1")
+        dropped = self.scheduler.drop(
+            "a", lambda job: job != "a/keep"
+        )
+        self.assertCountEqual(dropped, ["a/1", "a/2"])
+        self.assertCountEqual(self.take_all(), ["a/keep", "b/1"])
+
+    def test_dropped_host_does_not_block_others(self):
+        self.scheduler.put("a", "a/1")
+        self.scheduler.put("b", "b/1")
+        self.scheduler.drop("a", lambda job: True)
+        self.assertEqual(self.take_all(), ["b/1"])
+
+
+if __name__ == '__main__':
+    unittest.main()
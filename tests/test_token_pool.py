@@ -0,0 +1,84 @@
+"""
+Tests of thread pool sending API requests of many clients (TokenPool)
+"""
+
+import threading
+import time
+import unittest
+
+from tasks.api.pool import TokenPool, FINISHED
+
+
+class TokenPoolStreamTest(unittest.TestCase):
+    def test_pages_of_each_job_are_passed_before_finished(self):
+        jobs = [("token", ("a", 3)), ("token", ("b", 0)), ("other", ("c", 2))]
+        stream = list(TokenPool(workers=2, token_workers=1).stream(
+            lambda job: (f"{job[0]}{page}" for page in range(job[1])), jobs
+        ))
+        for _, job in jobs:
+            items = [item for streamed, item in stream if streamed == job]
+            self.assertEqual(
+                items,
+                [f"{job[0]}{page}" for page in range(job[1])] + [FINISHED]
+            )
+        self.assertEqual(len(stream), 8)
+
+    def test_page_is_passed_before_job_is_finished(self):
+        released = threading.Event()
+
+        def pages(job):
+            yield "first"
+            released.wait(5)
+            yield "second"
+
+        stream = TokenPool().stream(pages, [("token", "job")])
+        self.assertEqual(next(stream), ("job", "first"))
+        released.set()
+        self.assertEqual(list(stream), [("job", "second"), ("job", FINISHED)])
+
+    def test_error_in_middle_of_stream_is_raised(self):
+        started = []
+
+        def pages(job):
+            started.append(job)
+            yield job
+            if job == "broken":
+                raise ValueError("broken page")
+
+        stream = TokenPool(workers=1, token_workers=1).stream(
+            pages, [("token", "ok"), ("token", "broken"), ("token", "late")]
+        )
+        self.assertEqual(next(stream), ("ok", "ok"))
+        self.assertEqual(next(stream), ("ok", FINISHED))
+        self.assertEqual(next(stream), ("broken", "broken"))
+        with self.assertRaises(ValueError):
+            next(stream)
+        self.assertNotIn("late", started)
+
+    def test_calls_of_token_are_limited(self):
+        lock = threading.Lock()
+        active = {"a": 0, "b": 0}
+        peak = {"a": 0, "b": 0}
+
+        def call(token):
+            with lock:
+                active[token] += 1
+                peak[token] = max(peak[token], active[token])
+            time.sleep(0.02)
+            with lock:
+                active[token] -= 1
+            return token
+
+        results = list(TokenPool(workers=4, token_workers=2).map(
+            call, [(token, token) for token in "aaaaaabbb"]
+        ))
+        self.assertEqual(len(results), 9)
+        self.assertEqual(peak["a"], 2)
+        self.assertLessEqual(peak["b"], 2)
+
+    def test_no_jobs(self):
+        self.assertEqual(list(TokenPool().stream(iter, [])), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
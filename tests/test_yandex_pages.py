@@ -0,0 +1,152 @@
+"""
+Tests of paged Yandex Direct API requests (ya_api_get_pages,
+ya_api_get_all) against local fake API server
+"""
+
+import json
+import threading
+import unittest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from unittest.mock import patch
+
+from tasks.api import yandex_utils
+from tasks.api.errors import YaApiException
+from tasks.api.yandex_utils import ya_api_get_pages, ya_api_get_all, \
+    PAGE_LIMIT
+
+
+class FakeApi(ThreadingHTTPServer):
+    """
+    Fake API serving 'get' method of any service: returns items
+    from Page.Offset, no more than Page.Limit and page_size of them,
+    and LimitedBy if more items are left
+    fields:
+        items - items of every service
+        page_size - maximum of items server returns per page
+        fail_at - offset of page answered with error
+        requests - (headers, params) of every request
+    """
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeApiHandler)
+        self.items = []
+        self.page_size = PAGE_LIMIT
+        self.fail_at = None
+        self.requests = []
+
+    def answer(self, params):
+        page = params.get("Page", {})
+        offset = page.get("Offset", 0)
+        if offset == self.fail_at:
+            return {"error": {"error_code": 52, "error_detail": "Failure"}}
+        limit = min(page.get("Limit", PAGE_LIMIT), self.page_size)
+        result = {"Items": self.items[offset:offset + limit]}
+        if offset + limit < len(self.items):
+            result["LimitedBy"] = offset + limit
+        return {"result": result}
+
+
+class FakeApiHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append((dict(self.headers), body["params"]))
+        answer = json.dumps(self.server.answer(body["params"])).encode()
+        self.send_response(200)
+        self.send_header("Units", "10/100000/100000")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(answer)))
+        self.end_headers()
+        self.wfile.write(answer)
+
+    def log_message(self, *args):
+        pass
+
+
+class YaApiPagesTest(unittest.TestCase):
+    def setUp(self):
+        self.api = FakeApi()
+        threading.Thread(
+            target=self.api.serve_forever, args=(0.05,), daemon=True
+        ).start()
+        self.addCleanup(self.api.server_close)
+        self.addCleanup(self.api.shutdown)
+        url = patch.object(
+            yandex_utils, "YA_DIRECT_URL",
+            f"http://127.0.0.1:{self.api.server_address[1]}"
+        )
+        url.start()
+        self.addCleanup(url.stop)
+
+    def pages(self, params, login="client"):
+        return list(ya_api_get_pages(
+            "campaigns", "Items", params, "token", login
+        ))
+
+    def test_pages_are_requested_by_limited_by(self):
+        self.api.items = [{"Id": i} for i in range(25)]
+        self.api.page_size = 10
+        pages = self.pages({"SelectionCriteria": {}})
+        self.assertEqual([len(items) for _, items, _ in pages], [10, 10, 5])
+        self.assertEqual(
+            [item for _, items, _ in pages for item in items],
+            self.api.items
+        )
+        self.assertEqual(
+            [params.get("Page") for _, params in self.api.requests],
+            [None, {"Limit": PAGE_LIMIT, "Offset": 10},
+             {"Limit": PAGE_LIMIT, "Offset": 20}]
+        )
+        for units, _, error in pages:
+            self.assertEqual(units.remains, 100000)
+            self.assertIsNone(error)
+
+    def test_custom_limit_is_kept_on_every_page(self):
+        self.api.items = [{"Id": i} for i in range(7)]
+        pages = self.pages({"Page": {"Limit": 3}})
+        self.assertEqual([len(items) for _, items, _ in pages], [3, 3, 1])
+        self.assertEqual(
+            [params["Page"] for _, params in self.api.requests],
+            [{"Limit": 3}, {"Limit": 3, "Offset": 3},
+             {"Limit": 3, "Offset": 6}]
+        )
+
+    def test_token_and_login_are_sent_with_every_page(self):
+        self.api.items = [{"Id": i} for i in range(5)]
+        self.pages({"Page": {"Limit": 2}})
+        self.assertEqual(len(self.api.requests), 3)
+        for headers, _ in self.api.requests:
+            self.assertEqual(headers["Authorization"], "Bearer token")
+            self.assertEqual(headers["Client-Login"], "client")
+
+    def test_agency_request_has_no_client_login(self):
+        self.api.items = [{"Id": i} for i in range(5)]
+        self.pages({"Page": {"Limit": 2}}, login=None)
+        for headers, _ in self.api.requests:
+            self.assertNotIn("Client-Login", headers)
+
+    def test_error_stops_pages(self):
+        self.api.items = [{"Id": i} for i in range(9)]
+        self.api.fail_at = 3
+        pages = self.pages({"Page": {"Limit": 3}})
+        self.assertEqual(len(pages), 2)
+        self.assertIsNone(pages[0][2])
+        self.assertEqual(pages[1][1], [])
+        self.assertIsInstance(pages[1][2], YaApiException)
+        units, items, error = ya_api_get_all(
+            "campaigns", "Items", {"Page": {"Limit": 3}}, "token", "client"
+        )
+        self.assertEqual(items, self.api.items[:3])
+        self.assertIsInstance(error, YaApiException)
+
+    def test_empty_result(self):
+        pages = self.pages({})
+        self.assertEqual(len(pages), 1)
+        self.assertEqual(pages[0][1], [])
+        self.assertIsNone(pages[0][2])
+        units, items, error = ya_api_get_all(
+            "campaigns", "Items", {}, "token", "client"
+        )
+        self.assertEqual((items, error), ([], None))
+
+
+if __name__ == '__main__':
+    unittest.main()
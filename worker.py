@@ -0,0 +1,41 @@
+"""
+Headless crawling worker: checks pages enqueued by app to shared job
+table (CRAWLER_JOBS_DB in settings), run one or several of them on
+any machine with access to that database:
+    python worker.py [--name NAME] [--exit-when-idle]
+"""
+import argparse
+import logging
+import os
+import socket
+
+from sqlalchemy import create_engine
+
+from settings.config import CRAWLER_JOBS_DB
+from model.alchemy.common import JobsBase
+from tasks.crawling.jobs import JobWorker
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Crawling worker")
+    parser.add_argument(
+        "--db", default=CRAWLER_JOBS_DB,
+        help="SQLAlchemy url of shared job table"
+    )
+    parser.add_argument(
+        "--name", default=f"{socket.gethostname()}-{os.getpid()}",
+        help="unique name of worker"
+    )
+    parser.add_argument(
+        "--exit-when-idle", action="store_true",
+        help="stop when there is no jobs"
+    )
+    args = parser.parse_args()
+    if not args.db:
+        parser.error("job table url is not set (CRAWLER_JOBS_DB or --db)")
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s %(name)s %(message)s"
+    )
+    engine = create_engine(args.db)
+    JobsBase.metadata.create_all(engine)
+    JobWorker(engine, args.name).run(args.exit_when_idle)